@@ -0,0 +1,84 @@
+"""Cold import cost of http_wrap modules, measured with `python -X importtime`.
+
+    python -m benchmarks.bench_import --runs 10 --output import.json
+
+Every run imports the module in a fresh interpreter. The reported time is
+the cumulative import time of the module itself, so interpreter start-up
+and site hooks are excluded.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+MODULES = ("http_wrap", "http_wrap.httpwrap", "http_wrap.proxies")
+BACKENDS = ("aiohttp", "aiohappyeyeballs", "httpx", "requests")
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Map each imported module to its cumulative import time in microseconds."""
+    cumulative: Dict[str, int] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:") :].split("|")
+        if cum.strip().isdigit():
+            cumulative[name.strip()] = int(cum)
+    return cumulative
+
+
+def import_once(module: str) -> Dict[str, Any]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    cumulative = parse_importtime(proc.stderr)
+    return {
+        "us": cumulative.get(module, 0),
+        "backends": sorted(b for b in BACKENDS if b in cumulative),
+    }
+
+
+def measure(module: str, runs: int) -> Dict[str, Any]:
+    samples = [import_once(module) for _ in range(runs)]
+    times = [s["us"] for s in samples]
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": statistics.median(times) / 1000,
+        "min_ms": min(times) / 1000,
+        "max_ms": max(times) / 1000,
+        "backends_loaded": samples[-1]["backends"],
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--output", help="write results as JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    args = parse_args(argv)
+    results = [measure(module, args.runs) for module in args.modules]
+    print(f"{'module':<24}{'median ms':>12}{'min ms':>10}  backends loaded")
+    for r in results:
+        print(
+            f"{r['module']:<24}{r['median_ms']:>12.2f}{r['min_ms']:>10.2f}  "
+            f"{', '.join(r['backends_loaded']) or '-'}"
+        )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
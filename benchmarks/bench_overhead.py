@@ -0,0 +1,351 @@
+"""Wrapper overhead against the raw backends, on an in-process local server.
+
+    python -m benchmarks.bench_overhead -n 2000 --output bench.json
+    python -m benchmarks.bench_overhead --compare bench.json
+
+The server runs in the same process, so allocation figures include its
+share; it is identical for every case, so the raw/wrapped deltas hold.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+from benchmarks.server import LocalServer
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.metrics import LatencyHistogram, MetricsAggregator
+
+SYNC_BACKENDS = ("requests", "httpx")
+ASYNC_BACKENDS = ("httpx-async", "aiohttp")
+
+
+def _bench_logger() -> logging.Logger:
+    logger = logging.getLogger("http_wrap.bench")
+    logger.addHandler(logging.NullHandler())
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+
+def make_configs() -> Dict[str, HTTPWrapConfig]:
+    # allow_internal is required to talk to 127.0.0.1
+    return {
+        "default": HTTPWrapConfig(allow_internal=True),
+        "no_validation": HTTPWrapConfig(allow_internal=True, validate_url=False),
+        "redact": HTTPWrapConfig(
+            allow_internal=True,
+            sanitize_resp_header=(["server"], ["x-"], [], ["token"]),
+        ),
+        "metrics": HTTPWrapConfig(
+            allow_internal=True, listeners=(MetricsAggregator(),)
+        ),
+        "logging": HTTPWrapConfig(allow_internal=True, logger=_bench_logger()),
+    }
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _summary(
+    hist: LatencyHistogram, wall: float, allocs: Tuple[float, float]
+) -> Dict[str, Any]:
+    return {
+        "rps": hist.count / wall if wall else 0.0,
+        "p50_ms": hist.percentile(50) * 1000,
+        "p99_ms": hist.percentile(99) * 1000,
+        "mean_ms": hist.mean * 1000,
+        "alloc_peak_bytes_per_request": allocs[0],
+        "alloc_retained_bytes_per_request": allocs[1],
+        "rss_mib": rss_bytes() / (1 << 20),
+    }
+
+
+# ------------------------- sync ------------------------------
+
+
+def _sync_allocations(call: Callable[[], Any], samples: int) -> Tuple[float, float]:
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            call()
+            peak += tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return peak / samples, retained / samples
+
+
+def measure_sync(
+    call: Callable[[], Any], requests: int, warmup: int, alloc_samples: int
+) -> Dict[str, Any]:
+    for _ in range(warmup):
+        call()
+    hist = LatencyHistogram()
+    start = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        call()
+        hist.record(time.perf_counter() - t0)
+    wall = time.perf_counter() - start
+    return _summary(hist, wall, _sync_allocations(call, alloc_samples))
+
+
+def _sync_client(
+    backend: str, config: Optional[HTTPWrapConfig]
+) -> AbstractContextManager:
+    if backend == "requests":
+        import requests
+
+        sessionmaker: Callable[..., Any] = requests.Session
+    else:
+        import httpx
+
+        sessionmaker = httpx.Client
+    if config is None:
+        return sessionmaker()
+    return make_client_session(sessionmaker, config)  # type: ignore[return-value]
+
+
+def run_sync_case(
+    backend: str, config: Optional[HTTPWrapConfig], url: str, args: Any
+) -> Dict[str, Any]:
+    with _sync_client(backend, config) as client:
+
+        def call() -> Any:
+            return client.get(url).content
+
+        return measure_sync(call, args.requests, args.warmup, args.alloc_samples)
+
+
+# ------------------------- async ------------------------------
+
+
+async def _async_allocations(
+    call: Callable[[], Awaitable[Any]], samples: int
+) -> Tuple[float, float]:
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await call()
+            peak += tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return peak / samples, retained / samples
+
+
+async def measure_async(
+    call: Callable[[], Awaitable[Any]],
+    requests: int,
+    warmup: int,
+    alloc_samples: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    for _ in range(warmup):
+        await call()
+    hist = LatencyHistogram()
+
+    async def worker(count: int) -> None:
+        for _ in range(count):
+            t0 = time.perf_counter()
+            await call()
+            hist.record(time.perf_counter() - t0)
+
+    share, extra = divmod(requests, concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(worker(share + (i < extra)) for i in range(concurrency))
+    )
+    wall = time.perf_counter() - start
+    allocs = await _async_allocations(call, alloc_samples)
+    return _summary(hist, wall, allocs)
+
+
+async def _make_httpx_async(**kwargs: Any) -> Any:
+    import httpx
+
+    return httpx.AsyncClient(**kwargs)
+
+
+async def _make_aiohttp(**kwargs: Any) -> Any:
+    import aiohttp
+
+    return aiohttp.ClientSession(**kwargs)
+
+
+async def _body(response: Any) -> Any:
+    content = response.content
+    return await content() if callable(content) else content
+
+
+async def run_async_case(
+    backend: str, config: Optional[HTTPWrapConfig], url: str, args: Any
+) -> Dict[str, Any]:
+    sessionmaker = _make_httpx_async if backend == "httpx-async" else _make_aiohttp
+    measure = (args.requests, args.warmup, args.alloc_samples, args.concurrency)
+
+    if config is None:
+        async with await sessionmaker() as client:
+            if backend == "aiohttp":
+
+                async def call() -> Any:
+                    async with client.get(url) as response:
+                        return await response.read()
+
+            else:
+
+                async def call() -> Any:
+                    return (await client.get(url)).content
+
+            return await measure_async(call, *measure)
+
+    session: AbstractAsyncContextManager = make_client_session(  # type: ignore
+        sessionmaker, config
+    )
+    async with session as wrapped:
+
+        async def wrapped_call() -> Any:
+            return await _body(await wrapped.get(url))
+
+        return await measure_async(wrapped_call, *measure)
+
+
+# ------------------------- runner ------------------------------
+
+
+def run_case(
+    backend: str, config_name: Optional[str], url: str, args: Any
+) -> Dict[str, Any]:
+    config = None if config_name is None else make_configs()[config_name]
+    result: Dict[str, Any] = {
+        "backend": backend,
+        "mode": "raw" if config is None else "wrapped",
+        "config": config_name,
+        "requests": args.requests,
+        "concurrency": 1 if backend in SYNC_BACKENDS else args.concurrency,
+    }
+    try:
+        if backend in SYNC_BACKENDS:
+            result.update(run_sync_case(backend, config, url, args))
+        else:
+            result.update(asyncio.run(run_async_case(backend, config, url, args)))
+    except Exception as exc:
+        result["error"] = f"{type(exc).__name__}: {exc}"
+    return result
+
+
+def add_overhead(results: List[Dict[str, Any]]) -> None:
+    raw = {r["backend"]: r for r in results if r["mode"] == "raw" and "error" not in r}
+    for result in results:
+        base = raw.get(result["backend"])
+        if result["mode"] == "raw" or base is None or "error" in result:
+            continue
+        result["p50_overhead_ms"] = result["p50_ms"] - base["p50_ms"]
+        result["rps_ratio"] = result["rps"] / base["rps"] if base["rps"] else 0.0
+
+
+def case_key(result: Mapping[str, Any]) -> str:
+    return f"{result['backend']}/{result['mode']}/{result['config'] or '-'}"
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'case':<36}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'alloc B':>10}")
+    for r in results:
+        if "error" in r:
+            print(f"{case_key(r):<36}  {r['error']}")
+            continue
+        print(
+            f"{case_key(r):<36}{r['rps']:>10.0f}{r['p50_ms']:>10.3f}"
+            f"{r['p99_ms']:>10.3f}{r['alloc_peak_bytes_per_request']:>10.0f}"
+        )
+
+
+def print_comparison(previous: Mapping[str, Any], results: List[Dict[str, Any]]) -> None:
+    old = {case_key(r): r for r in previous["results"] if "error" not in r}
+    print(f"{'case':<36}{'rps Δ%':>10}{'p50 Δ%':>10}{'p99 Δ%':>10}")
+    for r in results:
+        before = old.get(case_key(r))
+        if before is None or "error" in r:
+            continue
+        deltas = [
+            (r[k] - before[k]) / before[k] * 100 if before[k] else 0.0
+            for k in ("rps", "p50_ms", "p99_ms")
+        ]
+        print(f"{case_key(r):<36}" + "".join(f"{d:>+10.1f}" for d in deltas))
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--alloc-samples", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--body-size", type=int, default=256)
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=[*SYNC_BACKENDS, *ASYNC_BACKENDS],
+        choices=[*SYNC_BACKENDS, *ASYNC_BACKENDS],
+    )
+    parser.add_argument("--configs", nargs="+", default=list(make_configs()))
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="previous JSON results to compare with")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    results = []
+    with LocalServer(body_size=args.body_size) as server:
+        for backend in args.backends:
+            for config_name in [None, *args.configs]:
+                results.append(run_case(backend, config_name, server.url, args))
+    add_overhead(results)
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "body_size": args.body_size,
+        },
+        "results": results,
+    }
+    print_table(results)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
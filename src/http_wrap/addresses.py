@@ -0,0 +1,297 @@
+"""Classification of IP addresses against reserved and user-defined ranges.
+
+Ranges are kept as sorted, merged integer intervals per address family, so
+checking an address is one `inet_pton` and one `bisect` with no `ipaddress`
+objects. IPv4 addresses embedded in IPv6 (IPv4-mapped, NAT64, 6to4) are
+checked as IPv4. `allow` ranges take precedence over reserved and `deny`
+ranges.
+"""
+
+import socket
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+)
+
+RESERVED_V4 = (
+    "0.0.0.0/8",  # "this" network
+    "10.0.0.0/8",
+    "100.64.0.0/10",  # carrier-grade NAT
+    "127.0.0.0/8",
+    "169.254.0.0/16",  # link local, cloud metadata
+    "172.16.0.0/12",
+    "192.0.0.0/24",
+    "192.0.2.0/24",
+    "192.88.99.0/24",
+    "192.168.0.0/16",
+    "198.18.0.0/15",
+    "198.51.100.0/24",
+    "203.0.113.0/24",
+    "224.0.0.0/4",  # multicast
+    "240.0.0.0/4",  # reserved and broadcast
+)
+RESERVED_V6 = (
+    "::/8",  # unspecified, loopback, IPv4-compatible
+    "100::/64",  # discard
+    "2001::/23",  # IETF protocol assignments
+    "2001:db8::/32",
+    "3fff::/20",  # documentation
+    "fc00::/7",  # unique local
+    "fe80::/10",  # link local
+    "fec0::/10",  # site local
+    "ff00::/8",  # multicast
+)
+
+_V4_MAPPED = 0xFFFF  # ::ffff:0:0/96, as address >> 32
+_NAT64 = 0x64FF9B << 64  # 64:ff9b::/96, as address >> 32
+_6TO4 = 0x2002  # 2002::/16, as address >> 112
+
+Verdict = Literal["ok", "blocked", "unresolved", "invalid"]
+Resolver = Callable[[str], List[str]]
+
+
+class IntervalTable:
+    """Sorted, non-overlapping `[start, end]` integer intervals."""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]]) -> None:
+        merged: List[List[int]] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __contains__(self, value: int) -> bool:
+        i = bisect_right(self.starts, value) - 1
+        return i >= 0 and value <= self.ends[i]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+def parse_networks(networks: Iterable[str]) -> Tuple[IntervalTable, IntervalTable]:
+    import ipaddress
+
+    v4, v6 = [], []
+    for network in networks:
+        net = ipaddress.ip_network(network, strict=False)
+        interval = (int(net.network_address), int(net.broadcast_address))
+        (v4 if net.version == 4 else v6).append(interval)
+    return IntervalTable(v4), IntervalTable(v6)
+
+
+def parse_address(address: str) -> Tuple[int, int]:
+    """`(version, integer)` of an IP address string; ValueError if invalid."""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, address), "big")
+    except OSError:
+        pass
+    address = address.strip("[]").partition("%")[0]  # brackets and zone id
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, address), "big")
+    except OSError:
+        raise ValueError(f"Not an IP address: {address!r}") from None
+
+
+def embedded_v4(value: int) -> Optional[int]:
+    high = value >> 32
+    if high == _V4_MAPPED or high == _NAT64:
+        return value & 0xFFFFFFFF
+    if value >> 112 == _6TO4:
+        return (value >> 80) & 0xFFFFFFFF
+    return None
+
+
+class AddressClassifier:
+    __slots__ = ("_deny_v4", "_deny_v6", "_allow_v4", "_allow_v6")
+
+    def __init__(
+        self,
+        deny: Iterable[str] = (),
+        allow: Iterable[str] = (),
+        reserved: bool = True,
+    ) -> None:
+        reserved_ranges = RESERVED_V4 + RESERVED_V6 if reserved else ()
+        self._deny_v4, self._deny_v6 = parse_networks((*reserved_ranges, *deny))
+        self._allow_v4, self._allow_v6 = parse_networks(allow)
+
+    def is_blocked(self, address: str) -> bool:
+        version, value = parse_address(address)
+        if version == 6:
+            v4 = embedded_v4(value)
+            if v4 is None:
+                return value not in self._allow_v6 and value in self._deny_v6
+            value = v4
+        return value not in self._allow_v4 and value in self._deny_v4
+
+    def blocked(self, addresses: Iterable[str]) -> List[bool]:
+        """`is_blocked` for many addresses; invalid ones count as blocked."""
+        is_blocked = self.is_blocked
+        verdicts = []
+        for address in addresses:
+            try:
+                verdicts.append(is_blocked(address))
+            except ValueError:
+                verdicts.append(True)
+        return verdicts
+
+
+def is_internal_name(host: str) -> bool:
+    return host == "localhost" or host.endswith((".local", ".internal"))
+
+
+@lru_cache(maxsize=32)
+def get_classifier(
+    deny: Tuple[str, ...] = (), allow: Tuple[str, ...] = ()
+) -> AddressClassifier:
+    return AddressClassifier(deny, allow)
+
+
+# "no such host" answers; EAI_AGAIN, EAI_FAIL... may pass and are not cached
+NOT_FOUND_ERRORS = tuple(
+    getattr(socket, name)
+    for name in ("EAI_NONAME", "EAI_NODATA")
+    if hasattr(socket, name)
+)
+
+
+def is_not_found(error: BaseException) -> bool:
+    """Whether a failed lookup means the host does not exist (not a glitch)."""
+    if isinstance(error, socket.gaierror):
+        return error.errno in NOT_FOUND_ERRORS
+    return isinstance(error, UnicodeError)  # not a valid name, will not become one
+
+
+class NegativeCache:
+    """Recent "no such host" answers and blocked verdicts per host.
+
+    A cached host fails again without a lookup until its entry is `ttl`
+    seconds old; past `maxsize` hosts the least recently stored is evicted.
+    """
+
+    def __init__(self, ttl: float = 30.0, maxsize: int = 4096) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, Tuple[float, str, Type[Exception], str]]"
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, host: str) -> Optional[Tuple[str, Exception]]:
+        """`(reason, error)` to raise for `host`, if cached and fresh."""
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is None:
+                return None
+            expires, reason, error_type, message = entry
+            if expires <= monotonic():
+                del self._entries[host]
+                return None
+        return reason, error_type(message)
+
+    def put(self, host: str, reason: str, error: Exception) -> None:
+        with self._lock:
+            entries = self._entries
+            entries.pop(host, None)
+            entries[host] = (monotonic() + self.ttl, reason, type(error), str(error))
+            while len(entries) > self.maxsize:
+                entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+@lru_cache(maxsize=32)
+def get_negative_cache(
+    classifier: AddressClassifier, ttl: float, maxsize: int
+) -> NegativeCache:
+    """One cache per classifier: blocked verdicts depend on its ranges."""
+    return NegativeCache(ttl, maxsize)
+
+
+def resolve_all(host: str) -> List[str]:
+    """Every A and AAAA record of `host`."""
+    infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    return list(dict.fromkeys(str(info[4][0]) for info in infos))
+
+
+def classify_hosts(
+    hosts: Iterable[str],
+    classifier: Optional[AddressClassifier] = None,
+    resolver: Resolver = resolve_all,
+    max_workers: int = 32,
+) -> Dict[str, Verdict]:
+    """Verdicts for many hosts (names or IP literals) at once.
+
+    IP literals are classified in place; names are resolved concurrently and
+    blocked when any of their addresses is.
+    """
+    classifier = classifier or get_classifier()
+    verdicts: Dict[str, Verdict] = {}
+    names = []
+    for host in dict.fromkeys(h.lower() for h in hosts):
+        if not host:
+            verdicts[host] = "invalid"
+        elif is_internal_name(host):
+            verdicts[host] = "blocked"
+        else:
+            try:
+                verdicts[host] = "blocked" if classifier.is_blocked(host) else "ok"
+            except ValueError:
+                names.append(host)
+    if names:
+        from concurrent.futures import ThreadPoolExecutor
+
+        def resolve(host: str) -> Verdict:
+            try:
+                addresses = resolver(host)
+            except (OSError, UnicodeError):
+                return "unresolved"
+            if not addresses:
+                return "unresolved"
+            return "blocked" if any(classifier.blocked(addresses)) else "ok"
+
+        workers = max(1, min(max_workers, len(names)))
+        with ThreadPoolExecutor(workers, "http_wrap-classify") as pool:
+            verdicts.update(zip(names, pool.map(resolve, names)))
+    return verdicts
+
+
+def classify_urls(
+    urls: Iterable[Any],
+    classifier: Optional[AddressClassifier] = None,
+    resolver: Resolver = resolve_all,
+    max_workers: int = 32,
+) -> List[Verdict]:
+    """Verdict for each url, resolving each distinct host once."""
+    from urllib.parse import urlsplit
+
+    hosts = []
+    for url in urls:
+        try:
+            hosts.append((urlsplit(str(url)).hostname or "").lower())
+        except ValueError:
+            hosts.append("")
+    verdicts = classify_hosts(
+        [host for host in hosts if host], classifier, resolver, max_workers
+    )
+    return [verdicts[host] if host else "invalid" for host in hosts]
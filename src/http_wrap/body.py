@@ -0,0 +1,212 @@
+import mmap
+from typing import Any, AsyncIterator, Iterable, Iterator, List, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class ResponseTooLargeError(Exception):
+    """Raised when a response body exceeds the configured max_body_size."""
+
+    pass
+
+
+class BodyLimits:
+    __slots__ = ("max_size", "spool_threshold", "spool_dir", "chunk_size")
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        spool_threshold: Optional[int] = None,
+        spool_dir: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> None:
+        self.max_size = max_size
+        self.spool_threshold = spool_threshold
+        self.spool_dir = spool_dir
+        self.chunk_size = chunk_size
+
+
+class SpooledBody:
+    """Response body kept in an anonymous temporary file, mapped read-only."""
+
+    __slots__ = ("_mmap", "view")
+
+    def __init__(self, file: Any) -> None:
+        file.flush()
+        self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._mmap)
+
+    def __len__(self) -> int:
+        return len(self.view)
+
+    def __bytes__(self) -> bytes:
+        return self.view.tobytes()
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        return str(self.view, encoding, errors)
+
+    def close(self) -> None:
+        self.view.release()
+        try:
+            self._mmap.close()
+        except BufferError:  # slices of the view still alive: unmapped when freed
+            pass
+
+
+Body = Union[bytes, SpooledBody]
+
+
+def body_view(body: Body) -> Union[bytes, memoryview]:
+    return body.view if isinstance(body, SpooledBody) else body
+
+
+def close_body(body: Optional[Body]) -> None:
+    if isinstance(body, SpooledBody):
+        body.close()
+
+
+def check_declared_length(response: Any, limits: BodyLimits) -> None:
+    if limits.max_size is None:
+        return
+    value = getattr(response, "headers", {}).get("Content-Length")
+    if value and value.isdigit() and int(value) > limits.max_size:
+        raise ResponseTooLargeError(
+            f"Response declares {value} bytes, over max_body_size "
+            f"({limits.max_size} bytes)"
+        )
+
+
+class BodyAccumulator:
+    """Collects body chunks, enforcing max_size and spooling past the threshold."""
+
+    __slots__ = ("_limits", "_chunks", "_size", "_file")
+
+    def __init__(self, limits: BodyLimits) -> None:
+        self._limits = limits
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._file: Any = None
+
+    def feed(self, chunk: bytes) -> None:
+        self._size += len(chunk)
+        limits = self._limits
+        if limits.max_size is not None and self._size > limits.max_size:
+            self.discard()
+            raise ResponseTooLargeError(
+                f"Response body exceeds max_body_size ({limits.max_size} bytes)"
+            )
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+        self._chunks.append(chunk)
+        if limits.spool_threshold is not None and self._size > limits.spool_threshold:
+            import tempfile  # only needed once a body crosses the threshold
+
+            self._file = tempfile.TemporaryFile(dir=limits.spool_dir)
+            self._file.writelines(self._chunks)
+            self._chunks.clear()
+
+    def finish(self) -> Body:
+        if self._file is None:
+            return b"".join(self._chunks)
+        try:
+            return SpooledBody(self._file)
+        finally:
+            self._file.close()  # the mapping outlives the descriptor
+
+    def discard(self) -> None:
+        self._chunks.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_chunks(chunks: Iterable[bytes], limits: BodyLimits) -> Body:
+    accumulator = BodyAccumulator(limits)
+    for chunk in chunks:
+        accumulator.feed(chunk)
+    return accumulator.finish()
+
+
+async def aread_chunks(chunks: AsyncIterator[bytes], limits: BodyLimits) -> Body:
+    accumulator = BodyAccumulator(limits)
+    async for chunk in chunks:
+        accumulator.feed(chunk)
+    return accumulator.finish()
+
+
+def iter_sync_chunks(response: Any, chunk_size: int) -> Iterator[bytes]:
+    iter_bytes = getattr(response, "iter_bytes", None)  # httpx
+    if iter_bytes is not None:
+        return iter_bytes(chunk_size)
+    return response.iter_content(chunk_size)  # requests
+
+
+def iter_async_chunks(response: Any, chunk_size: int) -> AsyncIterator[bytes]:
+    aiter_bytes = getattr(response, "aiter_bytes", None)  # httpx
+    if aiter_bytes is not None:
+        return aiter_bytes(chunk_size)
+    return response.content.iter_chunked(chunk_size)  # aiohttp
+
+
+class PendingBody:
+    """The first chunks of a body, read ahead, and the rest still on the wire."""
+
+    __slots__ = ("head", "rest")
+
+    def __init__(self, head: List[bytes], rest: AsyncIterator[bytes]) -> None:
+        self.head = head
+        self.rest = rest
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        head, self.head = self.head, []
+        for chunk in head:
+            yield chunk
+        async for chunk in self.rest:
+            yield chunk
+
+
+async def anext_or_empty(chunks: Any) -> bytes:
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return b""
+
+
+async def aread_head(
+    response: Any, max_size: int, limits: Optional[BodyLimits]
+) -> Tuple[Optional[Body], Optional[PendingBody]]:
+    """Read a body of unknown length, stopping once it goes over `max_size`.
+
+    Returns the whole body, or a `PendingBody` for bodies that went over. At
+    most `max_size + 1` bytes are read from aiohttp; httpx yields chunks as
+    they arrive, so up to one of them past `max_size`.
+    """
+    chunk_size = DEFAULT_CHUNK_SIZE if limits is None else limits.chunk_size
+    accumulator = None if limits is None else BodyAccumulator(limits)
+    reader = getattr(response, "content", None)
+    if limits is None and isinstance(reader, bytes):  # httpx, read already
+        return reader, None
+    aiohttp = callable(getattr(reader, "iter_chunked", None))
+    chunks = None if aiohttp else response.aiter_bytes().__aiter__()
+    head: List[bytes] = []
+    size = 0
+    while size <= max_size:
+        if aiohttp:
+            chunk = await reader.read(min(chunk_size, max_size + 1 - size))
+        else:
+            chunk = await anext_or_empty(chunks)
+        if not chunk:
+            break
+        head.append(chunk)
+        size += len(chunk)
+        if accumulator is not None:
+            accumulator.feed(chunk)  # enforces max_body_size
+    else:
+        if accumulator is not None:
+            accumulator.discard()
+        rest = reader.iter_chunked(chunk_size) if aiohttp else chunks
+        return None, PendingBody(head, rest)
+    if accumulator is None:
+        return b"".join(head), None
+    return accumulator.finish(), None
@@ -0,0 +1,232 @@
+"""Async backends driven from sync code through a background event loop.
+
+One daemon thread per process runs an event loop (`shared_loop()`). A
+`BridgedClient` owns an async client proxy (aiohttp or httpx.AsyncClient)
+living on that loop; its sync methods submit the request coroutine to the
+loop and wait for it, while `submit()` and `batch()` return
+`concurrent.futures.Future`s at once, so one sync thread can keep thousands
+of requests in flight. Other coroutine methods of the proxy (`download`,
+`warmup`...) are run on the loop and waited for as well; `paginate`, an async
+iterator, stays async-only. None of them may be called from the loop thread.
+
+Responses are read in full on the loop and handed back as sync
+`ResponseProxy`s (`content`, `text` and `json()` need no awaiting). The
+caller's context variables (e.g. `request_context()`) follow each request.
+"""
+
+import asyncio
+import inspect
+import os
+import threading
+from concurrent.futures import Future
+from contextvars import Context, copy_context
+from functools import partial
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from http_wrap.configs import RedactHeaders
+from http_wrap.interfaces import WrapURL, httpmethod
+from http_wrap.proxies import AsyncResponseProxy, ResponseProxy
+
+
+class EventLoopThread:
+    def __init__(self, name: str = "http_wrap-loop") -> None:
+        self.loop = asyncio.new_event_loop()
+        self.pid = os.getpid()
+        started = threading.Event()
+        self.thread = threading.Thread(
+            target=self._run, args=(started,), name=name, daemon=True
+        )
+        self.thread.start()
+        started.wait()
+
+    def _run(self, started: threading.Event) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(started.set)
+        self.loop.run_forever()
+
+    def check_caller(self) -> None:
+        """Refuse to wait for the loop from its own thread: that would deadlock."""
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("Cannot wait for the bridge loop from its own thread")
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run `coro` on the loop and wait for its result."""
+        self.check_caller()
+        return self.submit([coro])[0].result(timeout)
+
+    def submit(self, coros: Sequence[Awaitable[Any]]) -> List["Future[Any]"]:
+        """Schedule `coros` as tasks with a single wake-up of the loop."""
+        futures: List["Future[Any]"] = [Future() for _ in coros]
+        context = copy_context()
+        self.loop.call_soon_threadsafe(self._start, coros, futures, context)
+        return futures
+
+    def _start(
+        self,
+        coros: Sequence[Awaitable[Any]],
+        futures: List["Future[Any]"],
+        context: Context,
+    ) -> None:
+        for coro, future in zip(coros, futures):
+            if not future.set_running_or_notify_cancel():
+                coro.close()  # type: ignore[attr-defined]
+                continue
+            # the task copies the current context: the caller's, not the loop's
+            task = context.run(self.loop.create_task, coro)
+            task.add_done_callback(_copy_result(future))
+            future.add_done_callback(_cancel_task(self.loop, task))
+
+    def stop(self) -> None:
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def _copy_result(future: "Future[Any]") -> Callable[["asyncio.Task[Any]"], None]:
+    def copy(task: "asyncio.Task[Any]") -> None:
+        if future.done():
+            return
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    return copy
+
+
+def _cancel_task(
+    loop: asyncio.AbstractEventLoop, task: "asyncio.Task[Any]"
+) -> Callable[["Future[Any]"], None]:
+    def cancel(future: "Future[Any]") -> None:
+        if future.cancelled() and not loop.is_closed():
+            loop.call_soon_threadsafe(task.cancel)
+
+    return cancel
+
+
+_shared: Optional[EventLoopThread] = None
+_shared_lock = threading.Lock()
+
+
+def shared_loop() -> EventLoopThread:
+    """The process' bridge loop, started on first use (and again after fork)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None or _shared.pid != os.getpid():
+            _shared = EventLoopThread()
+        return _shared
+
+
+class BridgedResponseProxy(ResponseProxy):
+    """Sync view of a response read in full on the bridge loop."""
+
+    encoding = AsyncResponseProxy.encoding  # aiohttp only has get_encoding()
+
+    @property
+    def text(self) -> str:
+        return self._self_body.decode(self.encoding, "replace")
+
+
+class BridgedClient:
+    """Sync facade over an async client proxy running on an `EventLoopThread`."""
+
+    def __init__(
+        self, proxy: Any, loop_thread: EventLoopThread, redact: RedactHeaders
+    ) -> None:
+        self._proxy = proxy
+        self._loop_thread = loop_thread
+        self._redact = redact
+
+    async def _request(
+        self, method: str, url: Union[str, WrapURL], args: Any, kwargs: Any
+    ) -> ResponseProxy:
+        response = await self._proxy.request(method, url, *args, **kwargs)
+        try:
+            body = await response._body()
+            response._self_body = None  # handed over, not unmapped by release()
+        finally:
+            await response.release()
+        bridged = BridgedResponseProxy(response.__wrapped__, self._redact, body)
+        # the async proxy already trimmed the history per history_mode
+        bridged._self_history = response._self_history
+        bridged._self_original_url = response.original_url
+        return bridged
+
+    def submit(
+        self, method: httpmethod, url: Union[str, WrapURL], *args: Any, **kwargs: Any
+    ) -> "Future[ResponseProxy]":
+        return self._loop_thread.submit([self._request(method, url, args, kwargs)])[0]
+
+    def batch(
+        self,
+        urls: Iterable[Union[str, WrapURL]],
+        method: httpmethod = "get",
+        **kwargs: Any,
+    ) -> List["Future[ResponseProxy]"]:
+        """One future per url, all requests started on the loop at once."""
+        coros = [self._request(method, url, (), kwargs) for url in urls]
+        return self._loop_thread.submit(coros)
+
+    def request(
+        self, method: httpmethod, url: Union[str, WrapURL], *args: Any, **kwargs: Any
+    ) -> ResponseProxy:
+        self._loop_thread.check_caller()
+        return self.submit(method, url, *args, **kwargs).result()
+
+    def get(self, url: Union[str, WrapURL], **kwargs: Any) -> ResponseProxy:
+        return self.request("get", url, **kwargs)
+
+    def post(self, url: Union[str, WrapURL], **kwargs: Any) -> ResponseProxy:
+        return self.request("post", url, **kwargs)
+
+    def put(self, url: Union[str, WrapURL], **kwargs: Any) -> ResponseProxy:
+        return self.request("put", url, **kwargs)
+
+    def patch(self, url: Union[str, WrapURL], **kwargs: Any) -> ResponseProxy:
+        return self.request("patch", url, **kwargs)
+
+    def delete(self, url: Union[str, WrapURL], **kwargs: Any) -> ResponseProxy:
+        return self.request("delete", url, **kwargs)
+
+    def head(self, url: Union[str, WrapURL], **kwargs: Any) -> ResponseProxy:
+        return self.request("head", url, **kwargs)
+
+    def options(self, url: Union[str, WrapURL], **kwargs: Any) -> ResponseProxy:
+        return self.request("options", url, **kwargs)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        async def collect() -> Dict[str, Any]:
+            return self._proxy.pool_stats()
+
+        return self._loop_thread.run(collect())
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._proxy, name)
+        if not callable(attr):
+            return attr
+        return partial(self._call, name, attr)
+
+    def _call(
+        self, name: str, method: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        # other proxy methods (download, warmup...): coroutines run on the loop
+        result = method(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return self._loop_thread.run(result)
+        if inspect.isasyncgen(result):
+            raise TypeError(f"{name}() is async-only, use the async client proxy")
+        return result
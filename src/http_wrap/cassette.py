@@ -0,0 +1,193 @@
+"""Record and replay of request/response pairs, for reproducible benchmarks.
+
+A `Cassette` set as `HTTPWrapConfig.record_to` captures every response of
+the client proxy (headers as redacted by `sanitize_resp_header`) with its
+upstream time (send + read), its URL stripped of credentials as by
+`hooks.sanitize_url`. `save()` writes it as JSON lines, gzipped when the path
+ends in `.gz`; `sessionmaker()` / `async_sessionmaker()` of a loaded cassette
+serve the recorded responses back through `make_client_session`, waiting the
+recorded time multiplied by `scale`; requests are matched on their redacted URL.
+
+Bodies the proxy did not read (streamed responses, async bodies over
+`preload_limit`) are recorded empty.
+"""
+
+import base64
+import json
+import threading
+from dataclasses import dataclass
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Tuple,
+)
+from urllib.parse import parse_qsl, urlsplit
+
+from http_wrap.body import body_view
+from http_wrap.hooks import sanitize_url
+from http_wrap.metrics import RequestEvent
+
+if TYPE_CHECKING:
+    from http_wrap.download import PathLike
+    from http_wrap.mock import (
+        AsyncFlavor,
+        MockReply,
+        MockRequest,
+        MockTransport,
+        SyncFlavor,
+    )
+
+RequestKey = Tuple[str, str, str, Tuple[Tuple[str, str], ...]]
+
+# bodies are recorded decoded: the framing of the original response is stale
+FRAMING_HEADERS = frozenset(("content-encoding", "content-length", "transfer-encoding"))
+
+
+@dataclass(frozen=True)
+class Interaction:
+    method: str
+    url: str
+    status: int
+    headers: Tuple[Tuple[str, str], ...]
+    body: bytes
+    elapsed: float  # upstream seconds, send + read
+
+    def to_json(self) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "method": self.method,
+            "url": self.url,
+            "status": self.status,
+            "headers": [list(item) for item in self.headers],
+            "elapsed": round(self.elapsed, 6),
+        }
+        try:
+            data["body"] = self.body.decode("utf-8")
+        except UnicodeDecodeError:
+            data["body_b64"] = base64.b64encode(self.body).decode("ascii")
+        return data
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "Interaction":
+        if "body_b64" in data:
+            body = base64.b64decode(data["body_b64"])
+        else:
+            body = data.get("body", "").encode("utf-8")
+        return cls(
+            data["method"],
+            data["url"],
+            data["status"],
+            tuple((k, v) for k, v in data["headers"]),
+            body,
+            data.get("elapsed", 0.0),
+        )
+
+
+def request_key(method: str, url: str) -> RequestKey:
+    """Method, host, path and sorted query: backends order params differently."""
+    parts = urlsplit(url)
+    query = tuple(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return method.upper(), parts.netloc.lower(), parts.path or "/", query
+
+
+def recorded_body(proxy: Any, streamed: bool) -> bytes:
+    if streamed:
+        return b""
+    body = proxy._self_body
+    if body is not None:
+        return bytes(body_view(body))
+    if hasattr(proxy, "_self_decoder"):  # async: an unread body stays unread
+        return b""
+    return bytes(proxy.__wrapped__.content or b"")
+
+
+def open_cassette(path: "PathLike", mode: str) -> Any:
+    if str(path).endswith(".gz"):
+        import gzip
+
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    def __init__(self, interactions: Iterable[Interaction] = ()) -> None:
+        self.interactions: List[Interaction] = list(interactions)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.interactions)
+
+    def record(self, event: RequestEvent, proxy: Any, streamed: bool) -> None:
+        headers = getattr(proxy, "headers", None) or {}
+        interaction = Interaction(
+            event.method.upper(),
+            sanitize_url(str(proxy.original_url)),
+            int(proxy.status_code),
+            tuple((str(k), str(v)) for k, v in headers.items()),
+            recorded_body(proxy, streamed),
+            event.send + event.read,
+        )
+        with self._lock:
+            self.interactions.append(interaction)
+
+    def save(self, path: "PathLike") -> None:
+        with self._lock:
+            interactions = list(self.interactions)
+        with open_cassette(path, "w") as file:
+            for interaction in interactions:
+                file.write(json.dumps(interaction.to_json(), separators=(",", ":")))
+                file.write("\n")
+
+    @classmethod
+    def load(cls, path: "PathLike") -> "Cassette":
+        with open_cassette(path, "r") as file:
+            return cls(
+                Interaction.from_json(json.loads(line)) for line in file if line.strip()
+            )
+
+    def transport(self, scale: float = 1.0) -> "MockTransport":
+        """A mock transport answering each request with the next interaction
+        recorded for it, cycling through them when a request repeats."""
+        from http_wrap.mock import MockReply, MockTransport, reply
+
+        replies: Dict[RequestKey, List["MockReply"]] = {}
+        for item in self.interactions:
+            headers = {
+                k: v for k, v in item.headers if k.lower() not in FRAMING_HEADERS
+            }
+            headers["content-length"] = str(len(item.body))
+            replies.setdefault(request_key(item.method, item.url), []).append(
+                MockReply(item.status, item.body, headers, item.elapsed * scale)
+            )
+        served: Dict[RequestKey, int] = {}
+        lock = threading.Lock()
+        transport = MockTransport(sleep=scale > 0)
+
+        @transport.route("*", "*")
+        def replay(request: "MockRequest") -> "MockReply":
+            key = request_key(request.method, sanitize_url(request.url))
+            recorded = replies.get(key)
+            if not recorded:
+                message = f"Nothing recorded for {request.method} {request.url}"
+                return reply(404, message)
+            with lock:
+                index = served.get(key, 0)
+                served[key] = index + 1
+            return recorded[index % len(recorded)]
+
+        return transport
+
+    def sessionmaker(
+        self, flavor: "SyncFlavor" = "requests", scale: float = 1.0
+    ) -> Callable[..., Any]:
+        return self.transport(scale).sessionmaker(flavor)
+
+    def async_sessionmaker(
+        self, flavor: "AsyncFlavor" = "aiohttp", scale: float = 1.0
+    ) -> Callable[..., Awaitable[Any]]:
+        return self.transport(scale).async_sessionmaker(flavor)
+
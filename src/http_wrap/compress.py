@@ -0,0 +1,178 @@
+"""Opt-in compression of request bodies, per host and route.
+
+Bodies of known length are compressed when they reach the rule's
+`min_size`; streamed bodies (file objects, iterators, async iterators) are
+compressed incrementally as they are sent. Every compressed body reports
+`http_wrap.compress.bytes_in` / `bytes_out` (counters), `ratio` (gauge) and
+`cpu` (timing, thread CPU seconds) tagged with codec and host.
+"""
+
+import json as jsonlib
+from collections.abc import AsyncIterable, Mapping
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from time import thread_time
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    Literal,
+    Optional,
+    Sequence,
+)
+from urllib.parse import urlsplit
+
+from http_wrap.metrics import Metric, MetricSink, metric_tags
+from http_wrap.upload import iterate_chunks, known_length
+
+Codec = Literal["gzip", "zstd"]
+
+
+@dataclass(frozen=True)
+class CompressionRule:
+    host: str = "*"
+    path: str = "*"
+    codec: Codec = "gzip"
+    level: Optional[int] = None
+    min_size: int = 1024
+
+    def matches(self, host: str, path: str) -> bool:
+        return fnmatchcase(host, self.host) and fnmatchcase(path, self.path)
+
+
+def find_rule(
+    rules: Sequence[CompressionRule], url: Any
+) -> Optional[CompressionRule]:
+    parts = urlsplit(str(url))
+    host, path = (parts.hostname or "").lower(), parts.path or "/"
+    for rule in rules:
+        if rule.matches(host, path):
+            return rule
+    return None
+
+
+class Compressor:
+    """Incremental compressor keeping the byte counts and CPU time it used."""
+
+    __slots__ = ("codec", "bytes_in", "bytes_out", "cpu", "_compress", "_flush")
+
+    def __init__(self, codec: Codec, level: Optional[int] = None) -> None:
+        self.codec = codec
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu = 0.0
+        if codec == "gzip":
+            import zlib
+
+            obj = zlib.compressobj(6 if level is None else level, zlib.DEFLATED, 31)
+            self._compress, self._flush = obj.compress, obj.flush
+        elif codec == "zstd":
+            try:
+                import zstandard
+            except ImportError as exc:
+                raise ImportError(
+                    "zstd compression needs the `zstandard` package "
+                    "(pip install http-wrap[zstd])"
+                ) from exc
+            obj = zstandard.ZstdCompressor(level=3 if level is None else level)
+            zobj = obj.compressobj()
+            self._compress, self._flush = zobj.compress, zobj.flush
+        else:
+            raise ValueError(f"Unsupported compression codec: {codec!r}")
+
+    def compress(self, chunk: bytes) -> bytes:
+        start = thread_time()
+        out = self._compress(chunk)
+        self.cpu += thread_time() - start
+        self.bytes_in += len(chunk)
+        self.bytes_out += len(out)
+        return out
+
+    def flush(self) -> bytes:
+        start = thread_time()
+        out = self._flush()
+        self.cpu += thread_time() - start
+        self.bytes_out += len(out)
+        return out
+
+    def report(self, sink: Optional[MetricSink], host: str) -> None:
+        if sink is None:
+            return
+        tags = metric_tags(codec=self.codec, host=host)
+        sink(Metric("http_wrap.compress.bytes_in", self.bytes_in, "counter", tags))
+        sink(Metric("http_wrap.compress.bytes_out", self.bytes_out, "counter", tags))
+        ratio = self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+        sink(Metric("http_wrap.compress.ratio", ratio, "gauge", tags))
+        sink(Metric("http_wrap.compress.cpu", self.cpu, "timing", tags))
+
+
+def compress_chunks(
+    chunks: Iterable[bytes], compressor: Compressor, done: Any
+) -> Iterator[bytes]:
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+    done()
+
+
+async def acompress_chunks(
+    chunks: AsyncIterator[bytes], compressor: Compressor, done: Any
+) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+    done()
+
+
+def compress_request(
+    rule: CompressionRule,
+    url: Any,
+    kwargs: Mapping[str, Any],
+    sink: Optional[MetricSink] = None,
+) -> Mapping[str, Any]:
+    """Return request kwargs with the body compressed by `rule`, if it applies."""
+    headers: Dict[str, Any] = dict(kwargs.get("headers") or {})
+    if any(k.lower() == "content-encoding" for k in headers):
+        return kwargs  # already encoded by the caller
+    key = "content" if kwargs.get("content") is not None else "data"
+    body = kwargs.get(key)
+    if kwargs.get("json") is not None:
+        body = jsonlib.dumps(kwargs["json"]).encode("utf-8")
+        if not any(k.lower() == "content-type" for k in headers):
+            headers["Content-Type"] = "application/json"
+    if body is None or kwargs.get("files") is not None:
+        return kwargs  # multipart stays as it is
+    if isinstance(body, (Mapping, list, tuple)):
+        return kwargs  # so do form fields
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+
+    length = known_length(body)
+    if length is not None and length < rule.min_size:
+        return kwargs
+
+    compressor = Compressor(rule.codec, rule.level)
+    host = urlsplit(str(url)).hostname or ""
+
+    def done() -> None:
+        compressor.report(sink, host)
+
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        compressed: Any = compressor.compress(body) + compressor.flush()
+        done()
+    elif isinstance(body, AsyncIterable):
+        compressed = acompress_chunks(body.__aiter__(), compressor, done)
+    else:
+        compressed = compress_chunks(iterate_chunks(body), compressor, done)
+
+    headers = {k: v for k, v in headers.items() if k.lower() != "content-length"}
+    headers["Content-Encoding"] = rule.codec
+    prepared = {k: v for k, v in kwargs.items() if k not in ("json", "content")}
+    prepared.update(data=compressed, headers=headers)
+    return prepared
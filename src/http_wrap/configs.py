@@ -1,11 +1,14 @@
 # --------------------- Config --------------
 
+import logging
 from collections.abc import Mapping
 from dataclasses import dataclass, field
+from functools import partial
 from typing import (
+    TYPE_CHECKING,
     Any,
-    Callable,
     List,
+    Literal,
     Optional,
     Protocol,
     Sequence,
@@ -14,10 +17,27 @@ from typing import (
     runtime_checkable,
 )
 
-from http_wrap.hooks import check_consistency, raise_on_internal_address, validate_url
+from http_wrap.addresses import get_classifier, get_negative_cache
+from http_wrap.compress import CompressionRule
+from http_wrap.hooks import (
+    check_consistency,
+    extract_hostname,
+    raise_on_internal_address,
+    validate_url,
+)
 from http_wrap.interfaces import ALLOWED_METHODS, WrapURL, httpmethod
+from http_wrap.limiter import ConcurrencyLimit
+from http_wrap.metrics import RequestListener, emit_metric
+from http_wrap.scheduler import SchedulerConfig
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from http_wrap.cassette import Cassette
 
 RedactHeaders = Tuple[List[str], List[str], List[str], List[str]]
+# redirect history of response proxies: backend responses, `Hop` tuples or nothing
+HistoryMode = Literal["full", "summary", "none"]
 
 
 @runtime_checkable
@@ -35,11 +55,33 @@ class LoggerProtocol(Protocol):
 
 
 class NullLogger(LoggerProtocol):
-    def __getattr__(self, name: str) -> Callable[..., Any]:
-        def noop(*args: Any, **kwargs: Any) -> None:
-            pass
+    __slots__ = ()
+
+    def debug(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def info(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def warning(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def error(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def exception(
+        self, msg: Any, *args: Any, exc_info: Any = True, **kwargs: Any
+    ) -> None:
+        pass
+
+    def critical(self, msg: Any, *args: Any, **kwargs: Any) -> None:
+        pass
 
-        return noop
+    def log(self, level: int, msg: Any, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    def isEnabledFor(self, level: int) -> bool:
+        return False
 
 
 @dataclass(frozen=True)
@@ -48,18 +90,46 @@ class HTTPWrapConfig:
     validate_url: bool = field(default=True)
     check_request_consistency: bool = field(default=True)
     proxy_response: bool = field(default=True)
-    sanitize_auth: bool = field(default=True)  # FALTA
+    sanitize_auth: bool = field(default=True)
 
     max_redirects: int = field(default=20)  # FALTA
     default_timeout: float = field(default=5)  # FALTA
 
     allowed_methods: Sequence[httpmethod] = field(default=ALLOWED_METHODS)
     sanitize_resp_header: RedactHeaders = field(default=([], [], [], []))
+    history_mode: HistoryMode = field(default="full")
     trusted_domains: Optional[Sequence[str]] = None  # FALTA
+    deny_cidrs: Sequence[str] = field(default=())
+    allow_cidrs: Sequence[str] = field(default=())
+    negative_cache_ttl: Optional[float] = field(default=30.0)
+    negative_cache_size: int = field(default=4096)
 
     logger: LoggerProtocol = field(default_factory=NullLogger)
+    log_level: int = field(default=logging.INFO)
+    log_error_level: int = field(default=logging.WARNING)
+    log_sample_every: int = field(default=1)
     default_cert: Optional[List[str]] = field(default_factory=list)  # FALTA
 
+    listeners: Sequence[RequestListener] = field(default=())
+
+    preload_limit: Optional[int] = field(default=8 * 1024 * 1024)
+    decode_offload_threshold: Optional[int] = field(default=1024 * 1024)
+    decode_executor: Optional["Executor"] = None
+    decode_process_threshold: int = field(default=32 * 1024 * 1024)
+    decode_process_executor: Optional["Executor"] = None
+
+    max_body_size: Optional[int] = None
+    spool_threshold: Optional[int] = None
+    spool_dir: Optional[str] = None
+
+    compress_requests: Sequence[CompressionRule] = field(default=())
+
+    concurrency_limit: Optional[ConcurrencyLimit] = None
+    scheduler: Optional[SchedulerConfig] = None
+    count_pool_requests: bool = field(default=False)
+
+    record_to: Optional["Cassette"] = None
+
 
 def run_check_config(
     method: httpmethod,
@@ -69,18 +139,33 @@ def run_check_config(
     config: HTTPWrapConfig,
 ) -> Tuple[Sequence[Any], Mapping[str, Any]]:
 
-    if not config.allow_internal:
-        raise_on_internal_address(url)
     if config.validate_url:
-        validate_url(url)
-
-    check_consistency(
-        method=method,
-        params=kwargs.get("params", None),
-        json=kwargs.get("json", None),
-        data=kwargs.get("data", None),
-        files=kwargs.get("file", None),
-        allowed_methods=config.allowed_methods,
-        redirects=config.max_redirects > 0,
-    )
+        validate_url(str(url))
+    if not config.allow_internal:
+        classifier = get_classifier(tuple(config.deny_cidrs), tuple(config.allow_cidrs))
+        negative_cache = (
+            get_negative_cache(
+                classifier, config.negative_cache_ttl, config.negative_cache_size
+            )
+            if config.negative_cache_ttl
+            else None
+        )
+        raise_on_internal_address(
+            extract_hostname(str(url)),
+            classifier,
+            negative_cache,
+            partial(emit_metric, config.listeners) if config.listeners else None,
+        )
+
+    if config.check_request_consistency:
+        check_consistency(
+            method=method,
+            params=kwargs.get("params", None),
+            json=kwargs.get("json", None),
+            data=kwargs.get("data", None),
+            files=kwargs.get("files", None),
+            allowed_methods=config.allowed_methods,
+            redirects=config.max_redirects > 0,
+            content=kwargs.get("content", None),
+        )
     return args, kwargs
@@ -0,0 +1,95 @@
+import json as jsonlib
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from http_wrap.metrics import Metric, MetricSink, metric_tags
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+DEFAULT_OFFLOAD_THRESHOLD = 1024 * 1024
+DEFAULT_PROCESS_THRESHOLD = 32 * 1024 * 1024
+
+
+class BodyDecoder:
+    """Decodes async response bodies, moving large ones off the event loop.
+
+    Bodies of at least `threshold` bytes are decoded in `executor` (the loop's
+    default thread pool when None). JSON bodies of at least
+    `process_threshold` bytes go to `process_executor` when one is given, as
+    a thread still competes with the loop for the GIL.
+    """
+
+    __slots__ = (
+        "threshold",
+        "executor",
+        "process_threshold",
+        "process_executor",
+        "counts",
+        "_sink",
+    )
+
+    def __init__(
+        self,
+        threshold: Optional[int] = DEFAULT_OFFLOAD_THRESHOLD,
+        executor: Optional["Executor"] = None,
+        process_threshold: int = DEFAULT_PROCESS_THRESHOLD,
+        process_executor: Optional["Executor"] = None,
+        sink: Optional[MetricSink] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.executor = executor
+        self.process_threshold = process_threshold
+        self.process_executor = process_executor
+        self.counts: Dict[str, int] = {"inline": 0, "thread": 0, "process": 0}
+        self._sink = sink
+
+    def with_sink(self, sink: MetricSink) -> "BodyDecoder":
+        decoder = BodyDecoder(
+            self.threshold,
+            self.executor,
+            self.process_threshold,
+            self.process_executor,
+            sink,
+        )
+        decoder.counts = self.counts
+        return decoder
+
+    def _route(self, size: int, can_use_process: bool) -> str:
+        if self.threshold is None or size < self.threshold:
+            return "inline"
+        if (
+            can_use_process
+            and self.process_executor is not None
+            and size >= self.process_threshold
+        ):
+            return "process"
+        return "thread"
+
+    def _record(self, route: str, kind: str, size: int) -> None:
+        self.counts[route] += 1
+        if self._sink is not None:
+            tags = metric_tags(route=route, format=kind)
+            self._sink(Metric("http_wrap.decode.calls", 1, "counter", tags))
+            self._sink(Metric("http_wrap.decode.bytes", size, "counter", tags))
+
+    async def _run(self, executor: Optional["Executor"], fn: Any, *args: Any) -> Any:
+        import asyncio
+
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+    async def json(self, body: bytes, **kwargs: Any) -> Any:
+        # keyword arguments (object_hook...) may not survive pickling
+        route = self._route(len(body), can_use_process=not kwargs)
+        self._record(route, "json", len(body))
+        if route == "inline":
+            return jsonlib.loads(body, **kwargs)
+        if route == "process":
+            return await self._run(self.process_executor, jsonlib.loads, body)
+        return await self._run(self.executor, lambda: jsonlib.loads(body, **kwargs))
+
+    async def text(self, body: bytes, encoding: str, errors: str = "replace") -> str:
+        route = self._route(len(body), can_use_process=False)
+        self._record(route, "text", len(body))
+        if route == "inline":
+            return body.decode(encoding, errors)
+        return await self._run(self.executor, body.decode, encoding, errors)
@@ -0,0 +1,383 @@
+"""Resumable, optionally parallel, downloads straight to a file.
+
+The body is written to `<path>.part`; progress is kept next to it in
+`<path>.part.json` when a download fails, so the next call for the same url
+resumes with `Range` + `If-Range` instead of starting over. When the server
+advertises `Accept-Ranges: bytes` and `parts > 1`, the file is preallocated
+and split in byte ranges fetched concurrently, each written at its offset.
+"""
+
+import json as jsonlib
+import os
+import threading
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    BinaryIO,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
+
+from http_wrap.body import DEFAULT_CHUNK_SIZE, iter_async_chunks, iter_sync_chunks
+from http_wrap.interfaces import WrapURL
+
+if TYPE_CHECKING:
+    from http_wrap.proxies import AsyncClientProxy, ClientProxy
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed or resumed consistently."""
+
+    pass
+
+
+class DownloadChangedError(DownloadError):
+    """The resource changed during a parallel download: its parts are discarded."""
+
+
+class DownloadResult:
+    __slots__ = ("path", "size", "validator", "parts", "resumed_from")
+
+    def __init__(
+        self,
+        path: str,
+        size: int,
+        validator: Optional[str],
+        parts: int,
+        resumed_from: int,
+    ) -> None:
+        self.path = path
+        self.size = size
+        self.validator = validator
+        self.parts = parts
+        self.resumed_from = resumed_from
+
+    def __repr__(self) -> str:
+        return (
+            f"DownloadResult({self.path!r}, size={self.size}, parts={self.parts}, "
+            f"resumed_from={self.resumed_from})"
+        )
+
+
+class DownloadState:
+    """Byte ranges of one download as `[start, end, written]`, `end` inclusive.
+
+    A single range with `end=None` is an open ended stream of unknown size.
+    """
+
+    __slots__ = ("url", "validator", "size", "ranges", "path")
+
+    def __init__(
+        self,
+        url: str,
+        path: str,
+        validator: Optional[str] = None,
+        size: Optional[int] = None,
+        ranges: Optional[List[List[Any]]] = None,
+    ) -> None:
+        self.url = url
+        self.path = path
+        self.validator = validator
+        self.size = size
+        self.ranges: List[List[Any]] = ranges or [[0, None, 0]]
+
+    @property
+    def part_path(self) -> str:
+        return self.path + ".part"
+
+    @property
+    def state_path(self) -> str:
+        return self.path + ".part.json"
+
+    @property
+    def written(self) -> int:
+        return sum(r[2] for r in self.ranges)
+
+    @classmethod
+    def load(cls, url: str, path: str) -> Optional["DownloadState"]:
+        state = cls(url, path)
+        try:
+            with open(state.state_path) as f:
+                data = jsonlib.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("url") != url or not os.path.exists(state.part_path):
+            return None
+        state.validator = data.get("validator")
+        state.size = data.get("size")
+        state.ranges = data["ranges"]
+        if len(state.ranges) == 1:
+            # a single stream is written in order: the file knows the progress
+            state.ranges[0][2] = os.path.getsize(state.part_path)
+        return state
+
+    def save(self) -> None:
+        data = {
+            "url": self.url,
+            "validator": self.validator,
+            "size": self.size,
+            "ranges": self.ranges,
+        }
+        with open(self.state_path, "w") as f:
+            jsonlib.dump(data, f)
+
+    def split(self, size: int, parts: int) -> None:
+        step = -(-size // parts)
+        self.size = size
+        self.ranges = [
+            [start, min(start + step, size) - 1, 0] for start in range(0, size, step)
+        ]
+
+    def prepare(self) -> None:
+        with open(self.part_path, "ab") as f:
+            if self.size is not None and len(self.ranges) > 1:
+                f.truncate(self.size)  # preallocate, ranges write at their offset
+                self.save()
+
+    def finish(self) -> DownloadResult:
+        size = os.path.getsize(self.part_path)
+        if self.size is not None and size != self.size:
+            raise DownloadError(f"Expected {self.size} bytes, got {size}")
+        os.replace(self.part_path, self.path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        return DownloadResult(self.path, size, self.validator, len(self.ranges), 0)
+
+    def discard(self) -> None:
+        for name in (self.part_path, self.state_path):
+            if os.path.exists(name):
+                os.remove(name)
+
+
+def identity_headers(headers: Optional[Mapping[str, str]]) -> Dict[str, str]:
+    """`headers` asking for the body as stored: sizes and ranges count its bytes.
+
+    Backends ask for gzip by default and decode it while streaming, which
+    would make Content-Length and Content-Range disagree with what is written.
+    """
+    merged = {
+        k: v for k, v in (headers or {}).items() if k.lower() != "accept-encoding"
+    }
+    merged["Accept-Encoding"] = "identity"
+    return merged
+
+
+def range_headers(
+    state: DownloadState, rng: List[Any], headers: Optional[Mapping[str, str]]
+) -> Dict[str, str]:
+    start, end, written = rng
+    merged = identity_headers(headers)
+    offset = start + written
+    if offset or end is not None:
+        merged["Range"] = f"bytes={offset}-{'' if end is None else end}"
+        if state.validator:
+            merged["If-Range"] = state.validator
+    return merged
+
+
+def content_range_start(response: Any) -> Optional[int]:
+    """First byte of a `Content-Range: bytes <first>-<last>/<total>` header."""
+    unit, _, spec = response.headers.get("content-range", "").partition(" ")
+    first = spec.partition("-")[0].strip()
+    return int(first) if unit == "bytes" and first.isdigit() else None
+
+
+def accept_response(state: DownloadState, rng: List[Any], response: Any) -> bool:
+    """Check the status of a range response; False when there is nothing to read."""
+    status = response.status_code
+    if status == 206:
+        offset = rng[0] + rng[2]
+        if content_range_start(response) != offset:
+            content_range = response.headers.get("content-range")
+            raise DownloadError(
+                f"{state.url} answered Content-Range {content_range!r} "
+                f"to a range starting at byte {offset}"
+            )
+        return True
+    if status == 416 and rng[1] is None and state.size == rng[0] + rng[2]:
+        return False  # resumed a body that was already complete
+    if status == 200:
+        if len(state.ranges) > 1:
+            # the caller discards the parts once the other ranges stopped
+            raise DownloadChangedError(
+                f"{state.url} changed or ignored the range request, "
+                "restart the download"
+            )
+        rng[2] = 0  # the validator changed or the server ignored Range: start over
+        with open(state.part_path, "wb"):
+            pass
+        return True
+    response.raise_for_status()
+    raise DownloadError(f"Unexpected status {status} for a range request")
+
+
+def open_at(path: str, offset: int) -> BinaryIO:
+    f = open(path, "r+b")
+    f.seek(offset)
+    return f
+
+
+def update_validators(state: DownloadState, response: Any) -> None:
+    headers = response.headers
+    validator = headers.get("etag") or headers.get("last-modified")
+    state.validator = validator or state.validator
+    if response.status_code == 206:
+        total = headers.get("content-range", "").rpartition("/")[2]
+        state.size = int(total) if total.isdigit() else state.size
+    elif response.status_code == 200:
+        length = headers.get("content-length")
+        state.size = int(length) if length and length.isdigit() else None
+
+
+def probe(state: DownloadState, response: Any, parts: int) -> None:
+    headers = response.headers
+    length = headers.get("content-length")
+    state.validator = headers.get("etag") or headers.get("last-modified")
+    ranged = "bytes" in headers.get("accept-ranges", "")
+    if parts > 1 and ranged and length and length.isdigit() and int(length) > 0:
+        state.split(int(length), parts)
+
+
+def start_download(
+    url: Union[str, WrapURL], path: PathLike, resume: bool
+) -> DownloadState:
+    path = os.fspath(path)
+    state = DownloadState.load(str(url), path) if resume else None
+    if state is None:
+        state = DownloadState(str(url), path)
+        state.discard()
+    return state
+
+
+def download(
+    client: "ClientProxy",
+    url: Union[str, WrapURL],
+    path: PathLike,
+    parts: int = 1,
+    resume: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **kwargs: Any,
+) -> DownloadResult:
+    state = start_download(url, path, resume)
+    resumed_from = state.written
+    headers = kwargs.pop("headers", None)
+    if not resumed_from and parts > 1:
+        head = client.head(url, headers=identity_headers(headers), **kwargs)
+        probe(state, head, parts)
+    state.prepare()
+    changed = threading.Event()
+
+    def fetch(rng: List[Any]) -> None:
+        if rng[1] is not None and rng[0] + rng[2] > rng[1]:
+            return
+        response = client._stream(
+            url, headers=range_headers(state, rng, headers), **kwargs
+        )
+        try:
+            if len(state.ranges) == 1:
+                update_validators(state, response)
+            if not accept_response(state, rng, response):
+                return
+            if len(state.ranges) == 1:
+                state.save()  # keep the validator, should the process die
+            with open(state.part_path, "r+b") as f:
+                f.seek(rng[0] + rng[2])
+                for chunk in iter_sync_chunks(response.__wrapped__, chunk_size):
+                    if changed.is_set():
+                        return  # another range found the resource changed
+                    f.write(chunk)
+                    rng[2] += len(chunk)
+        except DownloadChangedError:
+            changed.set()
+            raise
+        finally:
+            response.close()
+
+    try:
+        if len(state.ranges) == 1:
+            fetch(state.ranges[0])
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+
+            with ThreadPoolExecutor(len(state.ranges)) as executor:
+                for future in [executor.submit(fetch, r) for r in state.ranges]:
+                    future.result()
+    except DownloadChangedError:
+        state.discard()  # every range has stopped writing by now
+        raise
+    except BaseException:
+        if os.path.exists(state.part_path):
+            state.save()
+        raise
+    result = state.finish()
+    result.resumed_from = resumed_from
+    return result
+
+
+async def adownload(
+    client: "AsyncClientProxy",
+    url: Union[str, WrapURL],
+    path: PathLike,
+    parts: int = 1,
+    resume: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **kwargs: Any,
+) -> DownloadResult:
+    import asyncio
+
+    state = start_download(url, path, resume)
+    resumed_from = state.written
+    headers = kwargs.pop("headers", None)
+    if not resumed_from and parts > 1:
+        head = await client.head(url, headers=identity_headers(headers), **kwargs)
+        probe(state, head, parts)
+    state.prepare()
+
+    loop = asyncio.get_running_loop()
+
+    async def fetch(rng: List[Any]) -> None:
+        if rng[1] is not None and rng[0] + rng[2] > rng[1]:
+            return
+        response = await client._stream(
+            url, headers=range_headers(state, rng, headers), **kwargs
+        )
+        try:
+            if len(state.ranges) == 1:
+                update_validators(state, response)
+            if not accept_response(state, rng, response):
+                return
+            if len(state.ranges) == 1:
+                state.save()  # keep the validator, should the process die
+            # file I/O off the loop: a slow disk must not stall other requests
+            f = await loop.run_in_executor(
+                None, open_at, state.part_path, rng[0] + rng[2]
+            )
+            try:
+                async for chunk in iter_async_chunks(response.__wrapped__, chunk_size):
+                    await loop.run_in_executor(None, f.write, chunk)
+                    rng[2] += len(chunk)
+            finally:
+                await loop.run_in_executor(None, f.close)
+        finally:
+            await response.release()
+
+    tasks = [asyncio.ensure_future(fetch(r)) for r in state.ranges]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException as exc:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if isinstance(exc, DownloadChangedError):
+            state.discard()
+        elif os.path.exists(state.part_path):
+            state.save()
+        raise
+    result = state.finish()
+    result.resumed_from = resumed_from
+    return result
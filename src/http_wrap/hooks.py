@@ -1,11 +1,20 @@
-import ipaddress
 import socket
+from collections.abc import AsyncIterable, Iterable
+from time import perf_counter
 from typing import Any, Container, Literal, Mapping, Optional, Sequence, Union, get_args
-from urllib.parse import urlparse
-
-import wrapt
-
+from urllib.parse import unquote_plus, urlparse, urlsplit, urlunsplit
+
+from http_wrap.addresses import (
+    AddressClassifier,
+    NegativeCache,
+    get_classifier,
+    is_internal_name,
+    is_not_found,
+    parse_address,
+    resolve_all,
+)
 from http_wrap.interfaces import WrapURL
+from http_wrap.metrics import Metric, MetricSink, metric_tags, record_phase
 
 httpmethod = Literal["get", "post", "put", "patch", "delete", "head"]
 ALLOWED_METHODS = get_args(httpmethod)
@@ -45,30 +54,106 @@ def sanitize_headers(
     }
 
 
+# credentials whatever the configured redaction
+AUTH_HEADERS = ("authorization", "proxy-authorization", "cookie", "set-cookie")
+SENSITIVE_PARAMS = ("token", "secret", "passw", "key", "auth", "sig", "credential")
+
+
+def redact_auth_headers(headers: dict[str, str]) -> dict[str, str]:
+    """`headers` (lower-cased names) with the credential headers redacted."""
+    return {
+        k: "<redacted>" if k in AUTH_HEADERS else v for k, v in headers.items()
+    }
+
+
+def is_sensitive_param(name: str) -> bool:
+    name = unquote_plus(name).lower()
+    return any(part in name for part in SENSITIVE_PARAMS)
+
+
+def sanitize_url(url: str) -> str:
+    """`url` without userinfo and with sensitive query values redacted."""
+    parts = urlsplit(url)
+    netloc = parts.netloc.rpartition("@")[2]
+    query = "&".join(
+        (
+            f"{name}=<redacted>"
+            if sep and is_sensitive_param(name)
+            else f"{name}{sep}{value}"
+        )
+        for name, sep, value in (
+            pair.partition("=") for pair in parts.query.split("&")
+        )
+    )
+    if netloc == parts.netloc and query == parts.query:
+        return url
+    return urlunsplit(parts._replace(netloc=netloc, query=query))
+
+
 class InternalAddressError(Exception):
     """Raised when an internal address is detected."""
 
     pass
 
 
-def raise_on_internal_address(host: str) -> None:
+def raise_on_internal_address(
+    host: str,
+    classifier: Optional[AddressClassifier] = None,
+    negative_cache: Optional[NegativeCache] = None,
+    sink: Optional[MetricSink] = None,
+) -> None:
     host = host.lower()
+    classifier = classifier or get_classifier()
 
     # Heurística por nome
-    if host == "localhost" or host.endswith(".local") or host.endswith(".internal"):
+    if is_internal_name(host):
         raise InternalAddressError(f"Blocked internal address: {host!r}")
 
     try:
-        ip_str = socket.gethostbyname(host)
-        ip = ipaddress.ip_address(ip_str)
-
-        if ip.is_private or ip.is_loopback or ip.is_link_local:
-            raise InternalAddressError(
-                f"Blocked internal IP address: {ip_str} ({host!r})"
-            )
+        parse_address(host)
+    except ValueError:
+        pass
+    else:  # IP literal, nothing to resolve
+        if classifier.is_blocked(host):
+            raise InternalAddressError(f"Blocked internal IP address: {host!r}")
+        return
+
+    if negative_cache is not None:
+        cached = negative_cache.get(host)
+        if cached is not None:
+            reason, error = cached
+            if sink is not None:
+                tags = metric_tags(reason=reason)
+                sink(Metric("http_wrap.dns.negative_hit", 1, "counter", tags))
+            raise error
 
-    except socket.gaierror as e:
-        raise ValueError(f"Unable to resolve host: {host!r}") from e
+    try:
+        start = perf_counter()
+        try:
+            addresses = resolve_all(host)
+        except (socket.gaierror, UnicodeError) as e:
+            raise ValueError(f"Unable to resolve host: {host!r}") from e
+        finally:
+            record_phase("dns", perf_counter() - start)
+
+        # every A/AAAA record counts: the backend may connect to any of them
+        for address, blocked in zip(addresses, classifier.blocked(addresses)):
+            if blocked:
+                raise InternalAddressError(
+                    f"Blocked internal IP address: {address} ({host!r})"
+                )
+    except (ValueError, InternalAddressError) as e:
+        # resolver glitches (EAI_AGAIN...) are retried on the next request
+        transient = e.__cause__ is not None and not is_not_found(e.__cause__)
+        if negative_cache is not None and not transient:
+            reason = "blocked" if isinstance(e, InternalAddressError) else "unresolved"
+            negative_cache.put(host, reason, e)
+            if sink is not None:
+                tags = metric_tags(reason=reason)
+                sink(Metric("http_wrap.dns.negative_store", 1, "counter", tags))
+                size = len(negative_cache)
+                sink(Metric("http_wrap.dns.negative_size", size, "gauge"))
+        raise
 
 
 def validate_url(url: str) -> None:
@@ -118,10 +203,11 @@ def check_consistency(
     method: str,
     json: Optional[Any],
     params: Optional[Mapping[str, str]],
-    data: Optional[Union[Mapping[str, Any], bytes]],
+    data: Optional[Any],
     files: Optional[Any],
     allowed_methods: Container[str],
     redirects: bool = True,
+    content: Optional[Any] = None,
 ) -> None:
 
     METHODS_WITH_BODY = {"post", "put", "patch"}
@@ -138,19 +224,53 @@ def check_consistency(
     can_redirect = method in METHODS_WITH_REDIRECTS
     method_upper = method.upper()
 
-    if has_body and json is None:
-        raise ValueError(f"{method_upper} request requires a body in `options.json`")
+    bodies = [
+        name
+        for name, value in (
+            ("json", json),
+            ("data", data),
+            ("files", files),
+            ("content", content),
+        )
+        if value is not None
+    ]
+
+    if has_body and not bodies:
+        raise ValueError(
+            f"{method_upper} request requires a body in "
+            "`json`, `data`, `files` or `content`"
+        )
 
-    if not has_body and json is not None:
+    if not has_body and bodies:
         raise ValueError(
             f"{method_upper} request does not support a body (use `params` if needed)"
         )
 
+    if "json" in bodies and len(bodies) > 1:
+        raise ValueError("`json` cannot be combined with `data`, `files` or `content`")
+
+    if data is not None and content is not None:
+        raise ValueError("Pass the raw body in either `data` or `content`, not both")
+
+    for name, body in (("data", data), ("content", content)):
+        if body is not None and not is_streamable(body):
+            raise TypeError(
+                f"`{name}` must be bytes, str, a mapping, a file object, "
+                f"a buffer or an (async) iterable of bytes, not {type(body).__name__}"
+            )
+
     if has_params and params is not None:
         if not isinstance(params, dict):
             raise TypeError(f"{method_upper} request expects params to be a dict")
 
 
+def is_streamable(body: Any) -> bool:
+    return (
+        isinstance(body, (Iterable, AsyncIterable, memoryview))
+        or hasattr(body, "read")
+    )
+
+
 def extract_host(url: Union[str, WrapURL]) -> str:
     return url.host if hasattr(url, "host") else getattr(url, "netloc", "")
 
@@ -160,7 +280,19 @@ def validate_client(client: Any) -> None:
         raise TypeError(
             f"{type(client).__name__} must support context manager (__enter__/__exit__)"
         )
+    validate_client_methods(client)
+
+
+def validate_async_client(client: Any) -> None:
+    if not hasattr(client, "__aenter__") or not hasattr(client, "__aexit__"):
+        raise TypeError(
+            f"{type(client).__name__} must support async context manager "
+            "(__aenter__/__aexit__)"
+        )
+    validate_client_methods(client)
+
 
+def validate_client_methods(client: Any) -> None:
     required_methods = ("request", *ALLOWED_METHODS)
 
     for method in required_methods:
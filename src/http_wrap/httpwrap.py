@@ -1,4 +1,3 @@
-import inspect
 from contextlib import (
     AbstractAsyncContextManager,
     AbstractContextManager,
@@ -8,15 +7,37 @@ from contextlib import (
     contextmanager,
 )
 from functools import partial
-from typing import Any, AsyncGenerator, Callable, Generator, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    Callable,
+    Generator,
+    Optional,
+    Union,
+)
 
-from http_wrap.configs import HTTPWrapConfig, run_check_config
-from http_wrap.hooks import validate_client
+from http_wrap.body import BodyLimits
+from http_wrap.configs import HTTPWrapConfig, NullLogger, run_check_config
+from http_wrap.decode import BodyDecoder
+from http_wrap.hooks import validate_async_client, validate_client
 from http_wrap.interfaces import HTTPWrapClient, HTTPWrapSession, RunCheck, WrapResponse
-from http_wrap.proxies import ClientProxy, ResponseProxy
+from http_wrap.logs import RequestLogger
+from http_wrap.proxies import (
+    AsyncClientProxy,
+    AsyncResponseProxy,
+    ClientProxy,
+    ResponseProxy,
+)
+from http_wrap.sessionpool import SessionPool
+
+if TYPE_CHECKING:
+    from http_wrap.bridge import BridgedClient, EventLoopThread
 
 
 def is_async_callable(fn: Any) -> bool:
+    import inspect  # only needed when a session is built, keep it off import time
+
     if inspect.iscoroutinefunction(fn):
         return True
     if hasattr(fn, "__call__"):
@@ -24,6 +45,27 @@ def is_async_callable(fn: Any) -> bool:
     return False
 
 
+def make_body_limits(configs: HTTPWrapConfig) -> Optional[BodyLimits]:
+    if configs.max_body_size is None and configs.spool_threshold is None:
+        return None
+    return BodyLimits(
+        configs.max_body_size, configs.spool_threshold, configs.spool_dir
+    )
+
+
+def make_request_logger(configs: HTTPWrapConfig) -> Optional[RequestLogger]:
+    if isinstance(configs.logger, NullLogger):
+        return None
+    return RequestLogger(
+        configs.logger,
+        configs.sanitize_resp_header,
+        sample_every=configs.log_sample_every,
+        level=configs.log_level,
+        error_level=configs.log_error_level,
+        sanitize_auth=configs.sanitize_auth,
+    )
+
+
 @contextmanager
 def http_wrap_session_factory(
     *,
@@ -40,7 +82,20 @@ def http_wrap_session_factory(
 
         prebound_run_check = partial(run_check, config=configs)
 
-        proxy = ClientProxy(client, prebound_run_check, response_proxy)
+        proxy = ClientProxy(
+            client,
+            prebound_run_check,
+            response_proxy,
+            listeners=configs.listeners,
+            request_logger=make_request_logger(configs),
+            body_limits=make_body_limits(configs),
+            compression=configs.compress_requests,
+            warmup_hosts=configs.trusted_domains or (),
+            concurrency_limit=configs.concurrency_limit,
+            scheduler=configs.scheduler,
+            recorder=configs.record_to,
+            count_pool_requests=configs.count_pool_requests,
+        )
         if hasattr(client, "__exit__"):
             stack.enter_context(client)
         yield proxy
@@ -62,7 +117,28 @@ async def async_http_wrap_session_factory(
 
         prebound_run_check = partial(run_check, config=configs)
 
-        proxy = ClientProxy(client, prebound_run_check, response_proxy)
+        proxy = AsyncClientProxy(
+            client,
+            prebound_run_check,
+            response_proxy,
+            listeners=configs.listeners,
+            request_logger=make_request_logger(configs),
+            preload_limit=configs.preload_limit,
+            check_in_executor=not configs.allow_internal,
+            decoder=BodyDecoder(
+                configs.decode_offload_threshold,
+                configs.decode_executor,
+                configs.decode_process_threshold,
+                configs.decode_process_executor,
+            ),
+            body_limits=make_body_limits(configs),
+            compression=configs.compress_requests,
+            warmup_hosts=configs.trusted_domains or (),
+            concurrency_limit=configs.concurrency_limit,
+            scheduler=configs.scheduler,
+            recorder=configs.record_to,
+            count_pool_requests=configs.count_pool_requests,
+        )
         if hasattr(client, "__aexit__"):
             await stack.enter_async_context(client)
         yield proxy
@@ -76,10 +152,9 @@ def make_client_session(
     AbstractAsyncContextManager[HTTPWrapClient],
 ]:
 
+    is_async = is_async_callable(sessionmaker)
     factory = (
-        async_http_wrap_session_factory
-        if is_async_callable(sessionmaker)
-        else http_wrap_session_factory
+        async_http_wrap_session_factory if is_async else http_wrap_session_factory
     )
 
     match, startswith, endswith, contain = configs.sanitize_resp_header
@@ -87,8 +162,69 @@ def make_client_session(
         sessionmaker=sessionmaker,
         configs=configs,
         run_check=partial(run_check_config, config=configs),
+        validate_client=validate_async_client if is_async else validate_client,
+        response_proxy=partial(
+            AsyncResponseProxy if is_async else ResponseProxy,
+            redact=(match, startswith, endswith, contain),
+            history_mode=configs.history_mode,
+        ),
+    )
+
+
+def make_pooled_client_session(
+    sessionmaker: Callable[..., Any],
+    configs: HTTPWrapConfig,
+    max_sessions: Optional[int] = None,
+    per_thread: bool = True,
+) -> AbstractContextManager[HTTPWrapClient]:
+    """A sync client proxy safe to share between threads.
+
+    Calls run on sessions of a `SessionPool`: one per live thread, or checked
+    out per call when `per_thread` is False (at most `max_sessions` of them).
+    """
+    if is_async_callable(sessionmaker):
+        raise TypeError("make_pooled_client_session needs a sync sessionmaker")
+
+    pool_maker = partial(SessionPool, sessionmaker, max_sessions, per_thread)
+    match, startswith, endswith, contain = configs.sanitize_resp_header
+    return http_wrap_session_factory(
+        sessionmaker=pool_maker,
+        configs=configs,
+        run_check=partial(run_check_config, config=configs),
         validate_client=validate_client,
         response_proxy=partial(
-            ResponseProxy, redact=(match, startswith, endswith, contain)
+            ResponseProxy,
+            redact=(match, startswith, endswith, contain),
+            history_mode=configs.history_mode,
         ),
     )
+
+
+@contextmanager
+def make_bridged_client_session(
+    sessionmaker: Callable[..., Any],
+    configs: HTTPWrapConfig,
+    loop_thread: Optional["EventLoopThread"] = None,
+) -> Generator["BridgedClient", None, None]:
+    """A sync client over an async session living on a background event loop.
+
+    The session is opened, used and closed on `loop_thread` (the process'
+    `shared_loop()` by default); `submit()` and `batch()` return futures.
+    """
+    from http_wrap.bridge import BridgedClient, shared_loop
+
+    if not is_async_callable(sessionmaker):
+        raise TypeError("make_bridged_client_session needs an async sessionmaker")
+
+    loop_thread = loop_thread or shared_loop()
+    context = make_client_session(sessionmaker, configs)
+    proxy = loop_thread.run(context.__aenter__())  # type: ignore[union-attr]
+    match, startswith, endswith, contain = configs.sanitize_resp_header
+    try:
+        yield BridgedClient(proxy, loop_thread, (match, startswith, endswith, contain))
+    except BaseException as exc:
+        exit = context.__aexit__(type(exc), exc, exc.__traceback__)  # type: ignore
+        if not loop_thread.run(exit):
+            raise
+    else:
+        loop_thread.run(context.__aexit__(None, None, None))  # type: ignore
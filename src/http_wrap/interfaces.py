@@ -1,7 +1,5 @@
 from collections.abc import Mapping
-from dataclasses import dataclass, field
 from datetime import timedelta
-from logging import Logger, LogRecord
 from types import TracebackType
 from typing import (
     Any,
@@ -0,0 +1,272 @@
+"""Adaptive per-host concurrency limits.
+
+Every host gets its own limit on in-flight requests, adjusted after each
+request from its round trip (send + read) and outcome: 5xx, 429 and
+transport errors count as drops.
+
+- `aimd` grows the limit by one per successful request while it is in use
+  and multiplies it by `backoff` on a drop (or a round trip slower than
+  `latency_threshold`).
+- `gradient` compares each round trip with a long-term average (over about
+  `rtt_window` requests): while latency stays within `tolerance` times the
+  average the limit grows by about its square root, and it shrinks
+  proportionally as latency inflates.
+
+Requests over the limit wait in FIFO order for at most `max_wait` seconds,
+then fail with `ConcurrencyLimitError`. The limit is reported as the
+`http_wrap.limiter.limit` gauge, waits as `http_wrap.limiter.wait` timings,
+rejections as the `http_wrap.limiter.rejected` counter, all tagged by host.
+
+A host's state is dropped once it has held no slot for `host_idle_ttl`
+seconds, so crawling many hosts does not grow the limiter without bound.
+
+A request keeps its slot until its body is read: streamed or not preloaded
+responses give it back once read in full, closed or released (or garbage
+collected).
+"""
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from math import sqrt
+from time import perf_counter
+from typing import Any, Deque, Dict, Literal, Optional
+
+from http_wrap.metrics import Metric, MetricSink, metric_tags, record_phase
+
+LimitAlgorithm = Literal["aimd", "gradient"]
+
+
+class ConcurrencyLimitError(Exception):
+    """Raised when a request waited `max_wait` seconds without a slot."""
+
+
+@dataclass(frozen=True)
+class ConcurrencyLimit:
+    algorithm: LimitAlgorithm = "gradient"
+    initial: int = 20
+    min_limit: int = 1
+    max_limit: int = 200
+    max_wait: Optional[float] = 1.0  # None waits as long as it takes
+    backoff: float = 0.9
+    latency_threshold: Optional[float] = None  # aimd only
+    tolerance: float = 1.5  # gradient only
+    smoothing: float = 0.2  # gradient only
+    rtt_window: int = 600  # gradient only
+    host_idle_ttl: Optional[float] = 300.0  # None keeps every host
+
+
+def is_drop(response: Any) -> bool:
+    status = getattr(response, "status_code", None) or getattr(response, "status", 0)
+    return status >= 500 or status == 429
+
+
+class Waiter:
+    """A queued thread (no loop) or task (loop) that a releaser hands a slot to."""
+
+    __slots__ = ("granted", "_event", "_loop", "_future")
+
+    def __init__(self, loop: Any = None) -> None:
+        self.granted = False
+        self._loop = loop
+        if loop is None:
+            self._event: Optional[threading.Event] = threading.Event()
+            self._future = None
+        else:
+            self._event = None
+            self._future = loop.create_future()
+
+    def wake(self) -> None:
+        if self._event is not None:
+            self._event.set()
+        else:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+class _HostLimit:
+    __slots__ = (
+        "host",
+        "limit",
+        "in_flight",
+        "long_rtt",
+        "waiters",
+        "reported",
+        "idle_since",
+    )
+
+    def __init__(self, host: str, limit: float) -> None:
+        self.host = host
+        self.limit = limit
+        self.in_flight = 0
+        self.long_rtt = 0.0
+        self.waiters: Deque[Waiter] = deque()
+        self.reported = 0
+        self.idle_since = perf_counter()
+
+    def idle(self) -> bool:
+        return not self.in_flight and not self.waiters
+
+
+class Permit:
+    __slots__ = ("host", "in_flight", "start", "_limiter")
+
+    def __init__(self, limiter: "AdaptiveLimiter", host: str, in_flight: int) -> None:
+        self._limiter = limiter
+        self.host = host
+        self.in_flight = in_flight
+        self.start = perf_counter()
+
+    def release(self, dropped: bool = False) -> None:
+        self._limiter._release(self, perf_counter() - self.start, dropped)
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self, settings: ConcurrencyLimit, sink: Optional[MetricSink] = None
+    ) -> None:
+        self.settings = settings
+        self._sink = sink
+        self._hosts: Dict[str, _HostLimit] = {}
+        self._lock = threading.Lock()
+        ttl = settings.host_idle_ttl
+        self._next_sweep = None if ttl is None else perf_counter() + ttl
+
+    def limit(self, host: str) -> int:
+        with self._lock:
+            state = self._hosts.get(host)
+            return self.settings.initial if state is None else int(state.limit)
+
+    def in_flight(self, host: str) -> int:
+        with self._lock:
+            state = self._hosts.get(host)
+            return 0 if state is None else state.in_flight
+
+    def acquire(self, host: str) -> Permit:
+        start = perf_counter()
+        waiter = self._enqueue(host, None)
+        if waiter is None:
+            return Permit(self, host, self.in_flight(host))
+        assert waiter._event is not None
+        if not waiter._event.wait(self.settings.max_wait):
+            self._give_up(host, waiter)
+        return self._granted(host, start)
+
+    async def aacquire(self, host: str) -> Permit:
+        import asyncio
+
+        start = perf_counter()
+        waiter = self._enqueue(host, asyncio.get_running_loop())
+        if waiter is None:
+            return Permit(self, host, self.in_flight(host))
+        try:
+            # unlike wait_for, wait() never swallows a cancellation of the task
+            await asyncio.wait((waiter._future,), timeout=self.settings.max_wait)
+        except asyncio.CancelledError:
+            with self._lock:
+                granted = waiter.granted
+                if not granted:
+                    self._host(host).waiters.remove(waiter)
+            if granted:  # hand the slot over to the next waiter
+                self._release(Permit(self, host, 0), None, False)
+            raise
+        if not waiter._future.done():
+            self._give_up(host, waiter)
+        return self._granted(host, start)
+
+    def _host(self, host: str) -> _HostLimit:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostLimit(host, float(self.settings.initial))
+        return state
+
+    def _enqueue(self, host: str, loop: Any) -> Optional[Waiter]:
+        with self._lock:
+            state = self._host(host)
+            if not state.waiters and state.in_flight < int(state.limit):
+                state.in_flight += 1
+                return None
+            waiter = Waiter(loop)
+            state.waiters.append(waiter)
+            return waiter
+
+    def _give_up(self, host: str, waiter: Waiter) -> None:
+        with self._lock:
+            if waiter.granted:  # the slot arrived with the timeout
+                return
+            self._host(host).waiters.remove(waiter)
+        self._emit("http_wrap.limiter.rejected", 1, "counter", host)
+        raise ConcurrencyLimitError(
+            f"No concurrency slot for {host!r} within {self.settings.max_wait}s"
+        )
+
+    def _granted(self, host: str, start: float) -> Permit:
+        waited = perf_counter() - start
+        record_phase("queue", waited)
+        self._emit("http_wrap.limiter.wait", waited, "timing", host)
+        return Permit(self, host, self.in_flight(host))
+
+    def _release(self, permit: Permit, rtt: Optional[float], dropped: bool) -> None:
+        with self._lock:
+            state = self._host(permit.host)
+            state.in_flight -= 1
+            if rtt is not None:
+                self._adjust(state, permit.in_flight, rtt, dropped)
+            woken = []
+            while state.waiters and state.in_flight < int(state.limit):
+                waiter = state.waiters.popleft()
+                waiter.granted = True
+                state.in_flight += 1
+                woken.append(waiter)
+            limit = int(state.limit)
+            changed, state.reported = limit != state.reported, limit
+            if state.idle():
+                state.idle_since = perf_counter()
+                self._sweep(state.idle_since)
+        for waiter in woken:
+            waiter.wake()
+        if changed:
+            self._emit("http_wrap.limiter.limit", limit, "gauge", permit.host)
+
+    def _sweep(self, now: float) -> None:
+        """Forget hosts idle for `host_idle_ttl`, at most once per ttl."""
+        if self._next_sweep is None or now < self._next_sweep:
+            return
+        ttl = self.settings.host_idle_ttl
+        assert ttl is not None
+        self._next_sweep = now + ttl
+        for host, state in list(self._hosts.items()):
+            if state.idle() and now - state.idle_since >= ttl:
+                del self._hosts[host]
+
+    def _adjust(
+        self, state: _HostLimit, in_flight: int, rtt: float, dropped: bool
+    ) -> None:
+        settings = self.settings
+        limit = state.limit
+        if settings.algorithm == "aimd":
+            threshold = settings.latency_threshold
+            if dropped or (threshold is not None and rtt > threshold):
+                limit *= settings.backoff
+            elif in_flight * 2 >= limit:
+                limit += 1
+        else:
+            if state.long_rtt:
+                state.long_rtt += (rtt - state.long_rtt) / settings.rtt_window
+            else:
+                state.long_rtt = rtt
+            if dropped:
+                limit *= settings.backoff
+            elif in_flight * 2 >= limit:  # not limited by the application
+                gradient = settings.tolerance * state.long_rtt / max(rtt, 1e-9)
+                gradient = max(0.5, min(1.0, gradient))
+                target = limit * gradient + sqrt(limit)
+                limit += (target - limit) * settings.smoothing
+        state.limit = max(settings.min_limit, min(settings.max_limit, limit))
+
+    def _emit(self, name: str, value: float, kind: Any, host: str) -> None:
+        if self._sink is not None:
+            self._sink(Metric(name, value, kind, metric_tags(host=host)))
@@ -0,0 +1,105 @@
+import logging
+from itertools import count
+from typing import Any, Dict, Mapping, Optional
+
+from http_wrap.configs import LoggerProtocol, RedactHeaders
+from http_wrap.hooks import redact_auth_headers, sanitize_headers, sanitize_url
+from http_wrap.metrics import RequestEvent
+
+
+class RequestLogger:
+    """Emits one structured record per request through a `LoggerProtocol`.
+
+    Successful responses are logged at `level`, one in every `sample_every`;
+    HTTP errors and exceptions are always logged at `error_level`. With
+    `sanitize_auth`, URL userinfo, sensitive query values and credential
+    headers are redacted whatever `redact` says.
+    """
+
+    __slots__ = (
+        "_logger",
+        "_redact",
+        "_sample_every",
+        "_level",
+        "_error_level",
+        "_min_level",
+        "_counter",
+        "_sanitize_auth",
+    )
+
+    def __init__(
+        self,
+        logger: LoggerProtocol,
+        redact: RedactHeaders,
+        sample_every: int = 1,
+        level: int = logging.INFO,
+        error_level: int = logging.WARNING,
+        sanitize_auth: bool = True,
+    ) -> None:
+        if sample_every < 1:
+            raise ValueError("sample_every must be >= 1")
+        self._logger = logger
+        self._redact = redact
+        self._sample_every = sample_every
+        self._level = level
+        self._error_level = error_level
+        self._min_level = min(level, error_level)
+        self._counter = count()
+        self._sanitize_auth = sanitize_auth
+
+    def enabled(self) -> bool:
+        return self._logger.isEnabledFor(self._min_level)
+
+    def log(
+        self,
+        event: RequestEvent,
+        url: str,
+        request_headers: Optional[Mapping[str, str]],
+        response: Any,
+    ) -> None:
+        failed = event.error is not None or event.status >= 400
+        level = self._error_level if failed else self._level
+        if not self._logger.isEnabledFor(level):
+            return
+        if not failed and next(self._counter) % self._sample_every:
+            return
+        if self._sanitize_auth:
+            url = sanitize_url(url)
+
+        record: Dict[str, Any] = {
+            "method": event.method.upper(),
+            "url": url,
+            "host": event.host,
+            "status": event.status,
+            "elapsed": event.total,
+            "request_headers": self._sanitize(request_headers),
+            "response_headers": self._sanitize(getattr(response, "headers", None)),
+        }
+        if event.error is not None:
+            record["error"] = repr(event.error)
+            self._logger.log(
+                level,
+                "%s %s failed after %.2fms: %r",
+                record["method"],
+                url,
+                event.total * 1000,
+                event.error,
+                exc_info=event.error,
+                extra={"http": record},
+            )
+            return
+        self._logger.log(
+            level,
+            "%s %s -> %d in %.2fms",
+            record["method"],
+            url,
+            event.status,
+            event.total * 1000,
+            extra={"http": record},
+        )
+
+    def _sanitize(self, headers: Optional[Mapping[str, str]]) -> Dict[str, str]:
+        if not headers:
+            return {}
+        sanitized = sanitize_headers(dict(headers), *self._redact)
+        return redact_auth_headers(sanitized) if self._sanitize_auth else sanitized
@@ -0,0 +1,222 @@
+"""Live proxy accounting, to find responses and clients that are kept alive.
+
+While a `MemoryTracker` is enabled every client and response proxy built is
+registered through a weak reference, so `stats()` reports how many are alive
+and roughly how many bytes they retain (bodies, headers and their redacted
+copies, redirect history). With `trace_frames > 0` tracemalloc runs as well
+and `dump()` adds the allocation sites that grew since the tracker started.
+
+`leak_check()` is meant for test suites: it fails when proxies created in
+its block are still alive once the block (e.g. a session context) exits.
+"""
+
+import gc
+import threading
+import weakref
+from contextlib import contextmanager
+from functools import partial
+from time import monotonic
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_tracker: Optional["MemoryTracker"] = None
+
+
+def _body_size(body: Any) -> int:
+    # spooled bodies live in a mapped temporary file, not on the heap
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return len(body)
+    return 0
+
+
+def _headers_size(headers: Any) -> int:
+    try:
+        return sum(len(k) + len(v) for k, v in headers.items())
+    except (AttributeError, TypeError):
+        return 0
+
+
+def _backend_size(response: Any) -> int:
+    # only bodies already in memory: reading one here would change what we measure
+    attrs = getattr(response, "__dict__", {})
+    size = _body_size(attrs.get("_content")) + _body_size(attrs.get("_body"))
+    return size + _headers_size(getattr(response, "headers", None))
+
+
+def retained_size(obj: Any) -> int:
+    """Approximate bytes kept alive by a response proxy."""
+    wrapped = getattr(obj, "__wrapped__", None)
+    if wrapped is None:
+        return 0
+    size = _body_size(getattr(obj, "_self_body", None)) + _backend_size(wrapped)
+    overrides = getattr(obj, "_self_overrides", None) or {}
+    size += _headers_size(overrides.get("headers"))
+    for previous in getattr(wrapped, "history", None) or ():
+        size += _backend_size(previous)
+    return size
+
+
+class _Live:
+    __slots__ = ("ref", "kind", "created", "origin")
+
+    def __init__(self, ref: Any, kind: str, origin: Optional[str]) -> None:
+        self.ref = ref
+        self.kind = kind
+        self.created = monotonic()
+        self.origin = origin
+
+
+class MemoryTracker:
+    def __init__(self, trace_frames: int = 0) -> None:
+        self.trace_frames = trace_frames
+        self.created: Dict[str, int] = {}
+        self._live: Dict[int, _Live] = {}
+        self._lock = threading.Lock()
+        self._baseline: Any = None
+        self._started_tracing = False
+
+    def start(self) -> None:
+        if self.trace_frames > 0:
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+                self._started_tracing = True
+            self._baseline = tracemalloc.take_snapshot()
+
+    def stop(self) -> None:
+        if self._started_tracing:
+            import tracemalloc
+
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._baseline = None
+
+    def track(self, obj: Any, kind: str) -> None:
+        origin = None
+        if self._baseline is not None:
+            import tracemalloc
+
+            traceback = tracemalloc.get_object_traceback(obj)
+            origin = str(traceback[-1]) if traceback else None
+        key = id(obj)
+        ref = weakref.ref(obj, partial(self._gone, key))
+        with self._lock:
+            self._live[key] = _Live(ref, kind, origin)
+            self.created[kind] = self.created.get(kind, 0) + 1
+
+    def _gone(self, key: int, ref: Any) -> None:
+        with self._lock:
+            live = self._live.get(key)
+            if live is not None and live.ref is ref:
+                del self._live[key]
+
+    def live(self, kind: Optional[str] = None) -> List[Any]:
+        """The tracked objects still alive."""
+        with self._lock:
+            refs = [
+                live.ref
+                for live in self._live.values()
+                if kind is None or live.kind == kind
+            ]
+        return [obj for obj in (ref() for ref in refs) if obj is not None]
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """`{kind: {"live", "created", "bytes"}}` for clients and responses."""
+        with self._lock:
+            entries = [(live.kind, live.ref) for live in self._live.values()]
+            created = dict(self.created)
+        stats = {
+            kind: {"live": 0, "created": count, "bytes": 0}
+            for kind, count in created.items()
+        }
+        for kind, ref in entries:
+            obj = ref()
+            if obj is not None:
+                stats[kind]["live"] += 1
+                stats[kind]["bytes"] += retained_size(obj)
+        return stats
+
+    def top_allocations(self, limit: int = 10) -> List[Any]:
+        """tracemalloc statistics that grew the most since `start()`."""
+        if self._baseline is None:
+            return []
+        import tracemalloc
+
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.compare_to(self._baseline, "lineno")[:limit]
+
+    def dump(self, limit: int = 10) -> str:
+        lines = []
+        for kind, stats in sorted(self.stats().items()):
+            lines.append(
+                f"{kind}: {stats['live']} live / {stats['created']} created, "
+                f"~{stats['bytes']} bytes retained"
+            )
+        now = monotonic()
+        with self._lock:
+            oldest = sorted(self._live.values(), key=lambda live: live.created)
+        for live in oldest[:limit]:
+            obj = live.ref()
+            if obj is None:
+                continue
+            where = f" from {live.origin}" if live.origin else ""
+            age = now - live.created
+            lines.append(
+                f"  {live.kind} {type(obj).__name__} alive {age:.1f}s, "
+                f"~{retained_size(obj)} bytes{where}"
+            )
+        for stat in self.top_allocations(limit):
+            lines.append(f"  {stat}")
+        return "\n".join(lines)
+
+
+def track(obj: Any, kind: str) -> None:
+    tracker = _tracker
+    if tracker is not None:
+        tracker.track(obj, kind)
+
+
+def enable_memory_tracking(trace_frames: int = 0) -> MemoryTracker:
+    """Start tracking proxies built from now on (replaces a running tracker)."""
+    global _tracker
+    disable_memory_tracking()
+    tracker = MemoryTracker(trace_frames)
+    tracker.start()
+    _tracker = tracker
+    return tracker
+
+
+def disable_memory_tracking() -> None:
+    global _tracker
+    tracker, _tracker = _tracker, None
+    if tracker is not None:
+        tracker.stop()
+
+
+def memory_tracker() -> Optional[MemoryTracker]:
+    return _tracker
+
+
+@contextmanager
+def leak_check(
+    kinds: Tuple[str, ...] = ("client", "response"), collect: bool = True
+) -> Iterator[None]:
+    """Fail (AssertionError) when proxies created in the block outlive it.
+
+    With `collect=False` proxies only kept alive by reference cycles count as
+    leaks too: they are freed late, by the cyclic garbage collector.
+    """
+    global _tracker
+    outer = _tracker
+    tracker = MemoryTracker()
+    _tracker = tracker
+    try:
+        yield
+    finally:
+        _tracker = outer
+    if collect:
+        gc.collect()
+    leaked = [obj for kind in kinds for obj in tracker.live(kind)]
+    if leaked:
+        names = ", ".join(sorted({type(obj).__name__ for obj in leaked}))
+        raise AssertionError(f"{len(leaked)} proxies outlived the block ({names})")
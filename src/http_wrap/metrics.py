@@ -0,0 +1,315 @@
+import weakref
+from contextvars import ContextVar, Token
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    runtime_checkable,
+)
+
+PHASES = ("check", "dns", "queue", "send", "read", "build", "total")
+
+
+class RequestEvent:
+    """Monotonic timings (in seconds) of one request through the client proxy.
+
+    `check` excludes the time spent on `dns`, which is reported on its own;
+    `queue` is the time spent waiting for a concurrency slot.
+    """
+
+    __slots__ = (
+        "method",
+        "host",
+        "status",
+        "error",
+        "check",
+        "dns",
+        "queue",
+        "send",
+        "read",
+        "build",
+        "total",
+    )
+
+    def __init__(self, method: str, host: str) -> None:
+        self.method = method.lower()
+        self.host = host
+        self.status = 0
+        self.error: Optional[BaseException] = None
+        self.check = 0.0
+        self.dns = 0.0
+        self.queue = 0.0
+        self.send = 0.0
+        self.read = 0.0
+        self.build = 0.0
+        self.total = 0.0
+
+    def __repr__(self) -> str:
+        timings = ", ".join(f"{p}={getattr(self, p):.6f}" for p in PHASES)
+        return (
+            f"RequestEvent({self.method.upper()} {self.host} "
+            f"status={self.status}, {timings})"
+        )
+
+
+@runtime_checkable
+class RequestListener(Protocol):
+    def on_request(self, event: RequestEvent) -> None: ...
+
+
+MetricKind = Literal["counter", "gauge", "timing"]
+Tags = Tuple[Tuple[str, str], ...]
+
+
+class Metric:
+    """A named measurement outside the request timeline (offloads, limits...).
+
+    Counters are added up, gauges keep the last value and timings (seconds)
+    go to a histogram.
+    """
+
+    __slots__ = ("name", "value", "kind", "tags")
+
+    def __init__(
+        self, name: str, value: float, kind: MetricKind = "counter", tags: Tags = ()
+    ) -> None:
+        self.name = name
+        self.value = value
+        self.kind = kind
+        self.tags = tags
+
+    def __repr__(self) -> str:
+        return f"Metric({self.name}={self.value} {self.kind} {dict(self.tags)})"
+
+
+@runtime_checkable
+class MetricListener(Protocol):
+    def on_metric(self, metric: Metric) -> None: ...
+
+
+MetricSink = Callable[[Metric], None]
+
+
+def metric_tags(**tags: str) -> Tags:
+    return tuple(sorted(tags.items()))
+
+
+def weak_sink(method: MetricSink) -> MetricSink:
+    """Sink calling a bound `method` without keeping its object alive."""
+    ref = weakref.WeakMethod(method)  # type: ignore[arg-type]
+
+    def sink(metric: Metric) -> None:
+        bound = ref()
+        if bound is not None:
+            bound(metric)
+
+    return sink
+
+
+def emit_metric(listeners: Sequence[Any], metric: Metric) -> None:
+    for listener in listeners:
+        on_metric = getattr(listener, "on_metric", None)
+        if on_metric is not None:
+            on_metric(metric)
+
+
+_current_event: ContextVar[Optional[RequestEvent]] = ContextVar(
+    "http_wrap_current_event", default=None
+)
+
+
+def current_event() -> Optional[RequestEvent]:
+    return _current_event.get()
+
+
+def set_current_event(event: Optional[RequestEvent]) -> Token:
+    return _current_event.set(event)
+
+
+def reset_current_event(token: Token) -> None:
+    _current_event.reset(token)
+
+
+def record_phase(phase: str, elapsed: float) -> None:
+    event = _current_event.get()
+    if event is not None:
+        setattr(event, phase, getattr(event, phase) + elapsed)
+
+
+class LatencyHistogram:
+    """Log-linear (HDR style) histogram of durations.
+
+    Values are stored in microseconds. Below `2 ** precision_bits` every value
+    has its own bucket; above it each power of two is split in
+    `2 ** (precision_bits - 1)` buckets, so the relative error stays below
+    `2 ** (1 - precision_bits)` for any magnitude.
+    """
+
+    __slots__ = ("_bits", "_mask", "_counts", "count", "sum", "min", "max")
+
+    def __init__(self, precision_bits: int = 7) -> None:
+        self._bits = precision_bits
+        self._mask = (1 << precision_bits) - 1
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.sum = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self._bits
+        if shift <= 0:
+            return value
+        return (shift << self._bits) | (value >> shift)
+
+    def _upper_bound(self, index: int) -> int:
+        shift = index >> self._bits
+        if shift == 0:
+            return index
+        return (((index & self._mask) + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        index = self._index(max(int(seconds * 1_000_000), 0))
+        self._counts[index] = self._counts.get(index, 0) + 1
+        if not self.count or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, percent: float) -> float:
+        if not self.count:
+            return 0.0
+        target = max(1, -(-self.count * percent // 100))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._upper_bound(index) / 1_000_000, self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other._bits != self._bits:
+            raise ValueError("Cannot merge histograms with different precision")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        if other.count:
+            self.min = other.min if not self.count else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.sum += other.sum
+
+    def summary(self, percentiles: Tuple[float, ...] = (50, 90, 99)) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            "count": self.count,
+            "min": self.min,
+            "mean": self.mean,
+            "max": self.max,
+        }
+        for p in percentiles:
+            data[f"p{p:g}"] = self.percentile(p)
+        return data
+
+
+MetricKey = Tuple[str, str]
+
+
+class MetricsAggregator(RequestListener, MetricListener):
+    """In-process listener keeping one histogram per phase, host and method."""
+
+    def __init__(self, precision_bits: int = 7) -> None:
+        self._precision_bits = precision_bits
+        self._lock = Lock()
+        self._histograms: Dict[MetricKey, Dict[str, LatencyHistogram]] = {}
+        self._status: Dict[MetricKey, Dict[int, int]] = {}
+        self._errors: Dict[MetricKey, int] = {}
+        self._values: Dict[Tuple[str, Tags], float] = {}
+        self._timings: Dict[Tuple[str, Tags], LatencyHistogram] = {}
+
+    def on_metric(self, metric: Metric) -> None:
+        key = (metric.name, metric.tags)
+        with self._lock:
+            if metric.kind == "counter":
+                self._values[key] = self._values.get(key, 0) + metric.value
+            elif metric.kind == "gauge":
+                self._values[key] = metric.value
+            else:
+                histogram = self._timings.get(key)
+                if histogram is None:
+                    histogram = LatencyHistogram(self._precision_bits)
+                    self._timings[key] = histogram
+                histogram.record(metric.value)
+
+    def value(self, name: str, **tags: str) -> float:
+        with self._lock:
+            return self._values.get((name, metric_tags(**tags)), 0)
+
+    def timing(self, name: str, **tags: str) -> LatencyHistogram:
+        with self._lock:
+            return self._timings[(name, metric_tags(**tags))]
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = {}
+            for (name, tags), value in self._values.items():
+                data.setdefault(name, {})[tags] = value
+            for (name, tags), histogram in self._timings.items():
+                data.setdefault(name, {})[tags] = histogram.summary()
+            return data
+
+    def on_request(self, event: RequestEvent) -> None:
+        key = (event.host, event.method)
+        with self._lock:
+            phases = self._histograms.get(key)
+            if phases is None:
+                phases = {p: LatencyHistogram(self._precision_bits) for p in PHASES}
+                self._histograms[key] = phases
+                self._status[key] = {}
+                self._errors[key] = 0
+            for phase, histogram in phases.items():
+                histogram.record(getattr(event, phase))
+            if event.error is not None:
+                self._errors[key] += 1
+            else:
+                status = self._status[key]
+                status[event.status] = status.get(event.status, 0) + 1
+
+    def histogram(self, host: str, method: str, phase: str = "total") -> LatencyHistogram:
+        with self._lock:
+            return self._histograms[(host, method.lower())][phase]
+
+    def keys(self) -> List[MetricKey]:
+        with self._lock:
+            return list(self._histograms)
+
+    def snapshot(self) -> Dict[MetricKey, Mapping[str, Any]]:
+        with self._lock:
+            return {
+                key: {
+                    "phases": {p: h.summary() for p, h in phases.items()},
+                    "status": dict(self._status[key]),
+                    "errors": self._errors[key],
+                }
+                for key, phases in self._histograms.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._status.clear()
+            self._errors.clear()
+            self._values.clear()
+            self._timings.clear()
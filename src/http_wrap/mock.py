@@ -0,0 +1,519 @@
+"""In-memory transport serving programmable routes, for tests and load tests.
+
+Sessions built by `MockTransport.sessionmaker()` / `async_sessionmaker()` can
+be handed to `make_client_session` and return responses of the selected
+backend flavor (`requests`, `httpx` or `aiohttp`) without touching the network.
+"""
+
+import asyncio
+import json as jsonlib
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from fnmatch import fnmatchcase
+from http import HTTPStatus
+from types import TracebackType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+from urllib.parse import urlencode, urlsplit
+
+SyncFlavor = Literal["requests", "httpx"]
+AsyncFlavor = Literal["httpx", "aiohttp"]
+
+# ----------------- latency distributions ----------------------
+
+Latency = Callable[[random.Random], float]
+
+
+def constant(seconds: float) -> Latency:
+    return lambda rng: seconds
+
+
+def uniform(low: float, high: float) -> Latency:
+    return lambda rng: rng.uniform(low, high)
+
+
+def exponential(mean: float) -> Latency:
+    return lambda rng: rng.expovariate(1 / mean) if mean > 0 else 0.0
+
+
+def lognormal(median: float, sigma: float) -> Latency:
+    mu = math.log(median)
+    return lambda rng: rng.lognormvariate(mu, sigma)
+
+
+# ----------------- requests and replies ----------------------
+
+
+@dataclass
+class MockRequest:
+    method: str
+    url: str
+    headers: Dict[str, str] = field(default_factory=dict)
+    params: Optional[Mapping[str, Any]] = None
+    json: Optional[Any] = None
+    data: Optional[Any] = None
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def path(self) -> str:
+        return urlsplit(self.url).path or "/"
+
+    @property
+    def host(self) -> str:
+        return urlsplit(self.url).hostname or ""
+
+
+@dataclass(frozen=True)
+class MockReply:
+    status: int = 200
+    body: bytes = b""
+    headers: Mapping[str, str] = field(default_factory=dict)
+    latency: float = 0.0
+
+
+Handler = Callable[[MockRequest], MockReply]
+
+
+def make_body(size: int) -> bytes:
+    if size < 16:
+        return b"x" * size
+    return b'{"data": "' + b"x" * (size - 12) + b'"}'
+
+
+def reply(
+    status: int = 200,
+    body: Union[bytes, str, None] = None,
+    json: Optional[Any] = None,
+    headers: Optional[Mapping[str, str]] = None,
+    latency: float = 0.0,
+) -> MockReply:
+    merged = dict(headers or {})
+    if json is not None:
+        payload = jsonlib.dumps(json).encode("utf-8")
+        merged.setdefault("Content-Type", "application/json")
+    elif isinstance(body, str):
+        payload = body.encode("utf-8")
+        merged.setdefault("Content-Type", "text/plain; charset=utf-8")
+    else:
+        payload = body or b""
+        if payload:
+            merged.setdefault("Content-Type", "application/octet-stream")
+    merged.setdefault("Content-Length", str(len(payload)))
+    return MockReply(status, payload, merged, latency)
+
+
+# ----------------- transport ----------------------
+
+
+class MockTransport:
+    def __init__(self, seed: Optional[int] = None, sleep: bool = True) -> None:
+        self.rng = random.Random(seed)
+        self.sleep = sleep
+        self.calls: List[MockRequest] = []
+        self._routes: List[Tuple[str, str, Handler]] = []
+        self._lock = threading.Lock()
+
+    def route(self, method: str, path: str) -> Callable[[Handler], Handler]:
+        def register(handler: Handler) -> Handler:
+            self._routes.append((method.upper(), path, handler))
+            return handler
+
+        return register
+
+    def add(
+        self,
+        method: str,
+        path: str,
+        status: int = 200,
+        body: Union[bytes, str, None] = None,
+        json: Optional[Any] = None,
+        headers: Optional[Mapping[str, str]] = None,
+        latency: Optional[Latency] = None,
+        status_mix: Optional[Mapping[int, float]] = None,
+        body_size: Union[int, Callable[[random.Random], int], None] = None,
+    ) -> None:
+        statuses = list(status_mix) if status_mix else [status]
+        weights = list(status_mix.values()) if status_mix else None
+        static = reply(status, body, json, headers)
+        bodies: Dict[int, MockReply] = {}
+
+        def handler(request: MockRequest) -> MockReply:
+            with self._lock:
+                code = self.rng.choices(statuses, weights)[0] if weights else status
+                delay = latency(self.rng) if latency else 0.0
+                size = body_size(self.rng) if callable(body_size) else body_size
+            base = static
+            if size is not None:
+                base = bodies.get(size) or bodies.setdefault(
+                    size, reply(status, make_body(size), None, headers)
+                )
+            return MockReply(code, base.body, base.headers, delay)
+
+        self.route(method, path)(handler)
+
+    def handle(self, request: MockRequest) -> MockReply:
+        with self._lock:
+            self.calls.append(request)
+        path = request.path
+        for method, pattern, handler in self._routes:
+            if method in ("*", request.method) and fnmatchcase(path, pattern):
+                return handler(request)
+        return reply(404, f"No mock route for {request.method} {path}")
+
+    def sessionmaker(self, flavor: SyncFlavor = "requests") -> Callable[..., Any]:
+        build = _BUILDERS[flavor]
+
+        def make_session(**kwargs: Any) -> MockSession:
+            return MockSession(self, build, **kwargs)
+
+        return make_session
+
+    def async_sessionmaker(
+        self, flavor: AsyncFlavor = "aiohttp"
+    ) -> Callable[..., Awaitable[Any]]:
+        build = _BUILDERS[flavor]
+
+        async def make_session(**kwargs: Any) -> MockAsyncSession:
+            return MockAsyncSession(self, build, flavor == "aiohttp", **kwargs)
+
+        return make_session
+
+
+def _make_request(
+    method: str, url: Any, base_headers: Mapping[str, str], kwargs: Dict[str, Any]
+) -> MockRequest:
+    url = str(url)
+    params = kwargs.pop("params", None)
+    if params:
+        url = f"{url}{'&' if '?' in url else '?'}{urlencode(params, doseq=True)}"
+    headers = {**base_headers, **(kwargs.pop("headers", None) or {})}
+    return MockRequest(
+        method=method.upper(),
+        url=url,
+        headers=headers,
+        params=params,
+        json=kwargs.pop("json", None),
+        data=kwargs.pop("data", None),
+        kwargs=kwargs,
+    )
+
+
+class _BaseSession:
+    def __init__(
+        self,
+        transport: MockTransport,
+        build: Callable[[MockRequest, MockReply], Any],
+        headers: Optional[Mapping[str, str]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self.transport = transport
+        self.headers = dict(headers or {})
+        self.closed = False
+        self._build = build
+
+    def _dispatch(
+        self, method: str, url: Any, kwargs: Dict[str, Any]
+    ) -> Tuple[MockRequest, MockReply]:
+        if self.closed:
+            raise RuntimeError("Session is closed")
+        request = _make_request(method, url, self.headers, kwargs)
+        return request, self.transport.handle(request)
+
+
+class MockSession(_BaseSession):
+    def request(self, method: str, url: Any, **kwargs: Any) -> Any:
+        request, mock_reply = self._dispatch(method, url, kwargs)
+        if mock_reply.latency and self.transport.sleep:
+            time.sleep(mock_reply.latency)
+        return self._build(request, mock_reply)
+
+    def get(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("GET", url, **kwargs)
+
+    def options(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("OPTIONS", url, **kwargs)
+
+    def head(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        self.closed = True
+
+    def __enter__(self) -> "MockSession":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+
+class _RequestContext:
+    """Mimics aiohttp's `_RequestContextManager`: awaitable and `async with`."""
+
+    def __init__(self, coro: Awaitable[Any]) -> None:
+        self._coro = coro
+        self._response: Any = None
+
+    def __await__(self) -> Generator[Any, None, Any]:
+        return self._coro.__await__()
+
+    async def __aenter__(self) -> Any:
+        self._response = await self._coro
+        return self._response
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self._response.release()
+
+
+class MockAsyncSession(_BaseSession):
+    def __init__(
+        self,
+        transport: MockTransport,
+        build: Callable[[MockRequest, MockReply], Any],
+        context_managed: bool,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(transport, build, **kwargs)
+        self._context_managed = context_managed
+
+    async def _request(self, method: str, url: Any, kwargs: Dict[str, Any]) -> Any:
+        request, mock_reply = self._dispatch(method, url, kwargs)
+        if mock_reply.latency and self.transport.sleep:
+            await asyncio.sleep(mock_reply.latency)
+        return self._build(request, mock_reply)
+
+    def request(self, method: str, url: Any, **kwargs: Any) -> Any:
+        coro = self._request(method, url, kwargs)
+        return _RequestContext(coro) if self._context_managed else coro
+
+    def get(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("GET", url, **kwargs)
+
+    def options(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("OPTIONS", url, **kwargs)
+
+    def head(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: Any, **kwargs: Any) -> Any:
+        return self.request("DELETE", url, **kwargs)
+
+    async def close(self) -> None:
+        self.closed = True
+
+    async def __aenter__(self) -> "MockAsyncSession":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+
+# ----------------- backend response builders ----------------------
+
+
+def _reason(status: int) -> str:
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ""
+
+
+def build_requests_response(request: MockRequest, mock_reply: MockReply) -> Any:
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    response = requests.Response()
+    response.status_code = mock_reply.status
+    response.reason = _reason(mock_reply.status)
+    response.headers = CaseInsensitiveDict(mock_reply.headers)
+    response.url = request.url
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.elapsed = timedelta(seconds=mock_reply.latency)
+    response.request = requests.Request(
+        request.method, request.url, headers=request.headers
+    ).prepare()
+    response._content = mock_reply.body
+    response._content_consumed = True  # type: ignore[attr-defined]
+    return response
+
+
+def build_httpx_response(request: MockRequest, mock_reply: MockReply) -> Any:
+    import httpx
+
+    response = httpx.Response(
+        mock_reply.status,
+        headers=dict(mock_reply.headers),
+        content=mock_reply.body,
+        request=httpx.Request(request.method, request.url, headers=request.headers),
+    )
+    response.elapsed = timedelta(seconds=mock_reply.latency)
+    return response
+
+
+class _MockStreamReader:
+    def __init__(self, body: bytes) -> None:
+        self._body = memoryview(body)
+        self._pos = 0
+
+    def at_eof(self) -> bool:
+        return self._pos >= len(self._body)
+
+    async def read(self, n: int = -1) -> bytes:
+        end = len(self._body) if n < 0 else self._pos + n
+        chunk = bytes(self._body[self._pos : end])
+        self._pos += len(chunk)
+        return chunk
+
+    async def readany(self) -> bytes:
+        return await self.read(2**16)
+
+    async def iter_chunked(self, n: int) -> Any:
+        while not self.at_eof():
+            yield await self.read(n)
+
+    async def iter_any(self) -> Any:
+        while not self.at_eof():
+            yield await self.readany()
+
+
+class MockAiohttpResponse:
+    """Duck-typed stand-in for `aiohttp.ClientResponse`."""
+
+    def __init__(self, request: MockRequest, mock_reply: MockReply) -> None:
+        from multidict import CIMultiDict, CIMultiDictProxy
+        from yarl import URL
+
+        self.method = request.method
+        self.url = self.real_url = URL(request.url)
+        self.status = mock_reply.status
+        self.reason = _reason(mock_reply.status)
+        self.headers = CIMultiDictProxy(CIMultiDict(mock_reply.headers))
+        self.raw_headers = tuple(
+            (k.encode("utf-8"), v.encode("utf-8")) for k, v in mock_reply.headers.items()
+        )
+        self.history: Tuple[Any, ...] = ()
+        self.content = _MockStreamReader(mock_reply.body)
+        self.closed = False
+        self._body = mock_reply.body
+        self._request_headers = request.headers
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("Content-Type", "application/octet-stream").split(";")[
+            0
+        ]
+
+    @property
+    def charset(self) -> Optional[str]:
+        _, _, params = self.headers.get("Content-Type", "").partition(";")
+        key, _, value = params.strip().partition("=")
+        return value.strip() if key.lower() == "charset" else None
+
+    def get_encoding(self) -> str:
+        return self.charset or "utf-8"
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: Optional[str] = None, errors: str = "strict") -> str:
+        return self._body.decode(encoding or self.get_encoding(), errors)
+
+    async def json(
+        self,
+        *,
+        encoding: Optional[str] = None,
+        loads: Callable[[str], Any] = jsonlib.loads,
+        content_type: Optional[str] = "application/json",
+    ) -> Any:
+        return loads(await self.text(encoding))
+
+    def raise_for_status(self) -> None:
+        if self.ok:
+            return
+        import aiohttp
+        from multidict import CIMultiDict, CIMultiDictProxy
+
+        self.release()
+        request_info = aiohttp.RequestInfo(
+            self.url,
+            self.method,
+            CIMultiDictProxy(CIMultiDict(self._request_headers)),
+            self.real_url,
+        )
+        raise aiohttp.ClientResponseError(
+            request_info,
+            self.history,
+            status=self.status,
+            message=self.reason,
+            headers=self.headers,
+        )
+
+    def release(self) -> None:
+        self.closed = True
+
+    def close(self) -> None:
+        self.closed = True
+
+    async def __aenter__(self) -> "MockAiohttpResponse":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        self.release()
+
+
+_BUILDERS: Dict[str, Callable[[MockRequest, MockReply], Any]] = {
+    "requests": build_requests_response,
+    "httpx": build_httpx_response,
+    "aiohttp": MockAiohttpResponse,
+}
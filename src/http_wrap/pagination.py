@@ -0,0 +1,250 @@
+"""Link header parsing and prefetching pagination.
+
+`paginate` follows `rel="next"` links (or whatever `next_page` extracts from
+a response) and fetches page N+1 in the background while the caller works on
+page N. At most `prefetch` pages are fetched ahead of the caller; with
+`prefetch=0` pages are fetched on demand. Pages fetched ahead but never
+handed out are closed when the iteration stops.
+
+The sync prefetch thread uses the client's session while the caller works:
+a plain requests or httpx session must not be used by the caller meanwhile
+(use `make_pooled_client_session` for that, or `prefetch=0`).
+"""
+
+import inspect
+from contextvars import copy_context
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+from urllib.parse import urljoin
+
+if TYPE_CHECKING:
+    from http_wrap.proxies import AsyncClientProxy, ClientProxy
+
+Links = Dict[str, Dict[str, str]]
+
+# a url, request kwargs for the same url, or None on the last page
+NextPage = Union[str, Mapping[str, Any], None]
+NextPageFn = Callable[[Any], Union[NextPage, Awaitable[NextPage]]]
+
+
+def split_links(value: str) -> List[str]:
+    """Split a Link header on the commas outside `<...>` and quoted strings."""
+    parts, start, in_url, in_quotes = [], 0, False, False
+    for i, char in enumerate(value):
+        if char == '"' and not in_url:
+            in_quotes = not in_quotes
+        elif char == "<" and not in_quotes:
+            in_url = True
+        elif char == ">" and not in_quotes:
+            in_url = False
+        elif char == "," and not in_url and not in_quotes:
+            parts.append(value[start:i])
+            start = i + 1
+    parts.append(value[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_link_header(values: List[str]) -> Links:
+    """Parse Link headers as `{rel: {"url": ..., "rel": ..., **params}}`.
+
+    Links with several relation types (`rel="next last"`) are registered under
+    each of them; links without `rel` under their url.
+    """
+    links: Links = {}
+    for value in values:
+        for link in split_links(value):
+            target, _, params = link.partition(">")
+            entry = {"url": target.strip().lstrip("<").strip()}
+            for param in params.split(";"):
+                key, sep, val = param.partition("=")
+                if sep:
+                    entry[key.strip().lower()] = val.strip().strip('"')
+            for rel in entry.get("rel", "").split() or [entry["url"]]:
+                links.setdefault(rel, entry)
+    return links
+
+
+def link_header_values(headers: Any) -> List[str]:
+    getall = getattr(headers, "getall", None)  # aiohttp keeps repeated headers
+    if getall is not None:
+        return list(getall("link", []))
+    get_list = getattr(headers, "get_list", None)  # httpx
+    if get_list is not None:
+        return list(get_list("link"))
+    return [value for key, value in headers.items() if key.lower() == "link"]
+
+
+def next_link(response: Any) -> Optional[str]:
+    url = response.links.get("next", {}).get("url")
+    return urljoin(str(response.url), url) if url else None
+
+
+def next_request(
+    page: NextPage, url: Any, kwargs: Mapping[str, Any]
+) -> Optional[Tuple[Any, Mapping[str, Any]]]:
+    if page is None:
+        return None
+    if isinstance(page, str):
+        return page, kwargs
+    return url, {**kwargs, **page}
+
+
+def paginate(
+    client: "ClientProxy",
+    url: Any,
+    method: str = "get",
+    next_page: NextPageFn = next_link,
+    prefetch: int = 1,
+    max_pages: Optional[int] = None,
+    **kwargs: Any,
+) -> Iterator[Any]:
+    def pages() -> Iterator[Any]:
+        request: Optional[Tuple[Any, Mapping[str, Any]]] = (url, kwargs)
+        count = 0
+        while request is not None and (max_pages is None or count < max_pages):
+            page_url, page_kwargs = request
+            response = client.request(method, page_url, **page_kwargs)
+            count += 1
+            request = next_request(next_page(response), page_url, page_kwargs)
+            yield response
+
+    if prefetch <= 0:
+        yield from pages()
+        return
+
+    import queue
+    import threading
+
+    buffer: "queue.Queue[Tuple[bool, Any]]" = queue.Queue()
+    slots = threading.Semaphore(prefetch)
+    stop = threading.Event()
+    lock = threading.Lock()  # no page is queued once the consumer drained
+
+    def offer(response: Any) -> bool:
+        with lock:
+            if stop.is_set():
+                return False
+            buffer.put((True, response))
+            return True
+
+    def produce() -> None:
+        error: Optional[BaseException] = None
+        try:
+            for response in pages():
+                if not offer(response):
+                    close_page(response)
+                    return
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+        except BaseException as exc:
+            error = exc
+        finally:
+            buffer.put((False, error))  # the consumer never waits forever
+
+    worker = threading.Thread(
+        target=copy_context().run, args=(produce,), name="http_wrap-paginate"
+    )
+    worker.daemon = True
+    worker.start()
+    try:
+        while True:
+            ok, item = buffer.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+            slots.release()
+    finally:
+        with lock:
+            stop.set()
+            while not buffer.empty():
+                ok, item = buffer.get_nowait()
+                if ok:
+                    close_page(item)
+
+
+def close_page(response: Any) -> None:
+    close = getattr(response, "close", None)
+    if close is not None:
+        close()
+
+
+async def arelease_page(response: Any) -> None:
+    release = getattr(response, "release", None)
+    if release is not None:
+        await release()
+
+
+async def apaginate(
+    client: "AsyncClientProxy",
+    url: Any,
+    method: str = "get",
+    next_page: NextPageFn = next_link,
+    prefetch: int = 1,
+    max_pages: Optional[int] = None,
+    **kwargs: Any,
+) -> AsyncIterator[Any]:
+    import asyncio
+
+    async def pages() -> AsyncIterator[Any]:
+        request: Optional[Tuple[Any, Mapping[str, Any]]] = (url, kwargs)
+        count = 0
+        while request is not None and (max_pages is None or count < max_pages):
+            page_url, page_kwargs = request
+            response = await client.request(method, page_url, **page_kwargs)
+            count += 1
+            page = next_page(response)
+            if inspect.isawaitable(page):
+                page = await page
+            request = next_request(page, page_url, page_kwargs)
+            yield response
+
+    if prefetch <= 0:
+        async for response in pages():
+            yield response
+        return
+
+    buffer: "asyncio.Queue[Tuple[bool, Any]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(prefetch)
+
+    async def produce() -> None:
+        try:
+            async for response in pages():
+                buffer.put_nowait((True, response))
+                await slots.acquire()
+            buffer.put_nowait((False, None))
+        except asyncio.CancelledError:
+            raise
+        except BaseException as exc:
+            buffer.put_nowait((False, exc))
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            ok, item = await buffer.get()
+            if not ok:
+                if item is not None:
+                    raise item
+                return
+            yield item
+            slots.release()
+    finally:
+        producer.cancel()
+        while not buffer.empty():
+            ok, item = buffer.get_nowait()
+            if ok:
+                await arelease_page(item)
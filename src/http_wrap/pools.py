@@ -0,0 +1,277 @@
+"""Connection pool statistics per host, read from each backend's pool.
+
+- requests: urllib3's `HTTPConnectionPool`s, which count the connections they
+  opened and the requests they served.
+- httpx: httpcore's `ConnectionPool` of each transport.
+- aiohttp: the session's `TCPConnector`.
+
+httpcore and aiohttp keep no counters. With `count_pool_requests` set,
+`instrument_pool()` wraps their pool's connection factory and request entry
+point to count opened connections and requests per host; a pool shared by
+several sessions is wrapped once and its counters shared. Hosts are keyed
+`scheme://host:port`.
+"""
+
+import threading
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from http_wrap.metrics import Metric, MetricSink, metric_tags
+from http_wrap.sessionpool import SessionPool
+
+DEFAULT_PORTS = {"http": 80, "https": 443, "ws": 80, "wss": 443}
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    host: str
+    in_use: int = 0
+    idle: int = 0
+    waiting: int = 0  # requests queued for a connection
+    opened: int = 0  # connections opened so far
+    requests: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Share of requests served by an already open connection."""
+        if not self.requests:
+            return 0.0
+        return max(0.0, (self.requests - self.opened) / self.requests)
+
+    def __add__(self, other: "PoolStats") -> "PoolStats":
+        return PoolStats(
+            self.host,
+            self.in_use + other.in_use,
+            self.idle + other.idle,
+            self.waiting + other.waiting,
+            self.opened + other.opened,
+            self.requests + other.requests,
+        )
+
+
+def host_key(scheme: Any, host: Any, port: Optional[int]) -> str:
+    if isinstance(scheme, bytes):
+        scheme = scheme.decode("ascii")
+    if isinstance(host, bytes):
+        host = host.decode("ascii")
+    return f"{scheme}://{host}:{port or DEFAULT_PORTS.get(scheme, 0)}"
+
+
+def _httpcore_key(origin: Any) -> str:
+    return host_key(origin.scheme, origin.host, origin.port)
+
+
+def _aiohttp_key(key: Any) -> str:
+    return host_key("https" if key.is_ssl else "http", key.host, key.port)
+
+
+class PoolCounters:
+    def __init__(self) -> None:
+        self.opened: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, counter: Dict[str, int], host: str) -> None:
+        with self._lock:
+            counter[host] = counter.get(host, 0) + 1
+
+
+# ----------------- instrumentation ----------------------
+
+
+def _httpx_pools(client: Any) -> Iterator[Any]:
+    transports = [getattr(client, "_transport", None)]
+    transports += list((getattr(client, "_mounts", None) or {}).values())
+    for transport in transports:
+        pool = getattr(transport, "_pool", None)
+        if pool is not None and hasattr(pool, "create_connection"):
+            yield pool
+
+
+def _wrap_httpcore(pool: Any, counters: PoolCounters) -> None:
+    create_connection = pool.create_connection
+
+    @wraps(create_connection)
+    def counted_create(origin: Any) -> Any:
+        counters.count(counters.opened, _httpcore_key(origin))
+        return create_connection(origin)
+
+    pool.create_connection = counted_create
+
+    # async pools: the coroutine is returned as is, to be awaited by httpx
+    is_async = hasattr(pool, "handle_async_request")
+    name = "handle_async_request" if is_async else "handle_request"
+    handle: Callable[..., Any] = getattr(pool, name)
+
+    @wraps(handle)
+    def counted_request(request: Any) -> Any:
+        counters.count(counters.requests, _httpcore_key(request.url.origin))
+        return handle(request)
+
+    setattr(pool, name, counted_request)
+
+
+def _wrap_aiohttp(connector: Any, counters: PoolCounters) -> None:
+    connect = connector.connect
+    create_connection = connector._create_connection
+
+    @wraps(connect)
+    async def counted_connect(req: Any, *args: Any, **kwargs: Any) -> Any:
+        counters.count(counters.requests, _aiohttp_key(req.connection_key))
+        return await connect(req, *args, **kwargs)
+
+    @wraps(create_connection)
+    async def counted_create(req: Any, *args: Any, **kwargs: Any) -> Any:
+        counters.count(counters.opened, _aiohttp_key(req.connection_key))
+        return await create_connection(req, *args, **kwargs)
+
+    connector.connect = counted_connect
+    connector._create_connection = counted_create
+
+
+def _pool_counters(
+    pool: Any, wrap: Callable[[Any, PoolCounters], None]
+) -> PoolCounters:
+    """The counters of `pool`, wrapping it on first use only."""
+    counters = getattr(pool, "_http_wrap_counters", None)
+    if counters is None:
+        counters = PoolCounters()
+        wrap(pool, counters)
+        pool._http_wrap_counters = counters
+    return counters
+
+
+def _instrument(client: Any, found: List[PoolCounters]) -> None:
+    pools = [(pool, _wrap_httpcore) for pool in _httpx_pools(client)]
+    connector = getattr(client, "connector", None)
+    if not pools and hasattr(connector, "_acquired_per_host"):
+        pools = [(connector, _wrap_aiohttp)]
+    for pool, wrap in pools:
+        counters = _pool_counters(pool, wrap)
+        if all(counters is not known for known in found):
+            found.append(counters)
+
+
+def instrument_pool(client: Any) -> Optional[List[PoolCounters]]:
+    """Count opened connections and requests of an httpx or aiohttp client
+    (or of each session a `SessionPool` opens)."""
+    found: List[PoolCounters] = []
+    if isinstance(client, SessionPool):
+        for session in client.sessions():
+            _instrument(session, found)
+        client.on_create(lambda session: _instrument(session, found))
+        return found
+    _instrument(client, found)
+    return found or None
+
+
+# ----------------- collection ----------------------
+
+
+def _merge(stats: Dict[str, PoolStats], entry: PoolStats) -> None:
+    previous = stats.get(entry.host)
+    stats[entry.host] = entry if previous is None else previous + entry
+
+
+def _urllib3_stats(session: Any) -> Dict[str, PoolStats]:
+    stats: Dict[str, PoolStats] = {}
+    for adapter in list(session.adapters.values()):
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        if pools is None:
+            continue
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            queue = getattr(pool, "pool", None)
+            if queue is None:  # closed
+                continue
+            waiting = len(queue.not_empty._waiters) if pool.block else 0
+            host = host_key(pool.scheme, pool.host, pool.port)
+            _merge(
+                stats,
+                PoolStats(
+                    host,
+                    in_use=max(0, queue.maxsize - queue.qsize()),
+                    idle=sum(1 for conn in list(queue.queue) if conn is not None),
+                    waiting=waiting,
+                    opened=pool.num_connections,
+                    requests=pool.num_requests,
+                ),
+            )
+    return stats
+
+
+def _httpcore_stats(client: Any) -> Dict[str, Tuple[int, int, int]]:
+    state: Dict[str, Tuple[int, int, int]] = {}
+    for pool in _httpx_pools(client):
+        for connection in list(pool.connections):
+            if connection.is_closed():
+                continue
+            host = _httpcore_key(connection._origin)
+            in_use, idle, waiting = state.get(host, (0, 0, 0))
+            if connection.is_idle():
+                idle += 1
+            else:
+                in_use += 1
+            state[host] = (in_use, idle, waiting)
+        for request in list(pool._requests):
+            if request.is_queued():
+                host = _httpcore_key(request.request.url.origin)
+                in_use, idle, waiting = state.get(host, (0, 0, 0))
+                state[host] = (in_use, idle, waiting + 1)
+    return state
+
+
+def _aiohttp_stats(connector: Any) -> Dict[str, Tuple[int, int, int]]:
+    state: Dict[str, Tuple[int, int, int]] = {}
+
+    def add(key: Any, in_use: int = 0, idle: int = 0, waiting: int = 0) -> None:
+        host = _aiohttp_key(key)
+        current = state.get(host, (0, 0, 0))
+        state[host] = (current[0] + in_use, current[1] + idle, current[2] + waiting)
+
+    for key, protos in list(connector._acquired_per_host.items()):
+        add(key, in_use=len(protos))
+    for key, conns in list(connector._conns.items()):
+        add(key, idle=len(conns))
+    for key, waiters in list(connector._waiters.items()):
+        add(key, waiting=len(waiters))
+    return state
+
+
+def _session_stats(client: Any) -> Dict[str, PoolStats]:
+    if hasattr(client, "adapters"):  # requests.Session
+        return _urllib3_stats(client)
+    connector = getattr(client, "connector", None)
+    if connector is not None and hasattr(connector, "_acquired_per_host"):
+        state = _aiohttp_stats(connector)
+    else:
+        state = _httpcore_stats(client)
+    return {host: PoolStats(host, *counts) for host, counts in state.items()}
+
+
+def collect_pool_stats(
+    client: Any, counters: Optional[Sequence[PoolCounters]]
+) -> Dict[str, PoolStats]:
+    sessions = client.sessions() if isinstance(client, SessionPool) else [client]
+    stats: Dict[str, PoolStats] = {}
+    for session in sessions:
+        for entry in _session_stats(session).values():
+            _merge(stats, entry)
+    for pool_counters in counters or ():
+        opened_per_host = dict(pool_counters.opened)
+        requests_per_host = dict(pool_counters.requests)
+        for host in set(opened_per_host) | set(requests_per_host):
+            opened = opened_per_host.get(host, 0)
+            requests = requests_per_host.get(host, 0)
+            _merge(stats, PoolStats(host, opened=opened, requests=requests))
+    return dict(sorted(stats.items()))
+
+
+def report_pool_stats(stats: Dict[str, PoolStats], sink: MetricSink) -> None:
+    for host, entry in stats.items():
+        tags = metric_tags(host=host)
+        for name in ("in_use", "idle", "waiting", "opened", "requests"):
+            value = getattr(entry, name)
+            sink(Metric(f"http_wrap.pool.{name}", value, "gauge", tags))
+        sink(Metric("http_wrap.pool.reuse_ratio", entry.reuse_ratio, "gauge", tags))
@@ -1,26 +1,126 @@
+import inspect
+import json as jsonlib
+import weakref
 from collections.abc import Mapping
+from contextvars import copy_context
 from datetime import timedelta
+from functools import partial
 from http import HTTPStatus
-from types import MethodType, TracebackType
-from typing import Any, Callable, Optional, Sequence, Tuple, Type, Union
+from time import perf_counter
+from types import TracebackType
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
 
 import wrapt
 
-from http_wrap.configs import RedactHeaders
-from http_wrap.hooks import extract_host, sanitize_headers
+from http_wrap.body import (
+    DEFAULT_CHUNK_SIZE,
+    Body,
+    BodyLimits,
+    PendingBody,
+    ResponseTooLargeError,
+    SpooledBody,
+    aread_chunks,
+    aread_head,
+    body_view,
+    check_declared_length,
+    close_body,
+    iter_async_chunks,
+    iter_sync_chunks,
+    read_chunks,
+)
+from http_wrap.compress import CompressionRule, compress_request, find_rule
+from http_wrap.configs import HistoryMode, RedactHeaders
+from http_wrap.decode import BodyDecoder
+from http_wrap.hooks import extract_host, extract_hostname, sanitize_headers
 from http_wrap.interfaces import (
-    ALLOWED_METHODS,
     HTTPWrapClient,
     HTTPWrapResponse,
     WrapResponse,
     WrapURL,
     httpmethod,
 )
+from http_wrap.limiter import AdaptiveLimiter, ConcurrencyLimit, is_drop
+from http_wrap.logs import RequestLogger
+from http_wrap.memory import track
+from http_wrap.metrics import (
+    Metric,
+    RequestEvent,
+    RequestListener,
+    emit_metric,
+    reset_current_event,
+    set_current_event,
+    weak_sink,
+)
+from http_wrap.pagination import (
+    Links,
+    NextPageFn,
+    apaginate,
+    link_header_values,
+    next_link,
+    paginate,
+    parse_link_header,
+)
+from http_wrap.pools import (
+    PoolStats,
+    collect_pool_stats,
+    instrument_pool,
+    report_pool_stats,
+)
+from http_wrap.scheduler import (
+    RequestScheduler,
+    SchedulerConfig,
+    Ticket,
+    pop_ticket,
+)
+from http_wrap.snapshot import ResponseSnapshot, summarize_history, take_snapshot
+from http_wrap.streams import (
+    NDJSONDecoder,
+    ServerSentEvent,
+    SSEDecoder,
+    abody_slices,
+    adecode_chunks,
+    aiter_stream_chunks,
+    body_slices,
+    decode_chunks,
+    iter_stream_chunks,
+)
+from http_wrap.upload import backend_kind, prepare_upload
+
+if TYPE_CHECKING:
+    from http_wrap.cassette import Cassette
+    from http_wrap.download import DownloadResult, PathLike
+    from http_wrap.warmup import WarmupResult
 
 
 class ResponseProxy(wrapt.ObjectProxy):
-    def __init__(self, response: Any, redact: Optional[RedactHeaders] = None) -> None:
+    def __init__(
+        self,
+        response: Any,
+        redact: Optional[RedactHeaders] = None,
+        body: Optional[Body] = None,
+        history_mode: HistoryMode = "full",
+    ) -> None:
         super().__init__(response)
+        self._self_overrides: dict[str, Any] = {}
+        self._self_body = body
+        self._self_links: Optional[Links] = None
+        self._self_original_url: Any = None
+        self._self_history: Optional[Sequence[Any]] = None
+        self._self_release: Optional[Callable[[], Any]] = None
         if not hasattr(self, "status_code"):
             self.status_code = getattr(response, "status", 0)
 
@@ -35,26 +135,32 @@ class ResponseProxy(wrapt.ObjectProxy):
         if not hasattr(self, "reason_phrase"):
             self.reason_phrase = status.phrase.upper()
 
+        # HTTPStatus.is_success & co. only exist on Python >= 3.12
+        is_success = 200 <= status < 300
+        is_redirection = 300 <= status < 400
+        is_client_error = 400 <= status < 500
+        is_server_error = 500 <= status < 600
+
         if not hasattr(self, "ok"):
-            self.ok = status.is_success or status.is_redirection
+            self.ok = is_success or is_redirection
 
         if not hasattr(self, "is_informational"):
-            self.is_informational = status.is_informational
+            self.is_informational = 100 <= status < 200
 
         if not hasattr(self, "is_success"):
-            self.is_success = status.is_success
+            self.is_success = is_success
 
         if not hasattr(self, "is_redirect"):
-            self.is_redirect = status.is_redirection
+            self.is_redirect = is_redirection
 
         if not hasattr(self, "is_client_error"):
-            self.is_client_error = status.is_client_error
+            self.is_client_error = is_client_error
 
         if not hasattr(self, "is_server_error"):
-            self.is_server_error = status.is_server_error
+            self.is_server_error = is_server_error
 
         if not hasattr(self, "is_error"):
-            self.is_error = status.is_client_error or status.is_server_error
+            self.is_error = is_client_error or is_server_error
 
         if not hasattr(self, "is_permanent_redirect"):
             self.is_permanent_redirect = (
@@ -76,16 +182,6 @@ class ResponseProxy(wrapt.ObjectProxy):
                 }
             )
 
-        if hasattr(response, "raise_for_status"):
-
-            original_raise = response.raise_for_status
-
-            def raise_for_status_sync(resp: Any) -> Any:
-                original_raise()
-                return resp
-
-            self.raise_for_status = MethodType(raise_for_status_sync, self)
-
         if hasattr(response, "headers") and not hasattr(self, "raw_headers"):
             try:
                 self.raw_headers = [
@@ -96,63 +192,720 @@ class ResponseProxy(wrapt.ObjectProxy):
                 self.raw_headers = []
 
         if redact:
-            sanitized = sanitize_headers(response.headers, *redact)
-            self.headers = sanitized
-
-        if not hasattr(self, "history"):
-            self.history = getattr(response, "history", [])
+            # kept on the proxy: backends read their own headers (decoding...)
+            self._self_overrides["headers"] = sanitize_headers(
+                response.headers, *redact
+            )
 
-        if not hasattr(self, "original_url"):
-            self.original_url = self.history[0].url if self.history else self.url
+        history = getattr(response, "history", None)
+        if history is None:
+            self._self_history = []
+        elif history_mode != "full" and history:
+            # kept on the proxy: the backend response is left as it came
+            self._self_original_url = history[0].url
+            if history_mode == "summary":
+                self._self_history = summarize_history(history)
+            else:
+                self._self_history = ()
 
         if not hasattr(self, "final_url"):
             self.final_url = self.url
 
-        if not hasattr(self, "host"):
-            self.host = extract_host(self.original_url)
-
-        if not hasattr(self, "elapsed"):
+        try:
+            has_elapsed = hasattr(self, "elapsed")
+        except RuntimeError:  # streamed httpx responses know it once read
+            has_elapsed = True
+        if not has_elapsed:
             self.elapsed = timedelta(0)
+        track(self, "response")
+
+    @property
+    def history(self) -> Sequence[Any]:
+        """Redirect history as per `history_mode` (the backend's when "full")."""
+        if self._self_history is None:
+            return self.__wrapped__.history
+        return self._self_history
+
+    @property
+    def original_url(self) -> Any:
+        if self._self_original_url is None:
+            history = self.history
+            self._self_original_url = history[0].url if history else self.url
+        return self._self_original_url
+
+    @property
+    def host(self) -> str:
+        host = getattr(self.__wrapped__, "host", None)  # aiohttp
+        return extract_host(self.original_url) if host is None else host
+
+    def raise_for_status(self) -> Any:
+        # a method, not a closure stored on the backend response: that would
+        # tie the response and its proxy in a reference cycle
+        self.__wrapped__.raise_for_status()
+        return self
+
+    def snapshot(self, share_threshold: Optional[int] = None) -> ResponseSnapshot:
+        """A detached, picklable copy of this response (body read if needed)."""
+        body = self._self_body
+        if body is None:
+            body = self.__wrapped__.content
+        return take_snapshot(self, body, share_threshold)
 
-        if not hasattr(self, "links"):
-            self.links = {}
+    @property
+    def links(self) -> Links:
+        """Link header as `{rel: {"url": ..., **params}}`, parsed on first use."""
+        if self._self_links is None:
+            headers = getattr(self.__wrapped__, "headers", None) or {}
+            self._self_links = parse_link_header(link_header_values(headers))
+        return self._self_links
+
+    def _hold(self, permits: Sequence[Any], dropped: bool) -> None:
+        """Keep the request's permits until the body is read or released."""
+        # a finalizer, so that a proxy dropped unread still frees its slots
+        self._self_release = weakref.finalize(self, release_permits, permits, dropped)
+
+    def _release_permits(self) -> None:
+        if self._self_release is not None:
+            self._self_release()
+
+    def close(self) -> None:
+        """Close the backend response, release the request's permits and unmap
+        a spooled body (its content is no longer readable)."""
+        try:
+            close_response(self.__wrapped__)
+        finally:
+            self._release_permits()
+            close_body(self._self_body)
+
+    def __enter__(self) -> "ResponseProxy":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    # a body read by the client proxy (bounded or spooled) replaces the backend's
+    @property
+    def content(self) -> Union[bytes, memoryview]:
+        if self._self_body is None:
+            try:
+                return self.__wrapped__.content
+            finally:
+                self._release_permits()
+        return body_view(self._self_body)
+
+    @property
+    def text(self) -> str:
+        if self._self_body is None:
+            try:
+                return self.__wrapped__.text
+            finally:
+                self._release_permits()
+        encoding = getattr(self.__wrapped__, "encoding", None) or "utf-8"
+        return self._self_body.decode(encoding, "replace")
+
+    def json(self, **kwargs: Any) -> Any:
+        body = self._self_body
+        if body is None:
+            try:
+                return self.__wrapped__.json(**kwargs)
+            finally:
+                self._release_permits()
+        if isinstance(body, SpooledBody):
+            return jsonlib.loads(body.decode(), **kwargs)
+        return jsonlib.loads(body, **kwargs)
+
+    def iter_ndjson(self, **kwargs: Any) -> Iterator[Any]:
+        """Newline-delimited JSON records, decoded as the body arrives."""
+        return decode_chunks(self._iter_chunks(), NDJSONDecoder(**kwargs))
+
+    def iter_events(self) -> Iterator[ServerSentEvent]:
+        """Server-Sent Events, decoded as the body arrives."""
+        return decode_chunks(self._iter_chunks(), SSEDecoder())
+
+    def _iter_chunks(self) -> Iterator[Any]:
+        if self._self_body is not None:
+            return body_slices(self._self_body)
+        chunks = iter_stream_chunks(self.__wrapped__)
+        if self._self_release is None:
+            return chunks
+        return self._release_after(chunks)
+
+    def _release_after(self, chunks: Iterator[Any]) -> Iterator[Any]:
+        try:
+            yield from chunks
+        finally:
+            self._release_permits()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name.startswith("_self_") or name == "__wrapped__":
+            super().__setattr__(name, value)
+            return
+        try:
+            setattr(self.__wrapped__, name, value)
+        except AttributeError:
+            # read-only on the backend response (e.g. aiohttp's reified headers)
+            self._self_overrides[name] = value
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_self_"):
+            raise AttributeError(name)
+        try:
+            return self._self_overrides[name]
+        except KeyError:
+            return getattr(self.__wrapped__, name)
+
+
+RunCheckFn = Callable[
+    [httpmethod, Union[str, WrapURL], Sequence[Any], Mapping[str, Any]],
+    Tuple[Sequence[Any], Mapping[str, Any]],
+]
+
+DEFAULT_PRELOAD_LIMIT = 8 * 1024 * 1024
+
+
+def release_permits(permits: Sequence[Any], dropped: bool) -> None:
+    for permit in reversed(permits):
+        permit.release(dropped)
+
+
+def settle_permits(
+    proxy: Any, permits: Sequence[Any], dropped: bool, unread: bool
+) -> None:
+    """Release `permits` now, or hand them to a proxy whose body is unread."""
+    hold = getattr(proxy, "_hold", None) if unread and permits else None
+    if hold is None:
+        release_permits(permits, dropped)
+    else:
+        hold(permits, dropped)
+
+
+def close_response(response: Any) -> None:
+    if getattr(response, "raw", True) is None:  # requests.Response built in memory
+        return
+    close = getattr(response, "close", None)
+    if close is not None:
+        close()
+
+
+def is_httpx_client(client: Any) -> bool:
+    return hasattr(client, "build_request") and hasattr(client, "send")
+
+
+def build_httpx_request(
+    client: Any, method: str, url: Union[str, WrapURL], kwargs: Mapping[str, Any]
+) -> Tuple[Any, Mapping[str, Any]]:
+    """Split request kwargs between httpx's `build_request` and `send`."""
+    params = {k: v for k, v in kwargs.items() if k != "url"}
+    send_kwargs = {
+        k: params.pop(k) for k in ("auth", "follow_redirects") if k in params
+    }
+    return client.build_request(method.upper(), url, **params), send_kwargs
+
+
+def content_length(response: Any) -> Optional[int]:
+    value = getattr(response, "headers", {}).get("Content-Length")
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+async def read_body(response: Any) -> bytes:
+    aread = getattr(response, "aread", None)  # httpx
+    if aread is not None:
+        return await aread()
+    return await response.read()  # aiohttp
+
+
+async def release_response(response: Any) -> None:
+    aclose = getattr(response, "aclose", None)  # httpx
+    if aclose is not None:
+        await aclose()
+        return
+    release = getattr(response, "release", None)  # aiohttp
+    if release is not None:
+        result = release()
+        if inspect.isawaitable(result):
+            await result
+
+
+class AsyncResponseProxy(ResponseProxy):
+    """`WrapAsyncResponse` over an awaited aiohttp or httpx response.
+
+    `content()`, `text()` and `json()` are coroutines for every backend and
+    serve the preloaded body when the client proxy already read it.
+    """
+
+    def __init__(
+        self,
+        response: Any,
+        redact: Optional[RedactHeaders] = None,
+        body: Optional[Body] = None,
+        decoder: Optional[BodyDecoder] = None,
+        limits: Optional[BodyLimits] = None,
+        history_mode: HistoryMode = "full",
+        pending: Optional[PendingBody] = None,
+    ) -> None:
+        super().__init__(response, redact, body, history_mode)
+        self._self_decoder = decoder
+        self._self_limits = limits
+        self._self_pending = pending
+
+    @property
+    def encoding(self) -> str:
+        get_encoding = getattr(self.__wrapped__, "get_encoding", None)  # aiohttp
+        if get_encoding is not None:
+            try:
+                return get_encoding()
+            except RuntimeError:
+                return "utf-8"
+        return getattr(self.__wrapped__, "encoding", None) or "utf-8"
+
+    async def _body(self) -> Body:
+        if self._self_body is None:
+            try:
+                self._self_body = await self._read_body()
+            finally:
+                self._release_permits()
+        return self._self_body
+
+    async def _read_body(self) -> Body:
+        limits = self._self_limits
+        pending, self._self_pending = self._self_pending, None
+        if pending is not None:
+            chunks = pending.chunks()
+            if limits is None:
+                return b"".join([chunk async for chunk in chunks])
+            return await aread_chunks(chunks, limits)
+        if limits is None:
+            return await read_body(self.__wrapped__)
+        chunks = iter_async_chunks(self.__wrapped__, limits.chunk_size)
+        return await aread_chunks(chunks, limits)
+
+    async def snapshot(  # type: ignore[override]
+        self, share_threshold: Optional[int] = None
+    ) -> ResponseSnapshot:
+        return take_snapshot(self, await self._body(), share_threshold)
+
+    async def content(self) -> Union[bytes, memoryview]:  # type: ignore[override]
+        return body_view(await self._body())
+
+    async def read(self) -> Union[bytes, memoryview]:
+        return await self.content()
+
+    async def text(  # type: ignore[override]
+        self, encoding: Optional[str] = None
+    ) -> str:
+        body = await self._body()
+        if self._self_decoder is not None:
+            return await self._self_decoder.text(body, encoding or self.encoding)
+        return body.decode(encoding or self.encoding, "replace")
+
+    async def json(self, **kwargs: Any) -> Any:
+        body = await self._body()
+        if isinstance(body, SpooledBody):
+            body = body.decode()  # type: ignore[assignment]
+        if self._self_decoder is not None:
+            return await self._self_decoder.json(body, **kwargs)
+        return jsonlib.loads(body, **kwargs)
+
+    def aiter_ndjson(self, **kwargs: Any) -> AsyncIterator[Any]:
+        return adecode_chunks(self._aiter_chunks(), NDJSONDecoder(**kwargs))
+
+    def aiter_events(self) -> AsyncIterator[ServerSentEvent]:
+        return adecode_chunks(self._aiter_chunks(), SSEDecoder())
+
+    def _aiter_chunks(self) -> AsyncIterator[Any]:
+        if self._self_body is not None:
+            return abody_slices(self._self_body)
+        pending, self._self_pending = self._self_pending, None
+        if pending is None:
+            chunks = aiter_stream_chunks(self.__wrapped__)
+        else:
+            chunks = pending.chunks()
+        if self._self_release is None:
+            return chunks
+        return self._arelease_after(chunks)
+
+    async def _arelease_after(self, chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            self._release_permits()
+
+    async def release(self) -> None:
+        try:
+            await release_response(self.__wrapped__)
+        finally:
+            self._release_permits()
+            close_body(self._self_body)
+
+    async def __aenter__(self) -> "AsyncResponseProxy":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.release()
+
+
+def _make_wrapped_method(method_name: str) -> Callable[..., HTTPWrapResponse]:
+    def wrapped_method(
+        self: "ClientProxy", *args: Any, **kwargs: Any
+    ) -> HTTPWrapResponse:
+        url = args[0] if args else kwargs.get("url", "")
+        original = getattr(self.__wrapped__, method_name)
+        return self._send(method_name, url, args, kwargs, original)
+
+    wrapped_method.__name__ = method_name
+    return wrapped_method
+
+
+def _make_async_wrapped_method(
+    method_name: str,
+) -> Callable[..., Awaitable[HTTPWrapResponse]]:
+    async def wrapped_method(
+        self: "AsyncClientProxy", *args: Any, **kwargs: Any
+    ) -> HTTPWrapResponse:
+        url = args[0] if args else kwargs.get("url", "")
+        original = getattr(self.__wrapped__, method_name)
+        return await self._send(method_name, url, args, kwargs, original)
+
+    wrapped_method.__name__ = method_name
+    return wrapped_method
 
 
 class ClientProxy(wrapt.ObjectProxy):
     def __init__(
         self,
         wrapped: HTTPWrapClient,
-        run_check: Callable[
-            [httpmethod, Union[str, WrapURL], Sequence[Any], Mapping[str, Any]],
-            Tuple[Sequence[Any], Mapping[str, Any]],
-        ],
-        response_proxy: Callable[[Any], WrapResponse],
+        run_check: RunCheckFn,
+        response_proxy: Callable[..., WrapResponse],
+        listeners: Sequence[RequestListener] = (),
+        request_logger: Optional[RequestLogger] = None,
+        body_limits: Optional[BodyLimits] = None,
+        compression: Sequence[CompressionRule] = (),
+        warmup_hosts: Sequence[str] = (),
+        concurrency_limit: Optional[ConcurrencyLimit] = None,
+        scheduler: Optional[SchedulerConfig] = None,
+        recorder: Optional["Cassette"] = None,
+        count_pool_requests: bool = False,
     ) -> None:
         super().__init__(wrapped)
-        self._run_check = run_check
-        self._resp_proxy = response_proxy
-        self._inject_methods()
+        # wrapt forwards plain attribute assignment to the wrapped object
+        self._self_run_check = run_check
+        self._self_resp_proxy = response_proxy
+        self._self_listeners: List[RequestListener] = list(listeners)
+        self._self_request_logger = request_logger
+        self._self_body_limits = body_limits
+        self._self_backend = backend_kind(wrapped)
+        self._self_compression = tuple(compression)
+        self._self_warmup_hosts = tuple(warmup_hosts)
+        self._self_limiter = (
+            AdaptiveLimiter(concurrency_limit, weak_sink(self._emit_metric))
+            if concurrency_limit is not None
+            else None
+        )
+        self._self_scheduler = (
+            RequestScheduler(scheduler, weak_sink(self._emit_metric))
+            if scheduler is not None
+            else None
+        )
+        self._self_gated = self._self_limiter is not None or scheduler is not None
+        self._self_recorder = recorder
+        # wraps backend pool internals: only when asked for
+        self._self_pool_counters = (
+            instrument_pool(wrapped) if count_pool_requests else None
+        )
+        track(self, "client")
+
+    get = _make_wrapped_method("get")
+    post = _make_wrapped_method("post")
+    put = _make_wrapped_method("put")
+    patch = _make_wrapped_method("patch")
+    delete = _make_wrapped_method("delete")
+    head = _make_wrapped_method("head")
+    options = _make_wrapped_method("options")
 
     def request(
         self, method: httpmethod, url: Union[str, WrapURL], *args: Any, **kwargs: Any
     ) -> HTTPWrapResponse:
-        nargs, nkwargs = self._run_check(method, url, args, kwargs)
-        response = self.__wrapped__.request(method, url, *nargs, **nkwargs)
-        return self._resp_proxy(response)
+        original = partial(self.__wrapped__.request, method, url)
+        return self._send(method, url, args, kwargs, original)
+
+    def download(
+        self,
+        url: Union[str, WrapURL],
+        path: "PathLike",
+        parts: int = 1,
+        resume: bool = True,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **kwargs: Any,
+    ) -> "DownloadResult":
+        """GET `url` into `path`, resuming a failed download of the same url.
 
-    def _inject_methods(self) -> None:
-        for method in ALLOWED_METHODS:
-            setattr(self, method, self._make_wrapped_method(method))
+        With `parts > 1` and a server accepting byte ranges, the body is
+        fetched as `parts` concurrent ranges (threads) into a preallocated file.
+        """
+        from http_wrap.download import download
 
-    def _make_wrapped_method(self, method_name: str):
-        def wrapped_method(self, *args, **kwargs):
-            url = args[0] if args else kwargs.get("url", "")
-            nargs, nkwargs = self._run_check(method_name, url, args, kwargs)
-            original = getattr(self.__wrapped__, method_name)
-            response = original(*nargs, **nkwargs)
-            return self._resp_proxy(response)
+        return download(self, url, path, parts, resume, chunk_size, **kwargs)
+
+    def paginate(
+        self,
+        url: Union[str, WrapURL],
+        method: httpmethod = "get",
+        next_page: NextPageFn = next_link,
+        prefetch: int = 1,
+        max_pages: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Iterator[HTTPWrapResponse]:
+        """Iterate over the pages of `url`, following `rel="next"` links.
+
+        `next_page(response)` may instead return the next url, request kwargs
+        for the same url (e.g. `{"params": {"cursor": ...}}`) or None on the
+        last page. Up to `prefetch` pages are fetched ahead by a thread,
+        which uses the session meanwhile: do not make other requests on a
+        plain session while iterating (or pass `prefetch=0`).
+        """
+        return paginate(self, url, method, next_page, prefetch, max_pages, **kwargs)
+
+    def warmup(
+        self,
+        hosts: Optional[Sequence[str]] = None,
+        connections_per_host: int = 1,
+        method: httpmethod = "head",
+    ) -> "WarmupResult":
+        """Resolve `hosts` and open `connections_per_host` pooled connections
+        to each (the config's `trusted_domains` by default)."""
+        from http_wrap.warmup import warmup
+
+        if hosts is None:
+            hosts = self._self_warmup_hosts
+        return warmup(self, hosts, connections_per_host, method)
+
+    def pool_stats(self) -> Dict[str, PoolStats]:
+        """Connections in use, idle and waited for per host (`scheme://host:port`),
+        with the connections opened and requests served so far (counted by
+        requests' urllib3 itself, by httpx and aiohttp only with the
+        `count_pool_requests` config).
+
+        Also reported to the listeners as `http_wrap.pool.*` gauges.
+        """
+        stats = collect_pool_stats(self.__wrapped__, self._self_pool_counters)
+        if self._self_listeners:
+            report_pool_stats(stats, self._emit_metric)
+        return stats
+
+    def stream(self, url: Union[str, WrapURL], **kwargs: Any) -> HTTPWrapResponse:
+        """GET `url` leaving the body unread, for `iter_ndjson()` and co."""
+        return self._stream(url, **kwargs)
+
+    def _stream(
+        self, url: Union[str, WrapURL], method: str = "get", **kwargs: Any
+    ) -> Any:
+        opener = partial(self._open_stream, method=method)
+        return self._send(method, url, (url,), {**kwargs, "stream": True}, opener)
+
+    def _open_stream(
+        self,
+        url: Union[str, WrapURL],
+        *args: Any,
+        stream: bool = True,
+        method: str = "get",
+        **kwargs: Any,
+    ) -> Any:
+        wrapped = self.__wrapped__
+        if is_httpx_client(wrapped):
+            request, send_kwargs = build_httpx_request(wrapped, method, url, kwargs)
+            return wrapped.send(request, stream=True, **send_kwargs)
+        if hasattr(wrapped, "mount"):  # requests.Session
+            return getattr(wrapped, method)(url, *args, stream=True, **kwargs)
+        return getattr(wrapped, method)(url, *args, **kwargs)
 
-        return wrapped_method
+    def add_listener(self, listener: RequestListener) -> None:
+        self._self_listeners.append(listener)
+
+    def remove_listener(self, listener: RequestListener) -> None:
+        self._self_listeners.remove(listener)
+
+    def _send(
+        self,
+        method: str,
+        url: Union[str, WrapURL],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+        original: Callable[..., Any],
+    ) -> HTTPWrapResponse:
+        ticket, kwargs = pop_ticket(kwargs)
+        logging_on = self._logging_on()
+        if not logging_on and not self._self_listeners and self._self_recorder is None:
+            nargs, nkwargs = self._check(method, url, args, kwargs)
+            if self._self_body_limits is None and not self._self_gated:
+                return self._self_resp_proxy(original(*nargs, **nkwargs))
+            permits = self._admit(url, ticket)
+            try:
+                response = self._open(method, url, original, nargs, nkwargs)
+                body = self._read(response, nkwargs)
+            except BaseException:
+                release_permits(permits, True)
+                raise
+            unread = bool(nkwargs.get("stream"))
+            return self._make_proxy(response, body, permits, unread)
+
+        event = RequestEvent(method, extract_hostname(str(url)))
+        token = set_current_event(event)
+        proxy = None
+        start = perf_counter()
+        try:
+            nargs, nkwargs = self._check(method, url, args, kwargs)
+            checked = perf_counter()
+            event.check = checked - start - event.dns
+
+            permits = self._admit(url, ticket)
+            admitted = perf_counter()
+            try:
+                response = self._open(method, url, original, nargs, nkwargs)
+                sent = perf_counter()
+                event.send = sent - admitted
+
+                body = self._read(response, nkwargs)
+                read = perf_counter()
+                event.read = read - sent
+            except BaseException:
+                release_permits(permits, True)
+                raise
+
+            unread = bool(nkwargs.get("stream"))
+            proxy = self._make_proxy(response, body, permits, unread)
+            event.build = perf_counter() - read
+            event.status = getattr(proxy, "status_code", 0)
+            return proxy
+        except BaseException as exc:
+            event.error = exc
+            raise
+        finally:
+            event.total = perf_counter() - start
+            reset_current_event(token)
+            self._finish(event, url, kwargs, proxy, logging_on)
+
+    def _check(
+        self,
+        method: str,
+        url: Union[str, WrapURL],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+    ) -> Tuple[Sequence[Any], Mapping[str, Any]]:
+        nargs, nkwargs = self._self_run_check(method, url, args, kwargs)
+        return nargs, self._prepare_body(url, nkwargs, False)
+
+    def _admit(self, url: Union[str, WrapURL], ticket: Ticket) -> List[Any]:
+        """Slots from the scheduler (global) then the limiter (per host)."""
+        permits: List[Any] = []
+        if not self._self_gated:
+            return permits
+        if self._self_scheduler is not None:
+            permits.append(self._self_scheduler.acquire(ticket))
+        if self._self_limiter is not None:
+            try:
+                host = extract_hostname(str(url))
+                permits.append(self._self_limiter.acquire(host))
+            except BaseException:
+                release_permits(permits, False)
+                raise
+        return permits
+
+    def _prepare_body(
+        self, url: Union[str, WrapURL], kwargs: Mapping[str, Any], is_async: bool
+    ) -> Mapping[str, Any]:
+        if self._self_compression:
+            rule = find_rule(self._self_compression, url)
+            if rule is not None:
+                kwargs = compress_request(rule, url, kwargs, self._emit_metric)
+        if "data" in kwargs or "files" in kwargs:
+            kwargs = prepare_upload(self._self_backend, is_async, kwargs)
+        return kwargs
+
+    def _open(
+        self,
+        method: str,
+        url: Union[str, WrapURL],
+        original: Callable[..., Any],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+    ) -> Any:
+        if self._self_body_limits is None or kwargs.get("stream"):
+            return original(*args, **kwargs)
+        # ask the backend for an unread body, so it can be read with a bound
+        wrapped = self.__wrapped__
+        if is_httpx_client(wrapped):
+            request, send_kwargs = build_httpx_request(wrapped, method, url, kwargs)
+            return wrapped.send(request, stream=True, **send_kwargs)
+        if hasattr(wrapped, "mount"):  # requests.Session
+            return original(*args, **{**kwargs, "stream": True})
+        return original(*args, **kwargs)
+
+    def _read(self, response: Any, kwargs: Mapping[str, Any]) -> Optional[Body]:
+        limits = self._self_body_limits
+        if limits is None or kwargs.get("stream"):
+            return None
+        try:
+            check_declared_length(response, limits)
+            return read_chunks(iter_sync_chunks(response, limits.chunk_size), limits)
+        finally:
+            close_response(response)
+
+    def _make_proxy(
+        self,
+        response: Any,
+        body: Optional[Body],
+        permits: Sequence[Any] = (),
+        unread: bool = False,
+    ) -> Any:
+        try:
+            if body is None:
+                proxy = self._self_resp_proxy(response)
+            else:
+                proxy = self._self_resp_proxy(response, body=body)
+        except BaseException:
+            release_permits(permits, True)
+            raise
+        # a streamed body keeps its slots until read or closed
+        settle_permits(proxy, permits, is_drop(response), unread)
+        return proxy
+
+    def _emit_metric(self, metric: Metric) -> None:
+        emit_metric(self._self_listeners, metric)
+
+    def _logging_on(self) -> bool:
+        request_logger = self._self_request_logger
+        return request_logger is not None and request_logger.enabled()
+
+    def _finish(
+        self,
+        event: RequestEvent,
+        url: Union[str, WrapURL],
+        kwargs: Mapping[str, Any],
+        proxy: Any,
+        logging_on: bool,
+    ) -> None:
+        for listener in self._self_listeners:
+            listener.on_request(event)
+        if self._self_recorder is not None and proxy is not None:
+            self._self_recorder.record(event, proxy, bool(kwargs.get("stream")))
+        if logging_on:
+            self._self_request_logger.log(
+                event, str(url), kwargs.get("headers"), proxy
+            )
 
     def __enter__(self) -> Any:
         if hasattr(self.__wrapped__, "__enter__"):
@@ -186,3 +939,304 @@ class ClientProxy(wrapt.ObjectProxy):
 
     def __getattr__(self, name: str) -> Any:
         return getattr(self.__wrapped__, name)
+
+
+class AsyncClientProxy(ClientProxy):
+    """Client proxy for async backends (aiohttp, httpx.AsyncClient).
+
+    Request methods are coroutines: the backend call is awaited, bodies up to
+    `preload_limit` bytes are read and the connection is released back to the
+    pool before the `AsyncResponseProxy` is returned. Larger bodies (by
+    Content-Length) stay on the connection; release them with
+    `await response.release()` or `async with`.
+    """
+
+    def __init__(
+        self,
+        wrapped: HTTPWrapClient,
+        run_check: RunCheckFn,
+        response_proxy: Callable[..., WrapResponse],
+        listeners: Sequence[RequestListener] = (),
+        request_logger: Optional[RequestLogger] = None,
+        preload_limit: Optional[int] = DEFAULT_PRELOAD_LIMIT,
+        check_in_executor: bool = False,
+        decoder: Optional[BodyDecoder] = None,
+        body_limits: Optional[BodyLimits] = None,
+        compression: Sequence[CompressionRule] = (),
+        warmup_hosts: Sequence[str] = (),
+        concurrency_limit: Optional[ConcurrencyLimit] = None,
+        scheduler: Optional[SchedulerConfig] = None,
+        recorder: Optional["Cassette"] = None,
+        count_pool_requests: bool = False,
+    ) -> None:
+        super().__init__(
+            wrapped,
+            run_check,
+            response_proxy,
+            listeners,
+            request_logger,
+            body_limits,
+            compression,
+            warmup_hosts,
+            concurrency_limit,
+            scheduler,
+            recorder,
+            count_pool_requests,
+        )
+        self._self_preload_limit = preload_limit
+        self._self_check_in_executor = check_in_executor
+        # weak: the client proxy would otherwise be part of a reference cycle
+        sink = weak_sink(self._emit_metric)
+        self._self_decoder = decoder.with_sink(sink) if decoder else None
+
+    get = _make_async_wrapped_method("get")
+    post = _make_async_wrapped_method("post")
+    put = _make_async_wrapped_method("put")
+    patch = _make_async_wrapped_method("patch")
+    delete = _make_async_wrapped_method("delete")
+    head = _make_async_wrapped_method("head")
+    options = _make_async_wrapped_method("options")
+
+    async def request(  # type: ignore[override]
+        self, method: httpmethod, url: Union[str, WrapURL], *args: Any, **kwargs: Any
+    ) -> HTTPWrapResponse:
+        original = partial(self.__wrapped__.request, method, url)
+        return await self._send(method, url, args, kwargs, original)
+
+    async def download(  # type: ignore[override]
+        self,
+        url: Union[str, WrapURL],
+        path: "PathLike",
+        parts: int = 1,
+        resume: bool = True,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **kwargs: Any,
+    ) -> "DownloadResult":
+        """Async `ClientProxy.download`, ranges are fetched by concurrent tasks."""
+        from http_wrap.download import adownload
+
+        return await adownload(self, url, path, parts, resume, chunk_size, **kwargs)
+
+    def paginate(  # type: ignore[override]
+        self,
+        url: Union[str, WrapURL],
+        method: httpmethod = "get",
+        next_page: NextPageFn = next_link,
+        prefetch: int = 1,
+        max_pages: Optional[int] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[HTTPWrapResponse]:
+        """Async `ClientProxy.paginate`; `next_page` may be a coroutine function
+        and pages are fetched ahead by a task."""
+        return apaginate(self, url, method, next_page, prefetch, max_pages, **kwargs)
+
+    async def warmup(  # type: ignore[override]
+        self,
+        hosts: Optional[Sequence[str]] = None,
+        connections_per_host: int = 1,
+        method: httpmethod = "head",
+    ) -> "WarmupResult":
+        from http_wrap.warmup import awarmup
+
+        if hosts is None:
+            hosts = self._self_warmup_hosts
+        return await awarmup(self, hosts, connections_per_host, method)
+
+    async def stream(  # type: ignore[override]
+        self, url: Union[str, WrapURL], **kwargs: Any
+    ) -> HTTPWrapResponse:
+        return await self._stream(url, **kwargs)
+
+    async def _stream(  # type: ignore[override]
+        self, url: Union[str, WrapURL], **kwargs: Any
+    ) -> Any:
+        return await self._send(
+            "get", url, (url,), {**kwargs, "stream": True}, self._open_stream
+        )
+
+    async def _open_stream(  # type: ignore[override]
+        self, url: Union[str, WrapURL], *args: Any, stream: bool = True, **kwargs: Any
+    ) -> Any:
+        wrapped = self.__wrapped__
+        if is_httpx_client(wrapped):
+            request, send_kwargs = build_httpx_request(wrapped, "get", url, kwargs)
+            return await wrapped.send(request, stream=True, **send_kwargs)
+        response = wrapped.get(url, *args, **kwargs)  # aiohttp does not preload
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    async def _check(  # type: ignore[override]
+        self,
+        method: str,
+        url: Union[str, WrapURL],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+    ) -> Tuple[Sequence[Any], Mapping[str, Any]]:
+        if not self._self_check_in_executor:
+            nargs, nkwargs = self._self_run_check(method, url, args, kwargs)
+        else:
+            import asyncio  # async sessions only, asyncio is already loaded by then
+
+            # DNS lookups block; run them off the loop, keeping the current event
+            context = copy_context()
+            nargs, nkwargs = await asyncio.get_running_loop().run_in_executor(
+                None, context.run, self._self_run_check, method, url, args, kwargs
+            )
+        return nargs, self._prepare_body(url, nkwargs, True)
+
+    async def _aadmit(self, url: Union[str, WrapURL], ticket: Ticket) -> List[Any]:
+        permits: List[Any] = []
+        if not self._self_gated:
+            return permits
+        if self._self_scheduler is not None:
+            permits.append(await self._self_scheduler.aacquire(ticket))
+        if self._self_limiter is not None:
+            try:
+                host = extract_hostname(str(url))
+                permits.append(await self._self_limiter.aacquire(host))
+            except BaseException:
+                release_permits(permits, False)
+                raise
+        return permits
+
+    async def _fetch(
+        self,
+        method: str,
+        url: Union[str, WrapURL],
+        original: Callable[..., Any],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+    ) -> Any:
+        wrapped = self.__wrapped__
+        if (
+            self._self_body_limits is not None
+            and not kwargs.get("stream")
+            and is_httpx_client(wrapped)
+        ):
+            # httpx reads the whole body unless asked to stream it
+            request, send_kwargs = build_httpx_request(wrapped, method, url, kwargs)
+            return await wrapped.send(request, stream=True, **send_kwargs)
+        response = original(*args, **kwargs)
+        if inspect.isawaitable(response):
+            response = await response
+        return response
+
+    async def _preload(
+        self, response: Any, stream: bool = False
+    ) -> Union[Body, PendingBody, None]:
+        if stream:
+            return None
+        limits = self._self_body_limits
+        if limits is not None:
+            try:
+                check_declared_length(response, limits)
+            except ResponseTooLargeError:
+                await release_response(response)
+                raise
+        limit = self._self_preload_limit
+        if limit is None:
+            return None
+        length = content_length(response)
+        if length is not None and length > limit:
+            return None
+        if length is None:
+            # chunked: read up to the limit, leave the rest on the connection
+            try:
+                body, pending = await aread_head(response, limit, limits)
+            except BaseException:
+                await release_response(response)
+                raise
+            if pending is not None:
+                return pending
+            await release_response(response)
+            return body
+        try:
+            if limits is None:
+                return await read_body(response)
+            chunks = iter_async_chunks(response, limits.chunk_size)
+            return await aread_chunks(chunks, limits)
+        finally:
+            await release_response(response)
+
+    def _make_proxy(  # type: ignore[override]
+        self,
+        response: Any,
+        body: Union[Body, PendingBody, None],
+        permits: Sequence[Any] = (),
+    ) -> Any:
+        pending = body if isinstance(body, PendingBody) else None
+        try:
+            proxy = self._self_resp_proxy(
+                response,
+                body=None if pending is not None else body,
+                pending=pending,
+                decoder=self._self_decoder,
+                limits=self._self_body_limits,
+            )
+        except BaseException:
+            release_permits(permits, True)
+            raise
+        # streamed, over the preload limit or not preloaded: the body is
+        # still on the connection and keeps its slots until read or released
+        unread = pending is not None or (
+            body is None and not getattr(response, "is_closed", False)  # httpx
+        )
+        settle_permits(proxy, permits, is_drop(response), unread)
+        return proxy
+
+    async def _send(  # type: ignore[override]
+        self,
+        method: str,
+        url: Union[str, WrapURL],
+        args: Sequence[Any],
+        kwargs: Mapping[str, Any],
+        original: Callable[..., Any],
+    ) -> HTTPWrapResponse:
+        ticket, kwargs = pop_ticket(kwargs)
+        logging_on = self._logging_on()
+        if not logging_on and not self._self_listeners and self._self_recorder is None:
+            nargs, nkwargs = await self._check(method, url, args, kwargs)
+            permits = await self._aadmit(url, ticket)
+            try:
+                response = await self._fetch(method, url, original, nargs, nkwargs)
+                body = await self._preload(response, nkwargs.get("stream", False))
+            except BaseException:
+                release_permits(permits, True)
+                raise
+            return self._make_proxy(response, body, permits)
+
+        event = RequestEvent(method, extract_hostname(str(url)))
+        token = set_current_event(event)
+        proxy = None
+        start = perf_counter()
+        try:
+            nargs, nkwargs = await self._check(method, url, args, kwargs)
+            checked = perf_counter()
+            event.check = checked - start - event.dns
+
+            permits = await self._aadmit(url, ticket)
+            admitted = perf_counter()
+            try:
+                response = await self._fetch(method, url, original, nargs, nkwargs)
+                sent = perf_counter()
+                event.send = sent - admitted
+
+                body = await self._preload(response, nkwargs.get("stream", False))
+                read = perf_counter()
+                event.read = read - sent
+            except BaseException:
+                release_permits(permits, True)
+                raise
+
+            proxy = self._make_proxy(response, body, permits)
+            event.build = perf_counter() - read
+            event.status = getattr(proxy, "status_code", 0)
+            return proxy
+        except BaseException as exc:
+            event.error = exc
+            raise
+        finally:
+            event.total = perf_counter() - start
+            reset_current_event(token)
+            self._finish(event, url, kwargs, proxy, logging_on)
@@ -0,0 +1,235 @@
+"""Priority and per-tenant fair scheduling of requests under a global cap.
+
+At most `max_in_flight` requests of a client proxy are in flight; the rest
+queue. A free slot goes to the highest priority waiting, and among requests
+of equal priority tenants are served by weighted fair queuing: each tenant
+advances its own virtual clock by `1 / weight` per request, so a tenant
+with weight 2 gets twice the slots of a tenant with weight 1 while both are
+backlogged, and a bulk tenant cannot starve the others.
+
+Requests with a priority below `shed_below` are shed (`RequestShedError`)
+once they have waited `shed_after` seconds. The priority and tenant come
+from the `priority=` / `tenant=` request kwargs, or from `request_context()`.
+
+A request holds its slot until its body is read: streamed responses give it
+back once read in full, closed or released.
+"""
+
+import heapq
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from itertools import count
+from time import perf_counter
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from http_wrap.limiter import Waiter
+from http_wrap.metrics import Metric, MetricSink, metric_tags, record_phase
+
+HIGH = 10
+NORMAL = 0
+LOW = -10
+
+DEFAULT_TENANT = "default"
+
+Ticket = Tuple[int, str]  # (priority, tenant)
+
+
+class RequestShedError(Exception):
+    """Raised when a low priority request waited longer than `shed_after`."""
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    max_in_flight: int = 64
+    tenant_weights: Mapping[str, float] = field(default_factory=dict)
+    shed_after: Optional[float] = None
+    shed_below: int = NORMAL
+
+
+_ticket: ContextVar[Optional[Ticket]] = ContextVar(
+    "http_wrap_request_ticket", default=None
+)
+
+
+@contextmanager
+def request_context(
+    priority: Optional[int] = None, tenant: Optional[str] = None
+) -> Iterator[None]:
+    """Priority and tenant of the requests made in this context."""
+    outer_priority, outer_tenant = _ticket.get() or (NORMAL, DEFAULT_TENANT)
+    token = _ticket.set(
+        (
+            outer_priority if priority is None else priority,
+            outer_tenant if tenant is None else tenant,
+        )
+    )
+    try:
+        yield
+    finally:
+        _ticket.reset(token)
+
+
+def pop_ticket(kwargs: Mapping[str, Any]) -> Tuple[Ticket, Mapping[str, Any]]:
+    """The request's `(priority, tenant)` and its kwargs without them."""
+    ticket = _ticket.get() or (NORMAL, DEFAULT_TENANT)
+    if "priority" not in kwargs and "tenant" not in kwargs:
+        return ticket, kwargs
+    kwargs = dict(kwargs)
+    priority = kwargs.pop("priority", None)
+    tenant = kwargs.pop("tenant", None)
+    return (
+        ticket[0] if priority is None else priority,
+        tenant or ticket[1],
+    ), kwargs
+
+
+class _Entry:
+    __slots__ = ("waiter", "ticket", "start", "dropped")
+
+    def __init__(self, waiter: Waiter, ticket: Ticket) -> None:
+        self.waiter = waiter
+        self.ticket = ticket
+        self.start = perf_counter()
+        self.dropped = False  # shed or cancelled while queued
+
+
+class SchedulerPermit:
+    __slots__ = ("_scheduler",)
+
+    def __init__(self, scheduler: "RequestScheduler") -> None:
+        self._scheduler = scheduler
+
+    def release(self, dropped: bool = False) -> None:
+        self._scheduler._release()
+
+
+class RequestScheduler:
+    def __init__(
+        self, settings: SchedulerConfig, sink: Optional[MetricSink] = None
+    ) -> None:
+        self.settings = settings
+        self.in_flight = 0
+        self._sink = sink
+        self._queue: List[Tuple[int, float, int, _Entry]] = []
+        self._finish: Dict[str, float] = {}  # last virtual finish per tenant
+        self._queued: Dict[str, int] = {}  # entries in the heap per tenant
+        self._clock = 0.0  # virtual time of the last dispatched request
+        self._seq = count()
+        self._lock = threading.Lock()
+
+    @property
+    def queued(self) -> int:
+        with self._lock:
+            return sum(1 for *_, entry in self._queue if not entry.dropped)
+
+    def acquire(self, ticket: Ticket) -> SchedulerPermit:
+        entry = self._enqueue(ticket, None)
+        if entry is not None:
+            assert entry.waiter._event is not None
+            if not entry.waiter._event.wait(self._patience(ticket)):
+                self._shed(entry)
+            self._granted(entry)
+        return SchedulerPermit(self)
+
+    async def aacquire(self, ticket: Ticket) -> SchedulerPermit:
+        import asyncio
+
+        entry = self._enqueue(ticket, asyncio.get_running_loop())
+        if entry is not None:
+            future = entry.waiter._future
+            try:
+                await asyncio.wait((future,), timeout=self._patience(ticket))
+            except asyncio.CancelledError:
+                if not self._drop(entry):
+                    self._release()  # hand the slot over to the next request
+                raise
+            if not future.done():
+                self._shed(entry)
+            self._granted(entry)
+        return SchedulerPermit(self)
+
+    def _patience(self, ticket: Ticket) -> Optional[float]:
+        if ticket[0] < self.settings.shed_below:
+            return self.settings.shed_after
+        return None
+
+    def _enqueue(self, ticket: Ticket, loop: Any) -> Optional[_Entry]:
+        priority, tenant = ticket
+        with self._lock:
+            queue = self._queue
+            while queue and queue[0][-1].dropped:
+                self._popped(heapq.heappop(queue)[-1])
+            if self.in_flight < self.settings.max_in_flight and not queue:
+                self.in_flight += 1
+                return None
+            weight = self.settings.tenant_weights.get(tenant, 1.0)
+            start = max(self._clock, self._finish.get(tenant, 0.0))
+            finish = self._finish[tenant] = start + 1.0 / weight
+            self._queued[tenant] = self._queued.get(tenant, 0) + 1
+            entry = _Entry(Waiter(loop), ticket)
+            heapq.heappush(queue, (-priority, finish, next(self._seq), entry))
+            return entry
+
+    def _drop(self, entry: _Entry) -> bool:
+        """Take a waiting entry out of the queue; False if it got a slot."""
+        with self._lock:
+            if entry.waiter.granted:
+                return False
+            entry.dropped = True
+            return True
+
+    def _shed(self, entry: _Entry) -> None:
+        if not self._drop(entry):
+            return  # the slot arrived with the timeout
+        priority, tenant = entry.ticket
+        self._emit("http_wrap.scheduler.shed", 1, "counter", priority)
+        raise RequestShedError(
+            f"Request of tenant {tenant!r} (priority {priority}) shed after "
+            f"{self.settings.shed_after}s in queue"
+        )
+
+    def _granted(self, entry: _Entry) -> None:
+        waited = perf_counter() - entry.start
+        record_phase("queue", waited)
+        self._emit("http_wrap.scheduler.wait", waited, "timing", entry.ticket[0])
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            woken = None
+            while self._queue and self.in_flight < self.settings.max_in_flight:
+                _, finish, _, entry = heapq.heappop(self._queue)
+                if entry.dropped:
+                    self._popped(entry)
+                    continue
+                self._clock = finish
+                self._popped(entry)
+                entry.waiter.granted = True
+                self.in_flight += 1
+                woken = entry.waiter
+                break
+        if woken is not None:
+            woken.wake()
+
+    def _popped(self, entry: _Entry) -> None:
+        """Forget tenants with nothing queued that the clock caught up with."""
+        if not self._queue:
+            # idle: no backlog left to share, every tenant starts afresh
+            self._finish.clear()
+            self._queued.clear()
+            return
+        tenant = entry.ticket[1]
+        left = self._queued[tenant] - 1
+        if left:
+            self._queued[tenant] = left
+            return
+        del self._queued[tenant]
+        if self._finish[tenant] <= self._clock:
+            del self._finish[tenant]
+
+    def _emit(self, name: str, value: float, kind: Any, priority: int) -> None:
+        if self._sink is not None:
+            tags = metric_tags(priority=str(priority))
+            self._sink(Metric(name, value, kind, tags))
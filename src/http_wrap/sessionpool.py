@@ -0,0 +1,215 @@
+"""A pool of sync backend sessions, shared by threads through one client proxy.
+
+`requests.Session` (and httpx's client cookie jar) are not meant to be used
+by several threads at once. `SessionPool` looks like one session to the
+client proxy but runs each call on a session of its own:
+
+- `per_thread=True` (default): every thread gets its own session on first
+  use and keeps it; later calls read a `threading.local` and take no lock.
+  The session of a finished thread goes back to the pool for the next new
+  thread. There is one session per live thread, so `max_sessions` needs
+  `per_thread=False`.
+- `per_thread=False`: each call checks an idle session out of the pool and
+  returns it afterwards, opening at most `max_sessions` sessions; callers
+  wait for a free session past that.
+
+Backend methods without a `SessionPool` counterpart (httpx's `build_request`
+and `send`...) run on a checked out session as well. Other attributes
+(`headers`, `cookies`, `auth`...) belong to each session and are not
+reachable through the pool: set them from an `on_create` hook.
+
+The client proxy over the pool keeps a single compiled config, DNS
+negative cache, limiter, scheduler and listener set for all the sessions.
+"""
+
+import threading
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from functools import partial
+from types import TracebackType
+from typing import Any, Callable, Deque, Iterator, List, Optional, Type
+
+from http_wrap.hooks import validate_client
+
+
+class SessionPool:
+    def __init__(
+        self,
+        sessionmaker: Callable[..., Any],
+        max_sessions: Optional[int] = None,
+        per_thread: bool = True,
+        **kwargs: Any,
+    ) -> None:
+        if per_thread and max_sessions is not None:
+            raise ValueError("max_sessions needs per_thread=False")
+        self._sessionmaker = sessionmaker
+        self._kwargs = kwargs
+        self.max_sessions = max_sessions
+        self.per_thread = per_thread
+        self._sessions: List[Any] = []
+        self._idle: Deque[Any] = deque()
+        self._waiters = 0
+        self._local = threading.local()
+        self._available = threading.Condition()
+        self._hooks: List[Callable[[Any], None]] = []
+        self.closed = False
+
+    def on_create(self, hook: Callable[[Any], None]) -> None:
+        """Call `hook(session)` for the sessions opened from now on."""
+        self._hooks.append(hook)
+
+    def sessions(self) -> List[Any]:
+        return list(self._sessions)
+
+    def _create(self) -> Any:
+        session = self._sessionmaker(**self._kwargs)
+        validate_client(session)
+        for hook in self._hooks:
+            hook(session)
+        self._sessions.append(session)
+        return session
+
+    def _prototype(self) -> Any:
+        """Something with the sessions' attributes, for backend detection."""
+        if isinstance(self._sessionmaker, type):
+            return self._sessionmaker
+        with self._available:
+            if not self._sessions:
+                self._idle.append(self._create())  # the first caller reuses it
+            return self._sessions[0]
+
+    def _thread_session(self) -> Any:
+        if self.closed:
+            raise RuntimeError("Session pool is closed")
+        try:
+            return self._local.session
+        except AttributeError:
+            pass
+        with self._available:
+            if self.closed:
+                raise RuntimeError("Session pool is closed")
+            try:
+                session = self._idle.pop()
+            except IndexError:
+                session = self._create()
+        self._local.session = session
+        # the thread's locals go away with it: hand its session to the next one
+        lease = self._local.lease = _Lease()
+        weakref.finalize(lease, self._give_back, session)
+        return session
+
+    def _give_back(self, session: Any) -> None:
+        self._idle.append(session)
+        # past close() nothing checks it out again: close it rather than keep it
+        if self.closed and self._discard(session):
+            session.close()
+
+    def _discard(self, session: Any) -> bool:
+        with self._available:
+            try:
+                self._idle.remove(session)
+            except ValueError:  # close() took it already
+                return False
+            return True
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """A session for the calling thread alone, until the block exits."""
+        if self.per_thread:
+            yield self._thread_session()
+            return
+        try:
+            session = self._idle.pop()  # atomic: no lock while sessions are idle
+        except IndexError:
+            session = self._wait_for_session()
+        try:
+            yield session
+        finally:
+            self._give_back(session)
+            # a waiter counts itself before looking at _idle, under the lock
+            if self._waiters:
+                with self._available:
+                    self._available.notify()
+
+    def _wait_for_session(self) -> Any:
+        with self._available:
+            self._waiters += 1
+            try:
+                while True:
+                    if self.closed:
+                        raise RuntimeError("Session pool is closed")
+                    try:
+                        return self._idle.pop()
+                    except IndexError:
+                        pass
+                    sessions = len(self._sessions)
+                    if self.max_sessions is None or sessions < self.max_sessions:
+                        return self._create()
+                    self._available.wait()
+            finally:
+                self._waiters -= 1
+
+    def _call(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self.checkout() as session:
+            return getattr(session, name)(*args, **kwargs)
+
+    def request(self, method: str, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("request", method, url, *args, **kwargs)
+
+    def get(self, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("get", url, *args, **kwargs)
+
+    def post(self, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("post", url, *args, **kwargs)
+
+    def put(self, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("put", url, *args, **kwargs)
+
+    def patch(self, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("patch", url, *args, **kwargs)
+
+    def delete(self, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("delete", url, *args, **kwargs)
+
+    def head(self, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("head", url, *args, **kwargs)
+
+    def options(self, url: Any, *args: Any, **kwargs: Any) -> Any:
+        return self._call("options", url, *args, **kwargs)
+
+    def close(self) -> None:
+        with self._available:
+            self.closed = True
+            sessions, self._sessions = self._sessions, []
+            self._idle.clear()
+            self._available.notify_all()
+        for session in sessions:
+            session.close()
+
+    def __enter__(self) -> "SessionPool":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        # other backend methods (build_request, send...): one checkout per call
+        if name.startswith("_") or self.closed:
+            raise AttributeError(name)
+        if not callable(getattr(self._prototype(), name, None)):
+            raise AttributeError(
+                f"{name!r} is not a method: set session attributes with on_create()"
+            )
+        return partial(self._call, name)
+
+
+class _Lease:
+    """Kept in a thread's locals only, collected when the thread ends."""
+
+    __slots__ = ("__weakref__",)
@@ -0,0 +1,356 @@
+"""Detached, picklable copies of responses.
+
+`ResponseProxy.snapshot()` returns a `ResponseSnapshot`: status, final URL,
+raw header pairs, body, elapsed time and a summary of the redirect history,
+with no reference to the backend response or its connection. Snapshots
+implement `WrapSyncResponse`, so code reading responses can be fed from a
+cache, a replay log or another process.
+
+Bodies at or over `share_threshold` bytes are moved to a
+`multiprocessing.shared_memory` block and the snapshot carries a
+`SharedBody` reference instead: pickling it costs a few dozen bytes
+whatever the body size. The block lives until `SharedBody.unlink()`, even
+after the process that created it exits: it is kept out of the
+`multiprocessing` resource tracker, which would otherwise unlink it then.
+"""
+
+import json as jsonlib
+import os
+import sys
+from datetime import timedelta
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from http_wrap.body import Body, body_view
+from http_wrap.pagination import Links, parse_link_header
+
+RawHeaders = Tuple[Tuple[bytes, bytes], ...]
+
+
+class Hop(NamedTuple):
+    """One redirect of a response's history."""
+
+    status: int
+    url: str
+    location: Optional[str]
+    elapsed: float  # seconds
+
+
+def elapsed_seconds(response: Any) -> float:
+    try:
+        elapsed = getattr(response, "elapsed", None)
+    except RuntimeError:  # streamed httpx responses know it once read
+        return 0.0
+    return elapsed.total_seconds() if isinstance(elapsed, timedelta) else 0.0
+
+
+def summarize_hop(response: Any) -> Hop:
+    status = getattr(response, "status_code", None) or getattr(response, "status", 0)
+    headers = getattr(response, "headers", None) or {}
+    location = headers.get("location")
+    return Hop(int(status), str(response.url), location, elapsed_seconds(response))
+
+
+def summarize_history(history: Iterable[Any]) -> Tuple[Hop, ...]:
+    return tuple(
+        hop if isinstance(hop, Hop) else summarize_hop(hop) for hop in history
+    )
+
+
+def _open_block(name: Optional[str] = None, size: int = 0) -> Any:
+    """A shared memory block the resource tracker leaves alone."""
+    from multiprocessing import shared_memory
+
+    create = name is None
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    block = shared_memory.SharedMemory(name, create, size)
+    if os.name == "posix":  # registered on create and on attach alike
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block
+
+
+class SharedBody:
+    """A body stored in a named shared memory block."""
+
+    __slots__ = ("name", "size")
+
+    def __init__(self, name: str, size: int) -> None:
+        self.name = name
+        self.size = size
+
+    @classmethod
+    def create(cls, data: Union[bytes, memoryview]) -> "SharedBody":
+        block = _open_block(size=max(len(data), 1))
+        try:
+            block.buf[: len(data)] = data
+        finally:
+            block.close()
+        return cls(block.name, len(data))
+
+    def read(self) -> bytes:
+        block = _open_block(self.name)
+        try:
+            return bytes(block.buf[: self.size])
+        finally:
+            block.close()
+
+    def unlink(self) -> None:
+        from multiprocessing import shared_memory
+
+        if sys.version_info >= (3, 13):
+            block = shared_memory.SharedMemory(self.name, track=False)
+        else:  # registered here, unregistered again by unlink()
+            block = shared_memory.SharedMemory(self.name)
+        block.close()
+        block.unlink()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (SharedBody, (self.name, self.size))
+
+    def __repr__(self) -> str:
+        return f"SharedBody({self.name!r}, {self.size})"
+
+
+class ResponseStatusError(Exception):
+    """Raised by `ResponseSnapshot.raise_for_status()` on 4xx and 5xx."""
+
+    def __init__(self, message: str, response: "ResponseSnapshot") -> None:
+        super().__init__(message)
+        self.response = response
+
+
+class ResponseSnapshot:
+    __slots__ = (
+        "status_code",
+        "url",
+        "raw_headers",
+        "body",
+        "elapsed_seconds",
+        "history",
+        "original_url",
+        "host",
+        "encoding",
+        "_headers",
+        "_content",
+    )
+
+    def __init__(
+        self,
+        status_code: int,
+        url: str,
+        raw_headers: RawHeaders = (),
+        body: Union[bytes, SharedBody] = b"",
+        elapsed_seconds: float = 0.0,
+        history: Tuple[Hop, ...] = (),
+        original_url: Optional[str] = None,
+        host: str = "",
+        encoding: str = "utf-8",
+    ) -> None:
+        self.status_code = status_code
+        self.url = url
+        self.raw_headers = raw_headers
+        self.body = body
+        self.elapsed_seconds = elapsed_seconds
+        self.history = history
+        self.original_url = original_url or url
+        self.host = host
+        self.encoding = encoding
+        self._headers: Optional[Dict[str, str]] = None
+        self._content: Optional[bytes] = None
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # positional args only: no per-slot state dict to build or parse
+        return (
+            ResponseSnapshot,
+            (
+                self.status_code,
+                self.url,
+                self.raw_headers,
+                self.body,
+                self.elapsed_seconds,
+                self.history,
+                self.original_url,
+                self.host,
+                self.encoding,
+            ),
+        )
+
+    @property
+    def status(self) -> int:
+        return self.status_code
+
+    @property
+    def final_url(self) -> str:
+        return self.url
+
+    @property
+    def elapsed(self) -> timedelta:
+        return timedelta(seconds=self.elapsed_seconds)
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Lower-cased names; repeated headers joined as HTTP allows."""
+        if self._headers is None:
+            headers: Dict[str, str] = {}
+            for key, value in self.raw_headers:
+                name, text = key.decode("utf-8"), value.decode("utf-8")
+                if name in headers:
+                    sep = "\n" if name == "set-cookie" else ", "
+                    headers[name] = headers[name] + sep + text
+                else:
+                    headers[name] = text
+            self._headers = headers
+        return self._headers
+
+    def header_list(self, name: str) -> List[str]:
+        key = name.lower().encode("utf-8")
+        return [value.decode("utf-8") for k, value in self.raw_headers if k == key]
+
+    @property
+    def cookies(self) -> Dict[str, str]:
+        jar: SimpleCookie = SimpleCookie()
+        for value in self.header_list("set-cookie"):
+            jar.load(value)
+        return {key: morsel.value for key, morsel in jar.items()}
+
+    @property
+    def links(self) -> Links:
+        return parse_link_header(self.header_list("link"))
+
+    @property
+    def content(self) -> bytes:
+        if isinstance(self.body, SharedBody):
+            if self._content is None:
+                self._content = self.body.read()
+            return self._content
+        return self.body
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, "replace")
+
+    def json(self, **kwargs: Any) -> Any:
+        return jsonlib.loads(self.content, **kwargs)
+
+    @property
+    def reason(self) -> str:
+        try:
+            return HTTPStatus(self.status_code).phrase
+        except ValueError:
+            return ""
+
+    @property
+    def reason_phrase(self) -> str:
+        return self.reason.upper()
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    @property
+    def is_informational(self) -> bool:
+        return 100 <= self.status_code < 200
+
+    @property
+    def is_success(self) -> bool:
+        return 200 <= self.status_code < 300
+
+    @property
+    def is_redirect(self) -> bool:
+        return 300 <= self.status_code < 400
+
+    @property
+    def is_client_error(self) -> bool:
+        return 400 <= self.status_code < 500
+
+    @property
+    def is_server_error(self) -> bool:
+        return 500 <= self.status_code < 600
+
+    @property
+    def is_error(self) -> bool:
+        return 400 <= self.status_code < 600
+
+    @property
+    def is_permanent_redirect(self) -> bool:
+        return "location" in self.headers and self.status_code in (
+            HTTPStatus.MOVED_PERMANENTLY,
+            HTTPStatus.PERMANENT_REDIRECT,
+        )
+
+    @property
+    def has_redirect_location(self) -> bool:
+        return "location" in self.headers and self.status_code in (
+            HTTPStatus.MOVED_PERMANENTLY,
+            HTTPStatus.FOUND,
+            HTTPStatus.SEE_OTHER,
+            HTTPStatus.TEMPORARY_REDIRECT,
+            HTTPStatus.PERMANENT_REDIRECT,
+        )
+
+    def raise_for_status(self) -> "ResponseSnapshot":
+        if self.is_error:
+            kind = "Client" if self.is_client_error else "Server"
+            raise ResponseStatusError(
+                f"{self.status_code} {kind} Error: {self.reason} for url: {self.url}",
+                self,
+            )
+        return self
+
+    def __str__(self) -> str:
+        return f"<ResponseSnapshot [{self.status_code}]>"
+
+    __repr__ = __str__
+
+
+def snapshot_body(
+    body: Body, share_threshold: Optional[int]
+) -> Union[bytes, SharedBody]:
+    view = body_view(body)
+    if share_threshold is not None and len(view) >= share_threshold:
+        return SharedBody.create(view)
+    return bytes(view)
+
+
+def take_snapshot(
+    proxy: Any, body: Body, share_threshold: Optional[int] = None
+) -> ResponseSnapshot:
+    """Copy what a `ResponseSnapshot` needs out of a (read) response proxy."""
+    # repeated headers from the backend, values redacted like `proxy.headers`
+    redacted = proxy.headers
+    raw_headers = tuple(
+        (
+            key.lower().encode("utf-8"),
+            (
+                "<redacted>"
+                if redacted.get(key.lower()) == "<redacted>"
+                else str(value)
+            ).encode("utf-8"),
+        )
+        for key, value in _header_items(proxy.__wrapped__.headers)
+    )
+    return ResponseSnapshot(
+        proxy.status_code,
+        str(proxy.final_url),
+        raw_headers,
+        snapshot_body(body, share_threshold),
+        elapsed_seconds(proxy),
+        summarize_history(proxy.history or ()),
+        str(proxy.original_url),
+        str(proxy.host),
+        proxy.encoding or "utf-8",
+    )
+
+
+def _header_items(headers: Any) -> Iterable[Tuple[Any, Any]]:
+    multi_items = getattr(headers, "multi_items", None)  # httpx
+    if multi_items is not None:
+        return multi_items()
+    return headers.items()  # aiohttp's items() already repeats keys
@@ -0,0 +1,184 @@
+"""Incremental decoders for newline-delimited JSON and Server-Sent Events.
+
+Chunks are appended to one `bytearray` per stream: complete lines are cut
+from its front and the unfinished tail stays in place, so records are parsed
+as soon as their line ends and memory is bounded by the longest line.
+"""
+
+import json as jsonlib
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable, Iterator, List, Optional
+
+from http_wrap.body import DEFAULT_CHUNK_SIZE, Body, body_view
+
+_EOL = re.compile(rb"\r\n|\r|\n")
+
+
+class LineDecoder:
+    """Splits a byte stream on `\\n`, `\\r\\n` or `\\r`."""
+
+    __slots__ = ("_buffer", "_scanned")
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._scanned = 0  # bytes of the tail already known to hold no EOL
+
+    def feed(self, chunk: bytes) -> List[bytes]:
+        buffer = self._buffer
+        buffer += chunk
+        lines = []
+        start = 0
+        for match in _EOL.finditer(buffer, self._scanned):
+            end = match.end()
+            if end == len(buffer) and match.group() == b"\r":
+                break  # may be the first half of a \r\n split across chunks
+            lines.append(bytes(buffer[start : match.start()]))
+            start = end
+        if start:
+            del buffer[:start]
+        # a trailing \r is rescanned together with the next chunk
+        self._scanned = max(len(buffer) - 1, 0)
+        return lines
+
+    def flush(self) -> List[bytes]:
+        buffer = self._buffer
+        lines = [bytes(buffer).rstrip(b"\r")] if buffer else []
+        buffer.clear()
+        self._scanned = 0
+        return lines
+
+
+class NDJSONDecoder:
+    __slots__ = ("_lines", "_kwargs")
+
+    def __init__(self, **kwargs: Any) -> None:
+        self._lines = LineDecoder()
+        self._kwargs = kwargs
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        return self._decode(self._lines.feed(chunk))
+
+    def flush(self) -> List[Any]:
+        return self._decode(self._lines.flush())
+
+    def _decode(self, lines: List[bytes]) -> List[Any]:
+        return [jsonlib.loads(line, **self._kwargs) for line in lines if line.strip()]
+
+
+@dataclass(frozen=True)
+class ServerSentEvent:
+    data: str
+    event: str = "message"
+    id: Optional[str] = None
+    retry: Optional[int] = None
+
+    def json(self, **kwargs: Any) -> Any:
+        return jsonlib.loads(self.data, **kwargs)
+
+
+class SSEDecoder:
+    """Event stream parser following the WHATWG `text/event-stream` rules."""
+
+    __slots__ = ("_lines", "_data", "_event", "_last_id", "_retry", "_started")
+
+    def __init__(self) -> None:
+        self._lines = LineDecoder()
+        self._data: List[str] = []
+        self._event = ""
+        self._last_id: Optional[str] = None
+        self._retry: Optional[int] = None
+        self._started = False
+
+    def feed(self, chunk: bytes) -> List[ServerSentEvent]:
+        if not self._started and chunk:
+            self._started = True
+            if bytes(chunk[:3]) == b"\xef\xbb\xbf":
+                chunk = chunk[3:]
+        return self._decode(self._lines.feed(chunk))
+
+    def flush(self) -> List[ServerSentEvent]:
+        # an event without its closing blank line is incomplete and dropped
+        self._decode(self._lines.flush())
+        self._data.clear()
+        self._event = ""
+        return []
+
+    def _decode(self, lines: List[bytes]) -> List[ServerSentEvent]:
+        events = []
+        for raw in lines:
+            if not raw:
+                event = self._dispatch()
+                if event is not None:
+                    events.append(event)
+                continue
+            line = raw.decode("utf-8", "replace")
+            if line.startswith(":"):
+                continue  # comment / keep-alive
+            name, _, value = line.partition(":")
+            if value.startswith(" "):
+                value = value[1:]
+            if name == "data":
+                self._data.append(value)
+            elif name == "event":
+                self._event = value
+            elif name == "id":
+                if "\0" not in value:
+                    self._last_id = value
+            elif name == "retry":
+                if value.isdigit():
+                    self._retry = int(value)
+        return events
+
+    def _dispatch(self) -> Optional[ServerSentEvent]:
+        data, event = self._data, self._event
+        self._data, self._event = [], ""
+        if not data:
+            return None
+        return ServerSentEvent(
+            "\n".join(data), event or "message", self._last_id, self._retry
+        )
+
+
+def body_slices(body: Body, size: int = DEFAULT_CHUNK_SIZE) -> Iterator[memoryview]:
+    view = memoryview(body_view(body))
+    for start in range(0, len(view), size):
+        yield view[start : start + size]
+
+
+async def abody_slices(
+    body: Body, size: int = DEFAULT_CHUNK_SIZE
+) -> AsyncIterator[memoryview]:
+    for chunk in body_slices(body, size):
+        yield chunk
+
+
+def iter_stream_chunks(response: Any) -> Iterator[bytes]:
+    """Chunks of a sync response as they arrive from the network."""
+    iter_bytes = getattr(response, "iter_bytes", None)  # httpx
+    if iter_bytes is not None:
+        return iter_bytes()
+    return response.iter_content(None)  # requests
+
+
+def aiter_stream_chunks(response: Any) -> AsyncIterator[bytes]:
+    aiter_bytes = getattr(response, "aiter_bytes", None)  # httpx
+    if aiter_bytes is not None:
+        return aiter_bytes()
+    return response.content.iter_any()  # aiohttp
+
+
+def decode_chunks(chunks: Iterable[bytes], decoder: Any) -> Iterator[Any]:
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.flush()
+
+
+async def adecode_chunks(
+    chunks: AsyncIterator[bytes], decoder: Any
+) -> AsyncIterator[Any]:
+    async for chunk in chunks:
+        for record in decoder.feed(chunk):
+            yield record
+    for record in decoder.flush():
+        yield record
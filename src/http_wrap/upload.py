@@ -0,0 +1,163 @@
+"""Request bodies handed to each backend in the form it can stream.
+
+`data` may be bytes, str, a form mapping, a file object, a memoryview or
+bytearray, a sync iterable of bytes or an async iterable of bytes; `files`
+maps field names to file objects or `(filename, fileobj[, content_type])`.
+Bodies of unknown length (iterators, pipes) are sent with chunked transfer
+encoding by every backend.
+"""
+
+import os
+from collections.abc import AsyncIterable, Iterable
+from functools import partial
+from typing import Any, AsyncIterator, Dict, Iterator, Mapping, Optional, Union
+
+BackendKind = str  # "requests", "httpx", "aiohttp" or "other"
+
+DEFAULT_UPLOAD_CHUNK = 64 * 1024
+
+
+def backend_kind(client: Any) -> BackendKind:
+    if hasattr(client, "build_request") and hasattr(client, "send"):
+        return "httpx"
+    if hasattr(client, "mount"):
+        return "requests"
+    if hasattr(client, "ws_connect"):
+        return "aiohttp"
+    return "other"
+
+
+class BufferReader:
+    """File-like view over a buffer, read in slices instead of copied whole."""
+
+    __slots__ = ("_view", "_pos")
+
+    def __init__(self, buffer: Union[bytearray, memoryview]) -> None:
+        self._view = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return len(self._view) - self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size < 0 else min(self._pos + size, len(self._view))
+        chunk = self._view[self._pos : end].tobytes()
+        self._pos = end
+        return chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(DEFAULT_UPLOAD_CHUNK)
+            if not chunk:
+                return
+            yield chunk
+
+
+def iterate_chunks(data: Any) -> Iterable[bytes]:
+    if hasattr(data, "read"):  # files iterate by lines, read them in blocks
+        return iter(partial(data.read, DEFAULT_UPLOAD_CHUNK), b"")
+    return data
+
+
+async def iterate_async(data: Any) -> AsyncIterator[bytes]:
+    for chunk in iterate_chunks(data):
+        yield chunk
+
+
+def known_length(data: Any) -> Optional[int]:
+    if isinstance(data, (bytes, bytearray, memoryview, BufferReader)):
+        return len(data)
+    try:
+        if not data.seekable():
+            return None  # pipes, sockets: sent chunked
+        position = data.tell()
+        end = data.seek(0, os.SEEK_END)
+        data.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None  # generators: sent chunked
+
+
+def is_sync_iterator(data: Any) -> bool:
+    return (
+        isinstance(data, Iterable)
+        and not isinstance(data, (bytes, str, bytearray, memoryview))
+        and not isinstance(data, (Mapping, list, tuple))
+        and not hasattr(data, "read")
+    )
+
+
+def is_raw_body(data: Any) -> bool:
+    """True for bodies that are sent as they are, not form-encoded."""
+    return (
+        isinstance(data, (bytes, str, bytearray, memoryview, AsyncIterable))
+        or hasattr(data, "read")
+        or is_sync_iterator(data)
+    )
+
+
+def prepare_upload(
+    backend: BackendKind, is_async: bool, kwargs: Mapping[str, Any]
+) -> Mapping[str, Any]:
+    data = kwargs.get("data")
+    files = kwargs.get("files")
+    if backend == "other" or (data is None and files is None):
+        return kwargs
+    prepared = dict(kwargs)
+    if backend == "requests":
+        if isinstance(data, AsyncIterable):
+            raise TypeError("Async iterator bodies need an async session")
+        if isinstance(data, (bytearray, memoryview)):
+            prepared["data"] = BufferReader(data)
+    elif backend == "httpx":
+        if data is not None and is_raw_body(data):
+            data = prepared.pop("data")
+            prepared["content"] = httpx_content(prepared, is_async, data)
+    elif backend == "aiohttp":
+        if is_sync_iterator(data):  # aiohttp only streams async iterables
+            prepared["data"] = iterate_async(data)
+        if files is not None:
+            form = aiohttp_form(prepared.pop("files"), prepared.get("data"))
+            prepared["data"] = form
+    return prepared
+
+
+def httpx_content(kwargs: Dict[str, Any], is_async: bool, data: Any) -> Any:
+    if isinstance(data, (bytes, str)):
+        return data
+    if isinstance(data, AsyncIterable):
+        if not is_async:
+            raise TypeError("Async iterator bodies need an async session")
+        return data
+    if isinstance(data, (bytearray, memoryview)):
+        data = BufferReader(data)
+    length = known_length(data)
+    if length is not None:
+        # httpx sends iterators chunked unless it is told the length
+        headers = dict(kwargs.get("headers") or {})
+        if not any(k.lower() == "content-length" for k in headers):
+            headers["Content-Length"] = str(length)
+        kwargs["headers"] = headers
+    return iterate_async(data) if is_async else iterate_chunks(data)
+
+
+def aiohttp_form(files: Mapping[str, Any], fields: Optional[Any]) -> Any:
+    import aiohttp  # only reached with an aiohttp session
+
+    if fields is None:
+        fields = {}
+    elif not isinstance(fields, (Mapping, list, tuple)):  # raw bodies, files
+        raise TypeError("data= must be form fields when files= is also passed")
+    form = aiohttp.FormData()
+    pairs = fields.items() if isinstance(fields, Mapping) else fields
+    for name, value in pairs:
+        form.add_field(name, value)
+    for name, value in files.items():
+        content_type = None
+        if isinstance(value, tuple):
+            filename, value, *rest = value
+            content_type = rest[0] if rest else None
+        else:
+            filename = os.path.basename(getattr(value, "name", None) or name)
+        form.add_field(name, value, filename=filename, content_type=content_type)
+    return form
@@ -1,13 +1,7 @@
-import asyncio
 import inspect
 from typing import Any, Type, Union
 from urllib.parse import urlparse
 
-import aiohappyeyeballs
-import aiohttp
-import httpx
-import requests
-
 
 def in_between(code: int, start: int, end: int) -> bool:
     return start <= code <= end
@@ -54,6 +48,11 @@ def normalize_response_headers(
 
 
 if __name__ == "__main__":
+    import asyncio
+
+    import aiohttp
+    import httpx
+    import requests
 
     httpx_args = get_constructor_args(httpx.Client)
     with httpx.Client() as client:
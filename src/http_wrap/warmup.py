@@ -0,0 +1,184 @@
+"""Connection warm-up for known hosts.
+
+Hosts are first checked as the client checks every request (block lists,
+negative DNS cache) and resolved, concurrently. Then `connections_per_host`
+HEAD (or OPTIONS) requests per host, at most the backend's pool size, go
+through the client proxy, leaving that many TLS-ready connections in the
+pool. Failures are collected per host rather than raised: warm-up is best
+effort.
+
+Sync sessions are not shared between threads: the requests of a host are
+sent from the calling thread, each response held open so that the next one
+takes a new connection, then all of them are read back into the pool.
+"""
+
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from http_wrap.addresses import resolve_all
+from http_wrap.body import DEFAULT_CHUNK_SIZE, iter_sync_chunks
+from http_wrap.metrics import Metric, metric_tags
+
+if TYPE_CHECKING:
+    from http_wrap.proxies import AsyncClientProxy, ClientProxy
+
+
+@dataclass
+class WarmupResult:
+    hosts: List[str]
+    connections: Dict[str, int] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+    dns: float = 0.0
+    duration: float = 0.0
+
+
+def warmup_targets(hosts: Sequence[str]) -> List[Tuple[str, str, int]]:
+    """`(host, base url, port)` for bare hostnames or urls (https by default)."""
+    targets = []
+    for host in dict.fromkeys(hosts):
+        parts = urlsplit(host if "://" in host else f"https://{host}")
+        if not parts.hostname:
+            raise ValueError(f"Invalid warm-up host: {host!r}")
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        targets.append((parts.hostname, f"{parts.scheme}://{parts.netloc}/", port))
+    return targets
+
+
+def prefetch(client: "ClientProxy", method: str, url: str, host: str) -> None:
+    client._check(method, url, (url,), {})
+    resolve_all(host)
+
+
+def pool_size(session: Any, url: str) -> Optional[int]:
+    """Connections per host the backend keeps pooled (None: no known bound)."""
+    get_adapter = getattr(session, "get_adapter", None)  # requests
+    if get_adapter is not None:
+        return getattr(get_adapter(url), "_pool_maxsize", None)
+    pool = getattr(getattr(session, "_transport", None), "_pool", None)  # httpx
+    if pool is not None:
+        return getattr(pool, "_max_keepalive_connections", None)
+    connector = getattr(session, "connector", None)  # aiohttp (0: unbounded)
+    return getattr(connector, "limit_per_host", None) or None
+
+
+def connections_for(client: "ClientProxy", url: str, wanted: int) -> int:
+    size = pool_size(client.__wrapped__, url)
+    return wanted if size is None else min(wanted, size)
+
+
+def open_connections(
+    client: "ClientProxy", method: str, url: str, count: int
+) -> Tuple[int, Optional[BaseException]]:
+    """Open `count` connections to `url` from the calling thread."""
+    held = []
+    error: Optional[BaseException] = None
+    try:
+        for _ in range(count):  # an unread response keeps its connection busy
+            held.append(client._stream(url, method=method))
+    except Exception as exc:
+        error = exc
+    for response in held:
+        try:
+            for _ in iter_sync_chunks(response.__wrapped__, DEFAULT_CHUNK_SIZE):
+                pass  # read in full: the connection goes back to the pool
+        finally:
+            response.close()
+    return len(held), error
+
+
+def report(client: "ClientProxy", result: WarmupResult) -> WarmupResult:
+    emit = client._emit_metric
+    for host, count in result.connections.items():
+        tags = metric_tags(host=host)
+        emit(Metric("http_wrap.warmup.connections", count, "gauge", tags))
+    emit(Metric("http_wrap.warmup.dns", result.dns, "timing", metric_tags()))
+    emit(Metric("http_wrap.warmup.duration", result.duration, "timing", metric_tags()))
+    return result
+
+
+def warmup(
+    client: "ClientProxy",
+    hosts: Sequence[str],
+    connections_per_host: int = 1,
+    method: str = "head",
+) -> WarmupResult:
+    from concurrent.futures import ThreadPoolExecutor
+
+    start = perf_counter()
+    targets = warmup_targets(hosts)
+    result = WarmupResult([host for host, _, _ in targets])
+    workers = min(max(len(targets), 1), 64)
+    with ThreadPoolExecutor(workers, "http_wrap-warmup") as pool:
+        resolved = {
+            host: pool.submit(prefetch, client, method, url, host)
+            for host, url, _ in targets
+        }
+        for host, future in resolved.items():
+            error = future.exception()
+            if error is not None:
+                result.errors[host] = error
+    result.dns = perf_counter() - start
+
+    for host, url, _ in targets:
+        if host in result.errors:
+            continue
+        count = connections_for(client, url, connections_per_host)
+        opened, error = open_connections(client, method, url, count)
+        if opened:
+            result.connections[host] = opened
+        if error is not None:
+            result.errors[host] = error
+    result.duration = perf_counter() - start
+    return report(client, result)
+
+
+async def awarmup(
+    client: "AsyncClientProxy",
+    hosts: Sequence[str],
+    connections_per_host: int = 1,
+    method: str = "head",
+) -> WarmupResult:
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    start = perf_counter()
+    targets = warmup_targets(hosts)
+    result = WarmupResult([host for host, _, _ in targets])
+
+    async def aprefetch(url: str, host: str) -> None:
+        await client._check(method, url, (url,), {})
+        await loop.run_in_executor(None, resolve_all, host)
+
+    resolved = await asyncio.gather(
+        *(aprefetch(url, host) for host, url, _ in targets),
+        return_exceptions=True,
+    )
+    for (host, _, _), outcome in zip(targets, resolved):
+        if isinstance(outcome, BaseException):
+            result.errors[host] = outcome
+    result.dns = perf_counter() - start
+
+    async def connect(url: str) -> Optional[BaseException]:
+        try:
+            response = await client.request(method, url)  # type: ignore[arg-type]
+            await response.release()
+        except Exception as exc:
+            return exc
+        return None
+
+    opened = [
+        (host, url)
+        for host, url, _ in targets
+        if host not in result.errors
+        for _ in range(connections_for(client, url, connections_per_host))
+    ]
+    outcomes = await asyncio.gather(*(connect(url) for _, url in opened))
+    for (host, _), error in zip(opened, outcomes):
+        if error is None:
+            result.connections[host] = result.connections.get(host, 0) + 1
+        else:
+            result.errors.setdefault(host, error)
+    result.duration = perf_counter() - start
+    return report(client, result)
@@ -0,0 +1,233 @@
+import ipaddress
+import random
+import socket
+import time
+from typing import Any, List
+
+import pytest
+
+from http_wrap.addresses import (
+    AddressClassifier,
+    IntervalTable,
+    NegativeCache,
+    classify_hosts,
+    classify_urls,
+)
+from http_wrap.configs import HTTPWrapConfig, run_check_config
+from http_wrap.hooks import InternalAddressError, raise_on_internal_address
+from http_wrap.metrics import MetricsAggregator
+
+
+def test_interval_table_merges_and_bisects() -> None:
+    table = IntervalTable([(10, 20), (0, 5), (15, 30), (31, 40), (50, 50)])
+    assert len(table) == 3
+    assert [n for n in range(-1, 52) if n in table] == [
+        *range(0, 6),
+        *range(10, 41),
+        50,
+    ]
+
+
+def test_matches_ipaddress_for_private_loopback_and_link_local() -> None:
+    classifier = AddressClassifier()
+    rng = random.Random(7)
+    samples = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(5000)]
+    samples += ["10.1.2.3", "127.0.0.1", "169.254.169.254", "172.31.0.1", "8.8.8.8"]
+    for address in samples:
+        ip = ipaddress.ip_address(address)
+        if ip.is_private or ip.is_loopback or ip.is_link_local:
+            assert classifier.is_blocked(address), address
+        if ip.is_global and not ip.is_multicast:
+            assert not classifier.is_blocked(address), address
+
+
+@pytest.mark.parametrize(
+    "address, blocked",
+    [
+        ("::1", True),
+        ("::", True),
+        ("fe80::1%eth0", True),
+        ("fd12:3456::1", True),
+        ("ff02::1", True),
+        ("2001:db8::1", True),
+        ("2606:4700::1111", False),
+        ("[2606:4700::1111]", False),
+        ("::ffff:127.0.0.1", True),  # IPv4-mapped
+        ("::ffff:8.8.8.8", False),
+        ("64:ff9b::a00:1", True),  # NAT64 of 10.0.0.1
+        ("2002:c0a8:101::1", True),  # 6to4 of 192.168.1.1
+        ("2002:808:808::1", False),
+        ("100.64.0.1", True),
+        ("0.0.0.0", True),
+        ("255.255.255.255", True),
+    ],
+)
+def test_reserved_ranges(address: str, blocked: bool) -> None:
+    assert AddressClassifier().is_blocked(address) is blocked
+
+
+def test_user_deny_and_allow_cidrs() -> None:
+    classifier = AddressClassifier(
+        deny=["203.0.114.0/24", "2606:4700::/32"], allow=["10.20.0.0/16"]
+    )
+    assert classifier.is_blocked("203.0.114.9")
+    assert classifier.is_blocked("2606:4700::1111")
+    assert not classifier.is_blocked("10.20.1.1")  # allow wins over reserved
+    assert classifier.is_blocked("10.21.1.1")
+    assert classifier.blocked(["8.8.8.8", "10.20.0.1", "nope", "::1"]) == [
+        False,
+        False,
+        True,
+        True,
+    ]
+    with pytest.raises(ValueError):
+        classifier.is_blocked("example.com")
+
+
+def fake_resolver(records: dict) -> Any:
+    calls: List[str] = []
+
+    def resolve(host: str) -> List[str]:
+        calls.append(host)
+        if host not in records:
+            raise socket.gaierror(socket.EAI_NONAME, "not found")
+        return records[host]
+
+    resolve.calls = calls  # type: ignore[attr-defined]
+    return resolve
+
+
+def test_bulk_classification_resolves_each_host_once() -> None:
+    resolver = fake_resolver(
+        {
+            "public.example": ["93.184.216.34", "2606:2800:220:1::1"],
+            "rebind.example": ["93.184.216.34", "10.0.0.5"],
+        }
+    )
+    urls = [
+        "https://public.example/a",
+        "https://PUBLIC.example/b",
+        "https://rebind.example/",
+        "http://127.0.0.1:8080/",
+        "http://[::1]/",
+        "https://missing.example/",
+        "https://db.internal/",
+        "not a url",
+    ]
+    assert classify_urls(urls, resolver=resolver) == [
+        "ok",
+        "ok",
+        "blocked",
+        "blocked",
+        "blocked",
+        "unresolved",
+        "blocked",
+        "invalid",
+    ]
+    assert sorted(resolver.calls) == [
+        "missing.example",
+        "public.example",
+        "rebind.example",
+    ]
+    assert classify_hosts(["8.8.8.8", "localhost"]) == {
+        "8.8.8.8": "ok",
+        "localhost": "blocked",
+    }
+
+
+def test_every_resolved_record_is_checked(monkeypatch: pytest.MonkeyPatch) -> None:
+    def getaddrinfo(host: str, *args: Any, **kwargs: Any) -> list:
+        return [
+            (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("93.184.216.34", 0)),
+            (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("fd00::7", 0, 0, 0)),
+        ]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    with pytest.raises(InternalAddressError, match="fd00::7"):
+        raise_on_internal_address("dual.example")
+
+    config = HTTPWrapConfig(allow_cidrs=("fd00::/8",))
+    run_check_config("get", "https://dual.example/", (), {}, config)
+    config = HTTPWrapConfig(allow_cidrs=("fd00::/8",), deny_cidrs=("93.184.0.0/16",))
+    with pytest.raises(InternalAddressError, match="93.184.216.34"):
+        run_check_config("get", "https://dual.example/", (), {}, config)
+
+
+def test_ip_literals_skip_dns(monkeypatch: pytest.MonkeyPatch) -> None:
+    def getaddrinfo(*args: Any, **kwargs: Any) -> list:
+        raise AssertionError("resolved an IP literal")
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    raise_on_internal_address("8.8.8.8")
+    with pytest.raises(InternalAddressError):
+        raise_on_internal_address("169.254.169.254")
+    with pytest.raises(InternalAddressError):
+        run_check_config("get", "http://[::1]:8000/", (), {}, HTTPWrapConfig())
+
+
+def counting_getaddrinfo(monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    lookups: List[str] = []
+
+    def getaddrinfo(host: str, *args: Any, **kwargs: Any) -> list:
+        lookups.append(host)
+        if host.startswith("dead"):
+            raise socket.gaierror(socket.EAI_NONAME, "not found")
+        if host.startswith("flaky"):
+            raise socket.gaierror(socket.EAI_AGAIN, "try again")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.9.8.7", 0))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    return lookups
+
+
+def test_failures_and_blocked_hosts_are_cached(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    lookups = counting_getaddrinfo(monkeypatch)
+    aggregator = MetricsAggregator()
+    config = HTTPWrapConfig(listeners=(aggregator,), deny_cidrs=("192.0.2.128/25",))
+    for _ in range(3):
+        with pytest.raises(ValueError, match="Unable to resolve"):
+            run_check_config("get", "https://dead-1.example/", (), {}, config)
+        with pytest.raises(InternalAddressError, match="10.9.8.7"):
+            run_check_config("get", "https://intranet-1.example/", (), {}, config)
+    assert lookups == ["dead-1.example", "intranet-1.example"]
+    assert aggregator.value("http_wrap.dns.negative_hit", reason="unresolved") == 2
+    assert aggregator.value("http_wrap.dns.negative_hit", reason="blocked") == 2
+    assert aggregator.value("http_wrap.dns.negative_store", reason="blocked") == 1
+    assert aggregator.value("http_wrap.dns.negative_size") == 2
+
+    uncached = HTTPWrapConfig(negative_cache_ttl=None)
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            run_check_config("get", "https://dead-2.example/", (), {}, uncached)
+    assert lookups.count("dead-2.example") == 2
+
+
+def test_negative_cache_ttl_and_size(monkeypatch: pytest.MonkeyPatch) -> None:
+    lookups = counting_getaddrinfo(monkeypatch)
+    cache = NegativeCache(ttl=0.05, maxsize=2)
+    for host in ("dead-a.example", "dead-b.example", "dead-c.example"):
+        with pytest.raises(ValueError):
+            raise_on_internal_address(host, negative_cache=cache)
+    assert len(cache) == 2 and cache.get("dead-a.example") is None
+    reason, error = cache.get("dead-c.example")  # type: ignore[misc]
+    assert reason == "unresolved" and isinstance(error, ValueError)
+
+    time.sleep(0.06)
+    assert cache.get("dead-c.example") is None
+    with pytest.raises(ValueError):
+        raise_on_internal_address("dead-c.example", negative_cache=cache)
+    assert lookups.count("dead-c.example") == 2
+
+
+def test_transient_resolver_failures_are_not_cached(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    lookups = counting_getaddrinfo(monkeypatch)
+    cache = NegativeCache()
+    for _ in range(3):
+        with pytest.raises(ValueError, match="Unable to resolve"):
+            raise_on_internal_address("flaky.example", negative_cache=cache)
+    assert lookups == ["flaky.example"] * 3
+    assert len(cache) == 0
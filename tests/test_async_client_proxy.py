@@ -0,0 +1,139 @@
+import threading
+from typing import Any, List, Mapping, Sequence, Tuple
+
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.metrics import RequestEvent, record_phase
+from http_wrap.mock import MockTransport, reply
+from http_wrap.proxies import AsyncClientProxy, AsyncResponseProxy
+
+url = "https://api.example.com/items"
+
+
+@pytest.fixture
+def transport() -> MockTransport:
+    transport = MockTransport(seed=1, sleep=False)
+    transport.add(
+        "GET",
+        "/items",
+        json={"items": [1, 2]},
+        headers={"Authorization": "secret", "X-Mock": "1"},
+    )
+    transport.add("GET", "/big", body_size=4096)
+    return transport
+
+
+@pytest.mark.parametrize("flavor", ["aiohttp", "httpx"])
+async def test_wrapped_async_session_returns_usable_proxy(
+    transport: MockTransport, flavor: Any
+) -> None:
+    config = HTTPWrapConfig(
+        allow_internal=True, sanitize_resp_header=(["authorization"], [], [], [])
+    )
+    async with make_client_session(
+        transport.async_sessionmaker(flavor), config
+    ) as client:
+        assert isinstance(client, AsyncClientProxy)
+        response = await client.get(url)
+
+    assert isinstance(response, AsyncResponseProxy)
+    assert response.status_code == 200
+    assert response.ok is True
+    assert response.headers["authorization"] == "<redacted>"
+    assert await response.json() == {"items": [1, 2]}
+    assert await response.text() == '{"items": [1, 2]}'
+    assert response.encoding == "utf-8"
+
+
+async def test_preloaded_body_releases_connection(transport: MockTransport) -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    async with make_client_session(
+        transport.async_sessionmaker("aiohttp"), config
+    ) as client:
+        response = await client.request("GET", url)
+    assert response.__wrapped__.closed is True
+    assert await response.content() == b'{"items": [1, 2]}'
+
+
+async def test_bodies_over_preload_limit_stay_on_connection(
+    transport: MockTransport,
+) -> None:
+    config = HTTPWrapConfig(allow_internal=True, preload_limit=1024)
+    async with make_client_session(
+        transport.async_sessionmaker("aiohttp"), config
+    ) as client:
+        async with await client.get("https://api.example.com/big") as response:
+            assert response.__wrapped__.closed is False
+            assert len(await response.content()) == 4096
+        assert response.__wrapped__.closed is True
+
+
+async def test_check_runs_in_executor_and_reports_phases() -> None:
+    transport = MockTransport(sleep=False)
+    transport.add("GET", "/", body="ok")
+    threads: List[threading.Thread] = []
+    events: List[RequestEvent] = []
+
+    def run_check(
+        method: str, url: Any, args: Sequence[Any], kwargs: Mapping[str, Any]
+    ) -> Tuple[Sequence[Any], Mapping[str, Any]]:
+        threads.append(threading.current_thread())
+        record_phase("dns", 0.5)
+        return args, kwargs
+
+    class Collector:
+        def on_request(self, event: RequestEvent) -> None:
+            events.append(event)
+
+    session = await transport.async_sessionmaker("aiohttp")()
+    client = AsyncClientProxy(
+        session,
+        run_check,
+        AsyncResponseProxy,
+        listeners=[Collector()],
+        check_in_executor=True,
+    )
+    response = await client.get("https://api.example.com/")
+
+    assert threads[0] is not threading.current_thread()
+    assert await response.text() == "ok"
+    (event,) = events
+    assert event.status == 200
+    assert event.dns == 0.5
+    assert event.read >= 0
+    assert event.total >= event.send + event.read
+
+
+async def test_unknown_length_bodies_are_preloaded() -> None:
+    transport = MockTransport(sleep=False)
+    transport.route("GET", "/stream")(
+        lambda request: reply(200, b"chunked", headers={"Content-Length": ""})
+    )
+    session = await transport.async_sessionmaker("httpx")()
+    client = AsyncClientProxy(
+        session, lambda m, u, a, k: (a, k), AsyncResponseProxy, preload_limit=1024
+    )
+    response = await client.get("https://api.example.com/stream")
+    assert response._self_body == b"chunked"
+
+
+@pytest.mark.parametrize("flavor", ["aiohttp", "httpx"])
+async def test_unknown_length_preload_stops_at_the_limit(flavor: str) -> None:
+    body = bytes(range(256)) * 4096  # 1 MiB
+    transport = MockTransport(sleep=False)
+    transport.route("GET", "/stream")(
+        lambda request: reply(200, body, headers={"Content-Length": ""})
+    )
+    # max_body_size: httpx streams the body instead of reading it in full
+    config = HTTPWrapConfig(allow_internal=True, preload_limit=10, max_body_size=2**21)
+    async with make_client_session(
+        transport.async_sessionmaker(flavor), config
+    ) as client:
+        response = await client.get("https://api.example.com/stream")
+        assert response._self_body is None
+        if flavor == "aiohttp":
+            assert response._self_pending.head == [body[:11]]
+            assert not response.__wrapped__.content.at_eof()
+        assert await response.content() == body
@@ -0,0 +1,25 @@
+import json
+from pathlib import Path
+
+from benchmarks.bench_overhead import main
+
+
+def test_bench_overhead_smoke(tmp_path: Path) -> None:
+    output = tmp_path / "bench.json"
+    report = main(
+        [
+            "-n=5",
+            "--warmup=1",
+            "--alloc-samples=2",
+            "--backends=requests",
+            "--configs=default",
+            f"--output={output}",
+        ]
+    )
+
+    assert json.loads(output.read_text()) == report
+    raw, wrapped = report["results"]
+    assert (raw["mode"], wrapped["mode"]) == ("raw", "wrapped")
+    assert "error" not in wrapped
+    assert wrapped["rps"] > 0
+    assert "p50_overhead_ms" in wrapped
@@ -0,0 +1,127 @@
+from typing import Any
+
+import httpx
+import pytest
+import requests
+import responses
+from pytest_httpx import HTTPXMock
+
+from http_wrap.body import (
+    BodyAccumulator,
+    BodyLimits,
+    ResponseTooLargeError,
+    SpooledBody,
+    read_chunks,
+)
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.mock import MockTransport, reply
+
+url = "https://api.example.com/data"
+payload = b'{"data": "' + b"x" * 1000 + b'"}'
+
+
+def test_small_bodies_stay_in_memory() -> None:
+    body = read_chunks([b"ab", b"cd"], BodyLimits(max_size=10, spool_threshold=10))
+    assert body == b"abcd"
+
+
+def test_large_bodies_spool_to_a_readonly_mapping() -> None:
+    body = read_chunks([b"ab"] * 10, BodyLimits(spool_threshold=5))
+    assert isinstance(body, SpooledBody)
+    assert len(body) == 20
+    assert body.view.readonly
+    assert bytes(body) == b"ab" * 10
+    body.close()
+
+
+def test_streaming_counter_aborts_without_content_length() -> None:
+    accumulator = BodyAccumulator(BodyLimits(max_size=5, spool_threshold=2))
+    accumulator.feed(b"abc")
+    with pytest.raises(ResponseTooLargeError):
+        accumulator.feed(b"def")
+
+
+@responses.activate
+def test_requests_aborts_on_declared_length() -> None:
+    responses.add(responses.GET, url, body=payload)
+    config = HTTPWrapConfig(allow_internal=True, max_body_size=100)
+    with make_client_session(requests.Session, config) as client:
+        with pytest.raises(ResponseTooLargeError):
+            client.get(url)
+
+
+@responses.activate
+def test_requests_spools_streamed_body() -> None:
+    responses.add(responses.GET, url, body=payload)
+    config = HTTPWrapConfig(allow_internal=True, spool_threshold=100)
+    with make_client_session(requests.Session, config) as client:
+        response = client.get(url)
+    assert isinstance(response.content, memoryview)
+    assert response.json() == {"data": "x" * 1000}
+    assert response.text == payload.decode()
+
+
+def test_httpx_reads_through_stream(httpx_mock: HTTPXMock) -> None:
+    httpx_mock.add_response(url=url, content=payload)
+    config = HTTPWrapConfig(
+        allow_internal=True, max_body_size=4096, spool_threshold=100
+    )
+    with make_client_session(httpx.Client, config) as client:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert bytes(response.content) == payload
+
+
+@pytest.mark.parametrize("flavor", ["aiohttp", "httpx"])
+async def test_async_unknown_length_is_bounded(flavor: Any) -> None:
+    transport = MockTransport(sleep=False)
+    transport.route("GET", "/data")(
+        lambda request: reply(200, payload, headers={"Content-Length": ""})
+    )
+    config = HTTPWrapConfig(allow_internal=True, max_body_size=100)
+    async with make_client_session(
+        transport.async_sessionmaker(flavor), config
+    ) as client:
+        with pytest.raises(ResponseTooLargeError):
+            await client.get(url)
+
+
+@pytest.mark.parametrize("flavor", ["aiohttp", "httpx"])
+async def test_async_bodies_spool_past_threshold(flavor: Any) -> None:
+    transport = MockTransport(sleep=False)
+    transport.add("GET", "/data", body=payload)
+    config = HTTPWrapConfig(allow_internal=True, spool_threshold=100)
+    async with make_client_session(
+        transport.async_sessionmaker(flavor), config
+    ) as client:
+        response = await client.get(url)
+    content = await response.content()
+    assert isinstance(content, memoryview) and content.readonly
+    assert await response.json() == {"data": "x" * 1000}
+    assert await response.text() == payload.decode()
+
+
+@responses.activate
+def test_closing_unmaps_a_spooled_body() -> None:
+    responses.add(responses.GET, url, body=payload)
+    config = HTTPWrapConfig(allow_internal=True, spool_threshold=100)
+    with make_client_session(requests.Session, config) as client:
+        with client.get(url) as response:
+            body = response._self_body
+            assert bytes(response.content) == payload
+    assert isinstance(body, SpooledBody) and body._mmap.closed
+
+
+@pytest.mark.parametrize("flavor", ["aiohttp", "httpx"])
+async def test_releasing_unmaps_a_spooled_body(flavor: Any) -> None:
+    transport = MockTransport(sleep=False)
+    transport.add("GET", "/data", body=payload)
+    config = HTTPWrapConfig(allow_internal=True, spool_threshold=100)
+    async with make_client_session(
+        transport.async_sessionmaker(flavor), config
+    ) as client:
+        async with await client.get(url) as response:
+            assert bytes(await response.content()) == payload
+            body = response._self_body
+    assert isinstance(body, SpooledBody) and body._mmap.closed
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from http_wrap.bridge import EventLoopThread, shared_loop
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_bridged_client_session
+from http_wrap.mock import MockTransport, constant
+
+url = "https://api.example.com/items"
+
+
+@pytest.fixture
+def transport() -> MockTransport:
+    transport = MockTransport()
+    transport.add(
+        "GET",
+        "/items",
+        json={"items": [1, 2]},
+        headers={"X-Token": "secret"},
+        latency=constant(0.05),
+    )
+    return transport
+
+
+@pytest.fixture
+def loop_thread() -> Iterator[EventLoopThread]:
+    loop_thread = EventLoopThread()
+    yield loop_thread
+    loop_thread.stop()
+
+
+@pytest.mark.parametrize("flavor", ["aiohttp", "httpx"])
+def test_sync_calls_run_on_the_loop(
+    transport: MockTransport, loop_thread: EventLoopThread, flavor: str
+) -> None:
+    config = HTTPWrapConfig(
+        allow_internal=True, sanitize_resp_header=(["x-token"], [], [], [])
+    )
+    sessionmaker = transport.async_sessionmaker(flavor)
+    with make_bridged_client_session(sessionmaker, config, loop_thread) as client:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.json() == {"items": [1, 2]}
+        assert response.text == '{"items": [1, 2]}'
+        assert response.headers["x-token"] == "<redacted>"
+        assert response.raise_for_status() is response
+
+
+def test_batch_fans_out_on_one_loop(
+    transport: MockTransport, loop_thread: EventLoopThread
+) -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    sessionmaker = transport.async_sessionmaker("aiohttp")
+    with make_bridged_client_session(sessionmaker, config, loop_thread) as client:
+        start = time.perf_counter()
+        futures = client.batch([url] * 200)
+        statuses = [future.result(5).status_code for future in futures]
+        elapsed = time.perf_counter() - start
+    assert statuses == [200] * 200
+    assert elapsed < 2  # 200 x 50ms, concurrently
+    assert len(transport.calls) == 200
+
+
+def test_submit_carries_the_caller_context(loop_thread: EventLoopThread) -> None:
+    var: ContextVar[str] = ContextVar("var", default="loop")
+
+    async def read() -> str:
+        await asyncio.sleep(0)
+        return var.get()
+
+    var.set("caller")
+    assert loop_thread.run(read()) == "caller"
+
+
+def test_cancelled_futures_do_not_run(loop_thread: EventLoopThread) -> None:
+    gate = threading.Event()
+    ran = []
+
+    async def block() -> None:
+        gate.wait(1)
+
+    async def mark() -> None:
+        ran.append(True)
+
+    loop_thread.submit([block()])
+    (future,) = loop_thread.submit([mark()])
+    assert future.cancel()
+    gate.set()
+    loop_thread.run(asyncio.sleep(0))
+    assert ran == []
+
+
+def test_bridge_needs_an_async_sessionmaker(transport: MockTransport) -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    with pytest.raises(TypeError, match="async sessionmaker"):
+        with make_bridged_client_session(transport.sessionmaker(), config):
+            pass
+
+
+def test_async_proxy_methods_run_on_the_loop(
+    transport: MockTransport, loop_thread: EventLoopThread, tmp_path: Path
+) -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    sessionmaker = transport.async_sessionmaker("aiohttp")
+    with make_bridged_client_session(sessionmaker, config, loop_thread) as client:
+        result = client.download(url, tmp_path / "items.json")
+        assert (tmp_path / "items.json").read_bytes() == b'{"items": [1, 2]}'
+        assert result.size == 17
+        with pytest.raises(TypeError, match="async-only"):
+            client.paginate(url)
+
+
+def test_requests_are_refused_on_the_loop_thread(
+    transport: MockTransport, loop_thread: EventLoopThread
+) -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    sessionmaker = transport.async_sessionmaker("httpx")
+    with make_bridged_client_session(sessionmaker, config, loop_thread) as client:
+
+        async def get() -> None:
+            client.get(url)
+
+        with pytest.raises(RuntimeError, match="own thread"):
+            loop_thread.run(get(), timeout=5)
+
+
+def test_shared_loop_is_one_per_process() -> None:
+    assert shared_loop() is shared_loop()
+    with pytest.raises(RuntimeError, match="own thread"):
+        shared_loop().run(_run_from_loop())
+
+
+async def _run_from_loop() -> None:
+    coro = asyncio.sleep(0)
+    try:
+        shared_loop().run(coro)
+    finally:
+        coro.close()
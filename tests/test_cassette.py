@@ -0,0 +1,115 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from http_wrap.cassette import Cassette, Interaction, request_key
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.mock import MockTransport, constant
+
+base = "https://api.example.com"
+
+
+def upstream() -> MockTransport:
+    transport = MockTransport()
+    transport.add(
+        "GET",
+        "/items",
+        json={"items": [1, 2]},
+        headers={"X-Api-Token": "secret", "X-Request-Id": "abc"},
+        latency=constant(0.05),
+    )
+    transport.add("GET", "/blob", body=b"\x89PNG\x00\xff")
+    transport.add("POST", "/items", status=201, json={"id": 7})
+    return transport
+
+
+def record(path: Path) -> Cassette:
+    cassette = Cassette()
+    config = HTTPWrapConfig(
+        allow_internal=True,
+        sanitize_resp_header=(["x-api-token"], [], [], []),
+        record_to=cassette,
+    )
+    with make_client_session(upstream().sessionmaker("httpx"), config) as client:
+        client.get(f"{base}/items", params={"page": 1, "size": 10})
+        client.get(f"{base}/blob")
+        client.post(f"{base}/items", json={"name": "x"})
+    cassette.save(path)
+    return cassette
+
+
+def test_recording_redacts_and_times_responses(tmp_path: Path) -> None:
+    cassette = record(tmp_path / "traffic.jsonl.gz")
+    assert [(i.method, i.status) for i in cassette.interactions] == [
+        ("GET", 200),
+        ("GET", 200),
+        ("POST", 201),
+    ]
+    items = cassette.interactions[0]
+    assert dict(items.headers)["x-api-token"] == "<redacted>"
+    assert items.elapsed >= 0.05
+
+    loaded = Cassette.load(tmp_path / "traffic.jsonl.gz")
+    assert [i.body for i in loaded.interactions] == [
+        i.body for i in cassette.interactions
+    ]
+    assert loaded.interactions[1].body == b"\x89PNG\x00\xff"
+
+
+@pytest.mark.parametrize("flavor", ["requests", "httpx"])
+def test_sync_replay(tmp_path: Path, flavor: str) -> None:
+    record(tmp_path / "traffic.jsonl")
+    cassette = Cassette.load(tmp_path / "traffic.jsonl")
+    config = HTTPWrapConfig(allow_internal=True)
+    with make_client_session(cassette.sessionmaker(flavor, scale=0), config) as client:
+        start = time.perf_counter()
+        response = client.get(f"{base}/items", params={"size": 10, "page": 1})
+        assert time.perf_counter() - start < 0.05
+        assert response.json() == {"items": [1, 2]}
+        assert response.headers["x-request-id"] == "abc"
+        assert client.get(f"{base}/blob").content == b"\x89PNG\x00\xff"
+        assert client.post(f"{base}/items", json={}).status_code == 201
+        assert client.get(f"{base}/missing").status_code == 404
+
+
+async def test_async_replay_with_scaled_timing(tmp_path: Path) -> None:
+    record(tmp_path / "traffic.jsonl")
+    cassette = Cassette.load(tmp_path / "traffic.jsonl")
+    config = HTTPWrapConfig(allow_internal=True)
+    sessionmaker = cassette.async_sessionmaker("aiohttp", scale=2.0)
+    async with make_client_session(sessionmaker, config) as client:
+        start = time.perf_counter()
+        response = await client.get(f"{base}/items?size=10&page=1")
+        assert time.perf_counter() - start >= 0.1
+        assert await response.json() == {"items": [1, 2]}
+
+
+def test_repeated_requests_cycle_through_recordings() -> None:
+    cassette = Cassette(
+        Interaction("GET", f"{base}/n", 200, (), str(i).encode(), 0.0) for i in range(2)
+    )
+    config = HTTPWrapConfig(allow_internal=True)
+    with make_client_session(cassette.sessionmaker(scale=0), config) as client:
+        bodies = [client.get(f"{base}/n").content for _ in range(3)]
+    assert bodies == [b"0", b"1", b"0"]
+    assert request_key("get", f"{base}/n?b=2&a=1") == request_key(
+        "GET", f"{base}/n?a=1&b=2"
+    )
+
+
+def test_credentials_in_urls_are_not_recorded(tmp_path: Path) -> None:
+    cassette = Cassette()
+    config = HTTPWrapConfig(allow_internal=True, record_to=cassette)
+    with make_client_session(upstream().sessionmaker("httpx"), config) as client:
+        client.get("https://user:pw@api.example.com/items?api_key=s3cr3t&page=1")
+    cassette.save(tmp_path / "traffic.jsonl")
+    saved = (tmp_path / "traffic.jsonl").read_text()
+    assert "s3cr3t" not in saved and "pw@" not in saved
+    assert cassette.interactions[0].url == f"{base}/items?api_key=<redacted>&page=1"
+
+    replay = Cassette.load(tmp_path / "traffic.jsonl").sessionmaker(scale=0)
+    with make_client_session(replay, config) as client:
+        response = client.get(f"{base}/items?page=1&api_key=other")
+        assert response.json() == {"items": [1, 2]}
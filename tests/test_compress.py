@@ -0,0 +1,100 @@
+import gzip
+import io
+import json
+from typing import Any, AsyncIterator, Iterator, List
+
+import pytest
+import zstandard
+
+from http_wrap.compress import CompressionRule, compress_request, find_rule
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.metrics import Metric, MetricsAggregator
+from http_wrap.mock import MockTransport
+
+url = "https://ingest.example.com/v1/batch"
+records = [{"id": i, "name": "record", "tags": ["a", "b", "c"]} for i in range(500)]
+raw = b"x" * 50_000
+
+
+def chunks() -> Iterator[bytes]:
+    for i in range(0, len(raw), 4096):
+        yield raw[i : i + 4096]
+
+
+async def achunks() -> AsyncIterator[bytes]:
+    for chunk in chunks():
+        yield chunk
+
+
+def test_rules_match_host_and_route() -> None:
+    rules = [
+        CompressionRule(host="ingest.example.com", path="/v1/*", codec="zstd"),
+        CompressionRule(host="*.example.com"),
+    ]
+    assert find_rule(rules, url) is rules[0]
+    assert find_rule(rules, "https://api.example.com/items") is rules[1]
+    assert find_rule(rules, "https://example.org/") is None
+
+
+def test_json_bodies_are_compressed_through_the_proxy() -> None:
+    transport = MockTransport(sleep=False)
+    transport.add("POST", "/v1/batch", status=202)
+    aggregator = MetricsAggregator()
+    config = HTTPWrapConfig(
+        allow_internal=True,
+        listeners=(aggregator,),
+        compress_requests=(CompressionRule(host="ingest.example.com"),),
+    )
+    with make_client_session(transport.sessionmaker("requests"), config) as client:
+        assert client.post(url, json=records).status_code == 202
+
+    (call,) = transport.calls
+    assert call.headers["Content-Encoding"] == "gzip"
+    assert call.headers["Content-Type"] == "application/json"
+    assert json.loads(gzip.decompress(call.data)) == records
+
+    tags = {"codec": "gzip", "host": "ingest.example.com"}
+    assert aggregator.value("http_wrap.compress.bytes_out", **tags) == len(call.data)
+    assert aggregator.value("http_wrap.compress.ratio", **tags) < 0.2
+    assert aggregator.timing("http_wrap.compress.cpu", **tags).count == 1
+
+
+def test_bodies_below_threshold_are_left_alone() -> None:
+    rule = CompressionRule(min_size=1024)
+    kwargs = {"data": b"small", "headers": {"X-Id": "1"}}
+    assert compress_request(rule, url, kwargs) is kwargs
+    encoded = {"data": raw, "headers": {"Content-Encoding": "br"}}
+    assert compress_request(rule, url, encoded) is encoded
+    form = {"data": {"field": "value" * 500}}
+    assert compress_request(rule, url, form) is form
+
+
+def test_streams_are_compressed_incrementally() -> None:
+    metrics: List[Metric] = []
+    kwargs = {"data": chunks(), "headers": {"Content-Length": str(len(raw))}}
+    prepared = compress_request(
+        CompressionRule(codec="zstd"), url, kwargs, metrics.append
+    )
+    assert "Content-Length" not in prepared["headers"]
+    assert prepared["headers"]["Content-Encoding"] == "zstd"
+    assert not metrics  # nothing is compressed before the body is sent
+
+    body = b"".join(prepared["data"])
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(body) == raw
+    assert [m.name for m in metrics][:2] == [
+        "http_wrap.compress.bytes_in",
+        "http_wrap.compress.bytes_out",
+    ]
+    assert metrics[0].value == len(raw)
+
+
+@pytest.mark.parametrize("body", ["file", "async"])
+async def test_file_and_async_bodies(body: Any) -> None:
+    data = io.BytesIO(raw) if body == "file" else achunks()
+    prepared = compress_request(CompressionRule(), url, {"data": data})
+    if body == "file":
+        compressed = b"".join(prepared["data"])
+    else:
+        compressed = b"".join([chunk async for chunk in prepared["data"]])
+    assert gzip.decompress(compressed) == raw
@@ -0,0 +1,81 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.decode import BodyDecoder
+from http_wrap.httpwrap import make_client_session
+from http_wrap.metrics import Metric, MetricsAggregator
+from http_wrap.mock import MockTransport
+
+small = b'{"a": 1}'
+large = b'{"data": "' + b"x" * 100 + b'"}'
+
+
+async def test_small_bodies_decode_inline() -> None:
+    decoder = BodyDecoder(threshold=64)
+    assert await decoder.json(small) == {"a": 1}
+    assert await decoder.text(small, "utf-8") == small.decode()
+    assert decoder.counts == {"inline": 2, "thread": 0, "process": 0}
+
+
+async def test_large_bodies_decode_in_executor() -> None:
+    threads: List[threading.Thread] = []
+
+    def hook(obj: Dict[str, Any]) -> Dict[str, Any]:
+        threads.append(threading.current_thread())
+        return obj
+
+    with ThreadPoolExecutor(1) as executor:
+        decoder = BodyDecoder(threshold=64, executor=executor)
+        data = await decoder.json(large, object_hook=hook)
+        text = await decoder.text(large, "utf-8")
+
+    assert data == {"data": "x" * 100}
+    assert text == large.decode()
+    assert threads[0] is not threading.current_thread()
+    assert decoder.counts["thread"] == 2
+
+
+async def test_very_large_json_goes_to_process_executor() -> None:
+    metrics: List[Metric] = []
+    with ThreadPoolExecutor(1) as threads, ThreadPoolExecutor(1) as processes:
+        decoder = BodyDecoder(
+            threshold=16,
+            executor=threads,
+            process_threshold=64,
+            process_executor=processes,
+            sink=metrics.append,
+        )
+        await decoder.json(large)
+        await decoder.json(large, parse_int=int)
+        await decoder.text(large, "utf-8")
+
+    assert decoder.counts == {"inline": 0, "thread": 2, "process": 1}
+    assert [dict(m.tags)["route"] for m in metrics[::2]] == [
+        "process",
+        "thread",
+        "thread",
+    ]
+
+
+async def test_offload_metrics_reach_client_listeners() -> None:
+    transport = MockTransport(sleep=False)
+    transport.add("GET", "/big", body_size=4096)
+    aggregator = MetricsAggregator()
+    config = HTTPWrapConfig(
+        allow_internal=True, decode_offload_threshold=1024, listeners=(aggregator,)
+    )
+
+    async with make_client_session(
+        transport.async_sessionmaker("aiohttp"), config
+    ) as client:
+        response = await client.get("https://api.example.com/big")
+        assert len((await response.json())["data"]) == 4096 - 12
+
+    assert aggregator.value("http_wrap.decode.calls", route="thread", format="json")
+    assert aggregator.value(
+        "http_wrap.decode.bytes", route="thread", format="json"
+    ) == pytest.approx(4096)
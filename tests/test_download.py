@@ -0,0 +1,236 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+import aiohttp
+import httpx
+import pytest
+import requests
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.download import DownloadError
+from http_wrap.httpwrap import make_client_session
+from http_wrap.mock import MockReply, MockRequest, MockTransport, reply
+
+url = "https://files.example.com/artifact.bin"
+payload = bytes(range(256)) * 40
+config = HTTPWrapConfig(allow_internal=True)
+
+
+def ranged_transport(
+    etag: str = '"v1"', fail_at: int = -1, shift: int = 0
+) -> MockTransport:
+    """Serves `payload` honouring Range/If-Range, failing ranges from `fail_at`
+    (and answering ranges `shift` bytes off when asked to)."""
+    transport = MockTransport(sleep=False)
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+
+    @transport.route("*", "/artifact.bin")
+    def serve(request: MockRequest) -> MockReply:
+        requested = request.headers.get("Range")
+        if_range = request.headers.get("If-Range")
+        if request.method == "HEAD" or not requested or if_range not in (None, etag):
+            return reply(200, payload, headers=headers)
+        start, _, end = requested[len("bytes=") :].partition("-")
+        first, last = int(start), int(end) if end else len(payload) - 1
+        if first == fail_at:
+            raise ConnectionError("connection reset")
+        if first >= len(payload):
+            return reply(416, b"", headers=headers)
+        first = min(first + shift, last)
+        return reply(
+            206,
+            payload[first : last + 1],
+            headers={
+                **headers,
+                "Content-Range": f"bytes {first}-{last}/{len(payload)}",
+            },
+        )
+
+    return transport
+
+
+def write_state(directory: Path, validator: str) -> None:
+    state = {"url": url, "validator": validator, "size": None, "ranges": [[0, None, 0]]}
+    (directory / "artifact.bin.part.json").write_text(json.dumps(state))
+
+
+def ranges(transport: MockTransport) -> List[Dict[str, str]]:
+    return [
+        {k: v for k, v in call.headers.items() if k in ("Range", "If-Range")}
+        for call in transport.calls
+        if call.method == "GET"
+    ]
+
+
+@pytest.mark.parametrize("flavor", ["requests", "httpx"])
+def test_single_stream_download(tmp_path: Path, flavor: Any) -> None:
+    transport = ranged_transport()
+    target = tmp_path / "artifact.bin"
+    with make_client_session(transport.sessionmaker(flavor), config) as client:
+        result = client.download(url, target)
+    assert target.read_bytes() == payload
+    assert result.size == len(payload) and result.validator == '"v1"'
+    assert not (tmp_path / "artifact.bin.part.json").exists()
+
+
+def test_parallel_ranges_resume_after_failure(tmp_path: Path) -> None:
+    transport = ranged_transport(fail_at=len(payload) // 2)
+    target = tmp_path / "artifact.bin"
+    with make_client_session(transport.sessionmaker("requests"), config) as client:
+        with pytest.raises(ConnectionError):
+            client.download(url, target, parts=4)
+        state = json.loads((tmp_path / "artifact.bin.part.json").read_text())
+        assert [r[2] for r in state["ranges"]] == [2560, 2560, 0, 2560]
+
+        transport = ranged_transport()
+        client.__wrapped__.transport = transport
+        result = client.download(url, target, parts=4)
+
+    assert target.read_bytes() == payload
+    assert result.resumed_from == 3 * 2560
+    assert ranges(transport) == [{"Range": "bytes=5120-7679", "If-Range": '"v1"'}]
+
+
+def test_resume_restarts_when_validator_changed(tmp_path: Path) -> None:
+    target = tmp_path / "artifact.bin"
+    (tmp_path / "artifact.bin.part").write_bytes(b"stale" * 10)
+    write_state(tmp_path, '"v0"')
+    transport = ranged_transport()
+    with make_client_session(transport.sessionmaker("httpx"), config) as client:
+        result = client.download(url, target)
+
+    assert ranges(transport) == [{"Range": "bytes=50-", "If-Range": '"v0"'}]
+    assert target.read_bytes() == payload
+    assert result.resumed_from == 50
+
+
+def test_parallel_download_rejects_changed_resource(tmp_path: Path) -> None:
+    target = tmp_path / "artifact.bin"
+    transport = ranged_transport(fail_at=0)
+    with make_client_session(transport.sessionmaker("requests"), config) as client:
+        with pytest.raises(ConnectionError):
+            client.download(url, target, parts=2)
+        client.__wrapped__.transport = ranged_transport(etag='"v2"')
+        with pytest.raises(DownloadError):
+            client.download(url, target, parts=2)
+    assert not (tmp_path / "artifact.bin.part").exists()
+
+
+@pytest.mark.parametrize("flavor", ["aiohttp", "httpx"])
+async def test_async_parallel_download(tmp_path: Path, flavor: Any) -> None:
+    transport = ranged_transport()
+    target = tmp_path / "artifact.bin"
+    async with make_client_session(
+        transport.async_sessionmaker(flavor), config
+    ) as client:
+        result = await client.download(url, target, parts=3, chunk_size=1000)
+    assert target.read_bytes() == payload
+    assert result.parts == 3
+    assert len(ranges(transport)) == 3
+
+
+async def test_async_resume_single_stream(tmp_path: Path) -> None:
+    target = tmp_path / "artifact.bin"
+    (tmp_path / "artifact.bin.part").write_bytes(payload[:1000])
+    write_state(tmp_path, '"v1"')
+    transport = ranged_transport()
+    async with make_client_session(
+        transport.async_sessionmaker("aiohttp"), config
+    ) as client:
+        result = await client.download(url, target)
+    assert ranges(transport) == [{"Range": "bytes=1000-", "If-Range": '"v1"'}]
+    assert target.read_bytes() == payload
+    assert result.size == len(payload)
+
+
+@pytest.mark.parametrize("parts", [1, 2])
+def test_misplaced_ranges_are_rejected(tmp_path: Path, parts: int) -> None:
+    target = tmp_path / "artifact.bin"
+    (tmp_path / "artifact.bin.part").write_bytes(payload[:1000])
+    write_state(tmp_path, '"v1"')
+    transport = ranged_transport(shift=10)
+    with make_client_session(transport.sessionmaker("requests"), config) as client:
+        with pytest.raises(DownloadError, match="starting at byte 1000"):
+            client.download(url, target, parts=parts)
+    assert (tmp_path / "artifact.bin.part").read_bytes() == payload[:1000]
+
+
+async def test_async_misplaced_ranges_are_rejected(tmp_path: Path) -> None:
+    transport = ranged_transport(shift=10)
+    async with make_client_session(
+        transport.async_sessionmaker("aiohttp"), config
+    ) as client:
+        with pytest.raises(DownloadError, match="Content-Range"):
+            await client.download(url, tmp_path / "artifact.bin", parts=2)
+    assert not (tmp_path / "artifact.bin").exists()
+
+
+class _GzipHandler(BaseHTTPRequestHandler):
+    """Gzips `payload` for clients accepting it, serves ranges of the identity."""
+
+    protocol_version = "HTTP/1.1"
+    body = bytes(range(256)) * 2000
+
+    def do_HEAD(self) -> None:
+        self.do_GET()
+
+    def do_GET(self) -> None:
+        status, headers, body = 200, {"Accept-Ranges": "bytes"}, self.body
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            body = gzip.compress(body)
+        requested = self.headers.get("Range")
+        if requested:
+            start, _, end = requested[len("bytes=") :].partition("-")
+            first, last = int(start), int(end) if end else len(body) - 1
+            headers["Content-Range"] = f"bytes {first}-{last}/{len(body)}"
+            status, body = 206, body[first : last + 1]
+        self.send_response(status)
+        for name, value in {**headers, "Content-Length": str(len(body))}.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command == "GET":
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def gzip_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GzipHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/artifact.bin"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("sessionmaker", [requests.Session, httpx.Client])
+@pytest.mark.parametrize("parts", [1, 3])
+def test_download_from_gzipping_server(
+    tmp_path: Path, gzip_url: str, sessionmaker: Any, parts: int
+) -> None:
+    target = tmp_path / "artifact.bin"
+    with make_client_session(sessionmaker, config) as client:
+        result = client.download(gzip_url, target, parts=parts)
+    assert target.read_bytes() == _GzipHandler.body
+    assert result.parts == parts
+
+
+async def aiohttp_session(**kwargs: Any) -> aiohttp.ClientSession:
+    return aiohttp.ClientSession()
+
+
+async def test_async_download_from_gzipping_server(
+    tmp_path: Path, gzip_url: str
+) -> None:
+    target = tmp_path / "artifact.bin"
+    async with make_client_session(aiohttp_session, config) as client:
+        result = await client.download(gzip_url, target, parts=3)
+    assert target.read_bytes() == _GzipHandler.body
+    assert result.size == len(_GzipHandler.body)
@@ -0,0 +1,119 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+
+import aiohttp
+import httpx
+import pytest
+import requests
+
+from http_wrap.bridge import EventLoopThread
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_bridged_client_session, make_client_session
+from http_wrap.snapshot import Hop
+
+
+class _RedirectHandler(BaseHTTPRequestHandler):
+    """`/hops/<n>` redirects n times before answering."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        hops = int(self.path.rsplit("/", 1)[1])
+        if hops:
+            self.send_response(302)
+            self.send_header("Location", f"/hops/{hops - 1}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def server_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RedirectHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def httpx_client(**kwargs: Any) -> httpx.Client:
+    return httpx.Client(follow_redirects=True)
+
+
+async def aiohttp_session(**kwargs: Any) -> aiohttp.ClientSession:
+    return aiohttp.ClientSession()
+
+
+@pytest.mark.parametrize("sessionmaker", [requests.Session, httpx_client])
+def test_full_history_keeps_backend_responses(
+    server_url: str, sessionmaker: Any
+) -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    with make_client_session(sessionmaker, config) as client:
+        response = client.get(f"{server_url}/hops/2")
+    assert [hop.status_code for hop in response.history] == [302, 302]
+    assert str(response.original_url) == f"{server_url}/hops/2"
+    assert str(response.final_url) == f"{server_url}/hops/0"
+
+
+@pytest.mark.parametrize("sessionmaker", [requests.Session, httpx_client])
+def test_summary_history_keeps_hop_tuples(server_url: str, sessionmaker: Any) -> None:
+    config = HTTPWrapConfig(allow_internal=True, history_mode="summary")
+    with make_client_session(sessionmaker, config) as client:
+        response = client.get(f"{server_url}/hops/2")
+    assert not any(isinstance(hop, Hop) for hop in response.__wrapped__.history)
+    assert [hop[:3] for hop in response.history] == [
+        (302, f"{server_url}/hops/2", "/hops/1"),
+        (302, f"{server_url}/hops/1", "/hops/0"),
+    ]
+    assert all(isinstance(hop, Hop) for hop in response.history)
+    assert str(response.original_url) == f"{server_url}/hops/2"
+    assert response.snapshot().history == response.history
+
+
+@pytest.mark.parametrize("mode", ["summary", "none"])
+async def test_aiohttp_history_modes(server_url: str, mode: Any) -> None:
+    config = HTTPWrapConfig(allow_internal=True, history_mode=mode)
+    async with make_client_session(aiohttp_session, config) as client:
+        response = await client.get(f"{server_url}/hops/1")
+        assert await response.text() == "ok"
+    expected = [(302, f"{server_url}/hops/1", "/hops/0")] if mode == "summary" else []
+    assert [hop[:3] for hop in response.history] == expected
+    assert len(response.__wrapped__.history) == 1  # the backend is left alone
+    assert str(response.original_url) == f"{server_url}/hops/1"
+    assert response.host == "127.0.0.1"
+
+
+def test_bridged_responses_keep_the_trimmed_history(server_url: str) -> None:
+    config = HTTPWrapConfig(allow_internal=True, history_mode="summary")
+    loop_thread = EventLoopThread()
+    try:
+        with make_bridged_client_session(
+            aiohttp_session, config, loop_thread
+        ) as client:
+            response = client.get(f"{server_url}/hops/1")
+    finally:
+        loop_thread.stop()
+    assert [hop[:3] for hop in response.history] == [
+        (302, f"{server_url}/hops/1", "/hops/0")
+    ]
+    assert str(response.original_url) == f"{server_url}/hops/1"
+
+
+def test_no_history_still_knows_the_original_url(server_url: str) -> None:
+    config = HTTPWrapConfig(allow_internal=True, history_mode="none")
+    with make_client_session(requests.Session, config) as client:
+        response = client.get(f"{server_url}/hops/3")
+        direct = client.get(f"{server_url}/hops/0")
+    assert response.history == () and len(response.__wrapped__.history) == 3
+    assert response.original_url == f"{server_url}/hops/3"
+    assert direct.original_url == f"{server_url}/hops/0"
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+import pytest
+
+BACKENDS = ("aiohttp", "aiohappyeyeballs", "httpx", "requests")
+
+
+@pytest.mark.parametrize(
+    "module",
+    [
+        "http_wrap",
+        "http_wrap.httpwrap",
+        "http_wrap.proxies",
+        "http_wrap.mock",
+        "http_wrap.utils",
+    ],
+)
+def test_import_does_not_load_backends(module: str) -> None:
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {BACKENDS!r} if m in sys.modules))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert out.stdout.strip() == ""
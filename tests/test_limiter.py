@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.limiter import AdaptiveLimiter, ConcurrencyLimit, ConcurrencyLimitError
+from http_wrap.metrics import MetricsAggregator, RequestEvent
+from http_wrap.mock import MockReply, MockRequest, MockTransport, constant, reply
+
+url = "https://api.example.com/items"
+host = "api.example.com"
+
+
+class Events:
+    def __init__(self) -> None:
+        self.events: List[RequestEvent] = []
+
+    def on_request(self, event: RequestEvent) -> None:
+        self.events.append(event)
+
+
+def test_sync_requests_are_capped_per_host() -> None:
+    transport = MockTransport()
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+
+    @transport.route("GET", "/items")
+    def items(request: MockRequest) -> MockReply:
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.02)
+        with lock:
+            in_flight[0] -= 1
+        return reply(json={})
+
+    events = Events()
+    limit = ConcurrencyLimit(algorithm="aimd", initial=2, max_limit=2, max_wait=5)
+    config = HTTPWrapConfig(
+        allow_internal=True, concurrency_limit=limit, listeners=(events,)
+    )
+    with make_client_session(transport.sessionmaker(), config) as client:
+        with ThreadPoolExecutor(8) as pool:
+            statuses = list(pool.map(lambda _: client.get(url).status_code, range(8)))
+    assert statuses == [200] * 8
+    assert peak[0] == 2
+    assert max(event.queue for event in events.events) > 0.01
+
+
+def test_requests_waiting_too_long_are_rejected() -> None:
+    transport = MockTransport()
+    release = threading.Event()
+
+    @transport.route("GET", "/slow")
+    def slow(request: MockRequest) -> MockReply:
+        release.wait(5)
+        return reply()
+
+    aggregator = MetricsAggregator()
+    limit = ConcurrencyLimit(initial=1, max_limit=1, max_wait=0.05)
+    config = HTTPWrapConfig(
+        allow_internal=True, concurrency_limit=limit, listeners=(aggregator,)
+    )
+    with make_client_session(transport.sessionmaker(), config) as client:
+        with ThreadPoolExecutor(1) as pool:
+            first = pool.submit(client.get, "https://api.example.com/slow")
+            while not transport.calls:
+                time.sleep(0.001)
+            with pytest.raises(ConcurrencyLimitError):
+                client.get(url)
+            release.set()
+            assert first.result().status_code == 200
+        assert client.get(url).status_code == 404  # the slot was given back
+    assert aggregator.value("http_wrap.limiter.rejected", host=host) == 1
+    assert aggregator.value("http_wrap.limiter.limit", host=host) == 1
+
+
+def samples(
+    limiter: AdaptiveLimiter, count: int, rtt: float, dropped: bool = False
+) -> None:
+    for _ in range(count):
+        permits = [limiter.acquire(host) for _ in range(limiter.limit(host))]
+        for permit in permits:
+            permit.start -= rtt
+            permit.release(dropped)
+
+
+def test_aimd_limit() -> None:
+    limiter = AdaptiveLimiter(ConcurrencyLimit("aimd", initial=10, max_limit=50))
+    samples(limiter, 2, 0.01)
+    grown = limiter.limit(host)
+    assert grown > 10
+    samples(limiter, 1, 0.01, dropped=True)
+    assert limiter.limit(host) < grown / 2
+
+    slow = AdaptiveLimiter(ConcurrencyLimit("aimd", latency_threshold=0.1))
+    samples(slow, 1, 0.5)
+    assert slow.limit(host) < 20
+
+
+def test_gradient_limit_follows_latency() -> None:
+    aggregator = MetricsAggregator()
+    limiter = AdaptiveLimiter(ConcurrencyLimit(max_limit=100), aggregator.on_metric)
+    samples(limiter, 10, 0.01)
+    grown = limiter.limit(host)
+    assert grown > 20
+    samples(limiter, 1, 0.1)  # latency inflates tenfold
+    assert limiter.limit(host) < grown / 2
+    reported = aggregator.value("http_wrap.limiter.limit", host=host)
+    assert reported == limiter.limit(host)
+
+
+async def test_async_requests_are_capped_per_host() -> None:
+    transport = MockTransport()
+    transport.add("GET", "/items", latency=constant(0.02))
+    seen: List[int] = []
+
+    limit = ConcurrencyLimit(initial=3, max_limit=3, max_wait=5)
+    config = HTTPWrapConfig(allow_internal=True, concurrency_limit=limit)
+    sessionmaker = transport.async_sessionmaker("aiohttp")
+    async with make_client_session(sessionmaker, config) as client:
+        limiter = client._self_limiter
+
+        async def fetch() -> int:
+            response = await client.get(url)
+            seen.append(limiter.in_flight(host))
+            return response.status_code
+
+        assert await asyncio.gather(*(fetch() for _ in range(9))) == [200] * 9
+        assert limiter.in_flight(host) == 0
+
+        blocked = asyncio.ensure_future(asyncio.gather(*(fetch() for _ in range(4))))
+        await asyncio.sleep(0.005)
+        blocked.cancel()  # cancelled waiters give their slots back
+        with pytest.raises(asyncio.CancelledError):
+            await blocked
+        assert limiter.in_flight(host) == 0
+    assert max(seen) <= 3
+
+
+def test_streamed_responses_hold_their_slot_until_read_or_closed() -> None:
+    transport = MockTransport()
+    transport.add("GET", "/items", body=b'{"a": 1}\n{"a": 2}\n')
+    limit = ConcurrencyLimit(initial=2, max_limit=2, max_wait=5)
+    config = HTTPWrapConfig(allow_internal=True, concurrency_limit=limit)
+    with make_client_session(transport.sessionmaker(), config) as client:
+        limiter = client._self_limiter
+        response = client.stream(url)
+        assert limiter.in_flight(host) == 1
+        assert list(response.iter_ndjson()) == [{"a": 1}, {"a": 2}]
+        assert limiter.in_flight(host) == 0
+
+        with client.stream(url) as response:
+            assert limiter.in_flight(host) == 1
+        assert limiter.in_flight(host) == 0
+
+        client.stream(url)  # dropped unread
+        assert limiter.in_flight(host) == 0
+
+        client.get(url)
+        assert limiter.in_flight(host) == 0
+
+
+async def test_async_unread_responses_hold_their_slot() -> None:
+    transport = MockTransport()
+    transport.add("GET", "/items", body=b'{"a": 1}\n')
+    limit = ConcurrencyLimit(initial=2, max_limit=2, max_wait=5)
+    config = HTTPWrapConfig(
+        allow_internal=True, concurrency_limit=limit, preload_limit=None
+    )
+    sessionmaker = transport.async_sessionmaker("aiohttp")
+    async with make_client_session(sessionmaker, config) as client:
+        limiter = client._self_limiter
+        response = await client.get(url)
+        assert limiter.in_flight(host) == 1
+        assert await response.json() == {"a": 1}
+        assert limiter.in_flight(host) == 0
+
+        response = await client.stream(url)
+        assert limiter.in_flight(host) == 1
+        assert [record async for record in response.aiter_ndjson()] == [{"a": 1}]
+        assert limiter.in_flight(host) == 0
+
+        async with await client.stream(url):
+            assert limiter.in_flight(host) == 1
+        assert limiter.in_flight(host) == 0
+
+
+def test_idle_hosts_are_forgotten() -> None:
+    limiter = AdaptiveLimiter(ConcurrencyLimit(host_idle_ttl=0.05))
+    for i in range(100):
+        limiter.acquire(f"host-{i}.example.com").release()
+    held = limiter.acquire(host)
+    assert len(limiter._hosts) == 101
+    assert limiter.in_flight("unknown.example.com") == 0
+    assert len(limiter._hosts) == 101  # queries create no state
+
+    time.sleep(0.06)
+    limiter.acquire("other.example.com").release()
+    assert set(limiter._hosts) == {host, "other.example.com"}
+    held.release()
+    assert limiter.in_flight(host) == 0
@@ -0,0 +1,99 @@
+import gc
+from typing import Any, Iterator
+
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.limiter import ConcurrencyLimit
+from http_wrap.memory import (
+    disable_memory_tracking,
+    enable_memory_tracking,
+    leak_check,
+    memory_tracker,
+)
+from http_wrap.mock import MockTransport
+from http_wrap.scheduler import SchedulerConfig
+
+url = "https://api.example.com/items"
+
+
+@pytest.fixture
+def transport() -> MockTransport:
+    transport = MockTransport()
+    transport.add("GET", "/items", body=b"x" * 1000, headers={"X-Token": "secret"})
+    return transport
+
+
+@pytest.fixture
+def no_gc() -> Iterator[None]:
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def test_live_proxies_and_retained_size(transport: MockTransport) -> None:
+    tracker = enable_memory_tracking(trace_frames=5)
+    try:
+        config = HTTPWrapConfig(allow_internal=True)
+        with make_client_session(transport.sessionmaker("httpx"), config) as client:
+            kept = [client.get(url) for _ in range(3)]
+            client.get(url)
+            stats = tracker.stats()
+        assert stats["client"]["live"] == 1
+        assert stats["response"] == {
+            "live": 3,
+            "created": 4,
+            "bytes": stats["response"]["bytes"],
+        }
+        assert stats["response"]["bytes"] >= 3 * 1000
+
+        dump = tracker.dump()
+        assert "response: 3 live / 4 created" in dump
+        assert "ResponseProxy alive" in dump
+        del kept, client
+        assert tracker.stats()["response"]["live"] == 0
+    finally:
+        disable_memory_tracking()
+    assert memory_tracker() is None
+
+
+@pytest.mark.parametrize("flavor", ["requests", "httpx"])
+def test_proxies_are_freed_without_the_cycle_collector(
+    transport: MockTransport, no_gc: None, flavor: str
+) -> None:
+    config = HTTPWrapConfig(
+        allow_internal=True,
+        concurrency_limit=ConcurrencyLimit(),
+        scheduler=SchedulerConfig(),
+    )
+    with leak_check(collect=False):
+        with make_client_session(transport.sessionmaker(flavor), config) as client:
+            assert client.get(url).raise_for_status().status_code == 200
+        del client
+
+
+async def test_async_proxies_are_freed_without_the_cycle_collector(
+    transport: MockTransport, no_gc: None
+) -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    with leak_check(collect=False):
+        sessionmaker = transport.async_sessionmaker("aiohttp")
+        async with make_client_session(sessionmaker, config) as client:
+            response = await client.get(url)
+            assert len(await response.content()) == 1000
+        del client, response
+
+
+def test_leak_check_reports_proxies_outliving_the_block(
+    transport: MockTransport,
+) -> None:
+    kept: Any = []
+    with pytest.raises(AssertionError, match=r"1 proxies outlived .*ResponseProxy"):
+        with leak_check():
+            config = HTTPWrapConfig(allow_internal=True)
+            with make_client_session(transport.sessionmaker(), config) as client:
+                kept.append(client.get(url))
+            del client
@@ -0,0 +1,121 @@
+import time
+from typing import Any, List, Mapping, Sequence, Tuple
+from unittest.mock import MagicMock
+
+import pytest
+
+from http_wrap.interfaces import HTTPWrapClient
+from http_wrap.metrics import (
+    LatencyHistogram,
+    MetricsAggregator,
+    RequestEvent,
+    record_phase,
+)
+from http_wrap.proxies import ClientProxy
+
+
+class Collector:
+    def __init__(self) -> None:
+        self.events: List[RequestEvent] = []
+
+    def on_request(self, event: RequestEvent) -> None:
+        self.events.append(event)
+
+
+def fake_check(
+    method: str, url: Any, args: Sequence[Any], kwargs: Mapping[str, Any]
+) -> Tuple[Sequence[Any], Mapping[str, Any]]:
+    start = time.perf_counter()
+    time.sleep(0.002)
+    record_phase("dns", time.perf_counter() - start)
+    return args, kwargs
+
+
+def make_client(*listeners: Any) -> Tuple[MagicMock, ClientProxy]:
+    backend = MagicMock(spec=HTTPWrapClient)
+    backend.get.return_value = MagicMock(status_code=200)
+    backend.request.return_value = MagicMock(status_code=201)
+    return backend, ClientProxy(backend, fake_check, lambda r: r, listeners)
+
+
+def test_histogram_percentiles_within_precision() -> None:
+    hist = LatencyHistogram(precision_bits=7)
+    for ms in range(1, 1001):
+        hist.record(ms / 1000)
+
+    assert hist.count == 1000
+    assert hist.min == pytest.approx(0.001)
+    assert hist.max == pytest.approx(1.0)
+    assert hist.percentile(50) == pytest.approx(0.5, rel=0.02)
+    assert hist.percentile(99) == pytest.approx(0.99, rel=0.02)
+    assert hist.percentile(100) == pytest.approx(1.0)
+
+
+def test_histogram_merge() -> None:
+    a, b = LatencyHistogram(), LatencyHistogram()
+    a.record(0.001)
+    b.record(0.002)
+    a.merge(b)
+    assert a.count == 2
+    assert a.min == pytest.approx(0.001)
+    assert a.max == pytest.approx(0.002)
+
+
+def test_client_proxy_emits_event_per_request() -> None:
+    collector = Collector()
+    backend, client = make_client(collector)
+
+    client.get("https://api.example.com/items")
+    client.request("POST", "https://api.example.com/items", json={})
+
+    assert [e.method for e in collector.events] == ["get", "post"]
+    assert [e.status for e in collector.events] == [200, 201]
+    event = collector.events[0]
+    assert event.host == "api.example.com"
+    assert event.dns >= 0.002
+    assert event.check >= 0
+    assert event.total >= event.dns + event.send
+    backend.get.assert_called_once_with("https://api.example.com/items")
+
+
+def test_client_proxy_does_not_leak_state_on_backend() -> None:
+    backend, client = make_client()
+    client.get("https://api.example.com/")
+    assert "get" not in vars(backend) or backend.get is not client.get
+    assert not hasattr(backend, "_self_listeners")
+
+
+def test_client_proxy_reports_errors() -> None:
+    collector = Collector()
+    backend, client = make_client(collector)
+    backend.get.side_effect = ConnectionError("boom")
+
+    with pytest.raises(ConnectionError):
+        client.get("https://api.example.com/")
+
+    (event,) = collector.events
+    assert isinstance(event.error, ConnectionError)
+    assert event.status == 0
+
+
+def test_aggregator_groups_by_host_and_method() -> None:
+    aggregator = MetricsAggregator()
+    _, client = make_client()
+    client.add_listener(aggregator)
+
+    for _ in range(3):
+        client.get("https://a.example.com/")
+    client.get("https://b.example.com/")
+
+    assert sorted(aggregator.keys()) == [
+        ("a.example.com", "get"),
+        ("b.example.com", "get"),
+    ]
+    assert aggregator.histogram("a.example.com", "GET").count == 3
+    snapshot = aggregator.snapshot()
+    assert snapshot[("a.example.com", "get")]["status"] == {200: 3}
+    assert snapshot[("b.example.com", "get")]["phases"]["dns"]["p50"] >= 0.002
+
+    client.remove_listener(aggregator)
+    client.get("https://a.example.com/")
+    assert aggregator.histogram("a.example.com", "get").count == 3
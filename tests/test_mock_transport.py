@@ -0,0 +1,118 @@
+from collections import Counter
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
+from typing import Any
+
+import aiohttp
+import httpx
+import pytest
+import requests
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.mock import (
+    MockAiohttpResponse,
+    MockReply,
+    MockRequest,
+    MockTransport,
+    constant,
+)
+from http_wrap.proxies import ClientProxy
+
+config = HTTPWrapConfig(allow_internal=True)
+url = "https://api.example.com/items"
+
+
+@pytest.fixture
+def transport() -> MockTransport:
+    transport = MockTransport(seed=42, sleep=False)
+    transport.add("GET", "/items", json={"items": [1, 2]}, headers={"X-Mock": "1"})
+    return transport
+
+
+@pytest.mark.parametrize(
+    "flavor, response_type",
+    [("requests", requests.Response), ("httpx", httpx.Response)],
+)
+def test_sync_sessionmaker(
+    transport: MockTransport, flavor: Any, response_type: type
+) -> None:
+    session = make_client_session(transport.sessionmaker(flavor), config)
+    assert isinstance(session, AbstractContextManager)
+
+    with session as client:
+        assert isinstance(client, ClientProxy)
+        response = client.get(url, params={"page": 2})
+
+    assert isinstance(response.__wrapped__, response_type)
+    assert response.status_code == 200
+    assert response.json() == {"items": [1, 2]}
+    assert response.headers["x-mock"] == "1"
+    assert str(response.url) == f"{url}?page=2"
+    assert transport.calls[0].params == {"page": 2}
+
+
+def test_unknown_route_is_404(transport: MockTransport) -> None:
+    with transport.sessionmaker("httpx")() as session:
+        response = session.post("https://api.example.com/missing", json={})
+    assert response.status_code == 404
+
+
+def test_route_handler_receives_request(transport: MockTransport) -> None:
+    @transport.route("POST", "/echo/*")
+    def echo(request: MockRequest) -> MockReply:
+        return MockReply(201, str(request.json).encode(), {"X-Path": request.path})
+
+    with transport.sessionmaker("requests")() as session:
+        response = session.post("https://api.example.com/echo/1", json={"a": 1})
+    assert response.status_code == 201
+    assert response.text == "{'a': 1}"
+    assert response.headers["X-Path"] == "/echo/1"
+
+
+def test_status_mix_latency_and_body_size_are_seeded() -> None:
+    def run() -> Counter:
+        transport = MockTransport(seed=7, sleep=False)
+        transport.add(
+            "GET",
+            "/flaky",
+            status_mix={200: 0.8, 503: 0.2},
+            latency=constant(0.05),
+            body_size=1024,
+        )
+        with transport.sessionmaker("requests")() as session:
+            responses = [session.get("http://x/flaky") for _ in range(200)]
+        assert all(len(r.content) == 1024 for r in responses)
+        assert all(r.elapsed.total_seconds() == 0.05 for r in responses)
+        return Counter(r.status_code for r in responses)
+
+    counts = run()
+    assert counts == run()
+    assert set(counts) == {200, 503}
+    assert 120 < counts[200] < 190
+
+
+async def test_async_aiohttp_flavor(transport: MockTransport) -> None:
+    sessionmaker = transport.async_sessionmaker("aiohttp")
+
+    async with await sessionmaker() as session:
+        async with session.get(url) as response:
+            assert isinstance(response, MockAiohttpResponse)
+            assert response.status == 200
+            assert await response.json() == {"items": [1, 2]}
+        assert response.closed
+
+        missing = await session.get("https://api.example.com/nope")
+        with pytest.raises(aiohttp.ClientResponseError):
+            missing.raise_for_status()
+
+    session_ctx = make_client_session(sessionmaker, config)
+    assert isinstance(session_ctx, AbstractAsyncContextManager)
+    async with session_ctx as client:
+        assert isinstance(client, ClientProxy)
+
+
+async def test_async_httpx_flavor(transport: MockTransport) -> None:
+    async with await transport.async_sessionmaker("httpx")() as session:
+        response = await session.get(url)
+    assert isinstance(response, httpx.Response)
+    assert response.json() == {"items": [1, 2]}
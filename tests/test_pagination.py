@@ -0,0 +1,185 @@
+import threading
+import time
+from typing import Any, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.mock import MockReply, MockRequest, MockTransport, reply
+from http_wrap.pagination import parse_link_header
+
+base = "https://api.example.com"
+config = HTTPWrapConfig(allow_internal=True)
+PAGES = 5
+
+
+def page_number(request: MockRequest) -> int:
+    return int(parse_qs(urlsplit(request.url).query).get("page", ["1"])[0])
+
+
+def linked_pages() -> MockTransport:
+    transport = MockTransport(sleep=False)
+
+    @transport.route("GET", "/items")
+    def items(request: MockRequest) -> MockReply:
+        page = page_number(request)
+        links = [f'</items?page={PAGES}>; rel="last"']
+        if page < PAGES:
+            links.append(f'</items?page={page + 1}>; rel="next"')
+        return reply(json={"page": page}, headers={"Link": ", ".join(links)})
+
+    @transport.route("GET", "/cursor")
+    def cursor(request: MockRequest) -> MockReply:
+        page = page_number(request)
+        following = page + 1 if page < PAGES else None
+        return reply(json={"page": page, "next": following})
+
+    return transport
+
+
+def test_parse_link_header() -> None:
+    links = parse_link_header(
+        [
+            '<https://api.example.com/items?a=1,2>; rel="next last"; title="x, y"',
+            "</items?page=1>; rel=first, </docs>",
+        ]
+    )
+    assert links["next"] is links["last"]
+    assert links["next"]["url"] == "https://api.example.com/items?a=1,2"
+    assert links["next"]["title"] == "x, y"
+    assert links["first"] == {"url": "/items?page=1", "rel": "first"}
+    assert links["/docs"] == {"url": "/docs"}
+
+
+@pytest.mark.parametrize("flavor", ["requests", "httpx"])
+def test_links_are_parsed_for_sync_backends(flavor: Any) -> None:
+    transport = linked_pages()
+    with make_client_session(transport.sessionmaker(flavor), config) as client:
+        response = client.get(f"{base}/items")
+    assert response.links["next"]["url"] == "/items?page=2"
+    assert response.links["last"]["rel"] == "last"
+
+
+@pytest.mark.parametrize("flavor", ["httpx", "aiohttp"])
+async def test_links_are_parsed_for_async_backends(flavor: Any) -> None:
+    transport = linked_pages()
+    sessionmaker = transport.async_sessionmaker(flavor)
+    async with make_client_session(sessionmaker, config) as client:
+        response = await client.get(f"{base}/items?page={PAGES}")
+    assert "next" not in response.links
+    assert response.links["last"]["url"] == f"/items?page={PAGES}"
+
+
+@pytest.mark.parametrize("prefetch", [0, 1, 3])
+def test_paginate_follows_next_links(prefetch: int) -> None:
+    transport = linked_pages()
+    with make_client_session(transport.sessionmaker(), config) as client:
+        pages = client.paginate(f"{base}/items", prefetch=prefetch)
+        assert [page.json()["page"] for page in pages] == list(range(1, PAGES + 1))
+    assert transport.calls[-1].url == f"{base}/items?page={PAGES}"
+
+
+def test_paginate_prefetch_is_bounded() -> None:
+    transport = linked_pages()
+    fetched = threading.Semaphore(0)
+
+    @transport.route("GET", "/slow")
+    def slow(request: MockRequest) -> MockReply:
+        fetched.release()
+        page = page_number(request)
+        return reply(json={"page": page, "next": page + 1})
+
+    def next_page(response: Any) -> Any:
+        return {"params": {"page": response.json()["next"]}}
+
+    with make_client_session(transport.sessionmaker(), config) as client:
+        pages = client.paginate(f"{base}/slow", next_page=next_page, prefetch=2)
+        assert next(pages).json()["page"] == 1
+        for _ in range(3):  # the page handed out plus two read ahead
+            assert fetched.acquire(timeout=1)
+        assert not fetched.acquire(timeout=0.2)
+        pages.close()
+    assert len(transport.calls) <= 4
+
+
+def test_paginate_with_cursor_and_limit() -> None:
+    transport = linked_pages()
+
+    def next_page(response: Any) -> Optional[Any]:
+        following = response.json()["next"]
+        return None if following is None else {"params": {"page": following}}
+
+    with make_client_session(transport.sessionmaker("httpx"), config) as client:
+        pages = list(client.paginate(f"{base}/cursor", next_page=next_page))
+        limited = list(
+            client.paginate(f"{base}/cursor", next_page=next_page, max_pages=2)
+        )
+    assert [page.json()["page"] for page in pages] == list(range(1, PAGES + 1))
+    assert len(limited) == 2
+
+
+def test_paginate_raises_request_errors() -> None:
+    transport = linked_pages()
+
+    def next_page(response: Any) -> str:
+        return "not a url"
+
+    with make_client_session(transport.sessionmaker(), config) as client:
+        pages = client.paginate(f"{base}/items", next_page=next_page)
+        next(pages)
+        with pytest.raises(ValueError):
+            next(pages)
+
+
+@pytest.mark.parametrize("flavor", ["httpx", "aiohttp"])
+@pytest.mark.parametrize("prefetch", [0, 2])
+async def test_async_paginate(flavor: Any, prefetch: int) -> None:
+    transport = linked_pages()
+
+    async def next_page(response: Any) -> Optional[Any]:
+        following = (await response.json())["next"]
+        return None if following is None else {"params": {"page": following}}
+
+    sessionmaker = transport.async_sessionmaker(flavor)
+    async with make_client_session(sessionmaker, config) as client:
+        linked: List[int] = []
+        async for page in client.paginate(f"{base}/items", prefetch=prefetch):
+            linked.append((await page.json())["page"])
+        cursor = [
+            (await page.json())["page"]
+            async for page in client.paginate(f"{base}/cursor", next_page=next_page)
+        ]
+    assert linked == cursor == list(range(1, PAGES + 1))
+
+
+def test_paginate_closes_pages_read_ahead(monkeypatch: pytest.MonkeyPatch) -> None:
+    transport = linked_pages()
+    closed: List[int] = []
+    monkeypatch.setattr(
+        "http_wrap.pagination.close_page",
+        lambda response: closed.append(response.json()["page"]),
+    )
+
+    with make_client_session(transport.sessionmaker(), config) as client:
+        pages = client.paginate(f"{base}/items", prefetch=2)
+        assert next(pages).json()["page"] == 1
+        deadline = time.monotonic() + 1
+        while len(transport.calls) < 3 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        time.sleep(0.05)  # pages 2 and 3 queued, the thread waits for a slot
+        pages.close()
+    assert sorted(closed) == [2, 3]
+
+
+def test_paginate_forwards_base_exceptions() -> None:
+    transport = linked_pages()
+
+    def next_page(response: Any) -> Any:
+        raise SystemExit("stop")
+
+    with make_client_session(transport.sessionmaker(), config) as client:
+        pages = client.paginate(f"{base}/items", next_page=next_page)
+        with pytest.raises(SystemExit):
+            list(pages)
@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator
+
+import aiohttp
+import httpx
+import pytest
+import requests
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.metrics import MetricsAggregator
+from http_wrap.mock import MockTransport
+from http_wrap.pools import PoolStats
+
+
+class _GatedHandler(BaseHTTPRequestHandler):
+    """`/slow` waits for the gate; everything else answers at once."""
+
+    protocol_version = "HTTP/1.1"
+    gate = threading.Event()
+    waiting = 0
+    lock = threading.Lock()
+
+    def do_GET(self) -> None:
+        if self.path == "/slow":
+            with self.lock:
+                type(self).waiting += 1
+            self.gate.wait(5)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    _GatedHandler.gate.clear()
+    _GatedHandler.waiting = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GatedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    _GatedHandler.gate.set()
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition: Callable[[], bool]) -> None:
+    deadline = time.monotonic() + 2
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+@pytest.mark.parametrize("sessionmaker", [requests.Session, httpx.Client])
+def test_sync_pool_stats(server_url: str, sessionmaker: Any) -> None:
+    aggregator = MetricsAggregator()
+    config = HTTPWrapConfig(
+        allow_internal=True, listeners=(aggregator,), count_pool_requests=True
+    )
+    with make_client_session(sessionmaker, config) as client:
+        for _ in range(5):
+            assert client.get(f"{server_url}/fast").content == b"ok"
+        assert client.pool_stats() == {
+            server_url: PoolStats(server_url, idle=1, opened=1, requests=5)
+        }
+        assert client.pool_stats()[server_url].reuse_ratio == 0.8
+        assert aggregator.value("http_wrap.pool.reuse_ratio", host=server_url) == 0.8
+
+        with ThreadPoolExecutor(2) as pool:
+            slow = [pool.submit(client.get, f"{server_url}/slow") for _ in range(2)]
+            wait_for(lambda: _GatedHandler.waiting == 2)
+            busy = client.pool_stats()[server_url]
+            _GatedHandler.gate.set()
+            assert [f.result().status_code for f in slow] == [200, 200]
+    assert busy.in_use == 2 and busy.opened == 2
+    assert aggregator.value("http_wrap.pool.in_use", host=server_url) == 2
+
+
+async def aiohttp_session(**kwargs: Any) -> aiohttp.ClientSession:
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit_per_host=1))
+
+
+async def httpx_client(**kwargs: Any) -> httpx.AsyncClient:
+    return httpx.AsyncClient(limits=httpx.Limits(max_connections=1))
+
+
+@pytest.mark.parametrize("sessionmaker", [aiohttp_session, httpx_client])
+async def test_async_pool_stats_count_waiters(
+    server_url: str, sessionmaker: Any
+) -> None:
+    config = HTTPWrapConfig(allow_internal=True, count_pool_requests=True)
+    async with make_client_session(sessionmaker, config) as client:
+        for _ in range(4):
+            await client.get(f"{server_url}/fast")
+        stats = client.pool_stats()[server_url]
+        assert (stats.opened, stats.requests, stats.idle) == (1, 4, 1)
+        assert stats.reuse_ratio == 0.75
+
+        slow = [
+            asyncio.ensure_future(client.get(f"{server_url}/slow")) for _ in range(3)
+        ]
+        while _GatedHandler.waiting < 1:
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.02)  # the others queue for the only connection
+        busy = client.pool_stats()[server_url]
+        _GatedHandler.gate.set()
+        assert [r.status_code for r in await asyncio.gather(*slow)] == [200] * 3
+    assert (busy.in_use, busy.waiting) == (1, 2)
+
+
+def test_pool_stats_without_a_pool() -> None:
+    config = HTTPWrapConfig(allow_internal=True)
+    with make_client_session(MockTransport().sessionmaker(), config) as client:
+        assert client.pool_stats() == {}
+
+
+async def test_pools_are_only_instrumented_on_request(server_url: str) -> None:
+    connector = aiohttp.TCPConnector()
+    connect = connector.connect
+
+    async def shared(**kwargs: Any) -> aiohttp.ClientSession:
+        return aiohttp.ClientSession(connector=connector, connector_owner=False)
+
+    async with make_client_session(shared, HTTPWrapConfig(allow_internal=True)):
+        assert connector.connect == connect
+
+    config = HTTPWrapConfig(allow_internal=True, count_pool_requests=True)
+    async with make_client_session(shared, config) as first:
+        wrapped = connector.connect
+        assert wrapped != connect
+        async with make_client_session(shared, config) as second:
+            assert connector.connect == wrapped  # wrapped once, counters shared
+            await first.get(f"{server_url}/fast")
+            await second.get(f"{server_url}/fast")
+            assert first.pool_stats()[server_url].requests == 2
+            assert second.pool_stats()[server_url].requests == 2
+    await connector.close()
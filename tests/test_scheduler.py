@@ -0,0 +1,159 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.metrics import MetricsAggregator
+from http_wrap.mock import MockReply, MockRequest, MockTransport, reply
+from http_wrap.scheduler import (
+    HIGH,
+    LOW,
+    NORMAL,
+    RequestScheduler,
+    RequestShedError,
+    SchedulerConfig,
+    pop_ticket,
+    request_context,
+)
+
+url = "https://api.example.com/items"
+
+
+async def dispatch_order(scheduler: RequestScheduler, tickets: List[tuple]) -> list:
+    held = await scheduler.aacquire((NORMAL, "default"))
+    order: list = []
+
+    async def run(ticket: tuple) -> None:
+        permit = await scheduler.aacquire(ticket)
+        order.append(ticket)
+        await asyncio.sleep(0)
+        permit.release()
+
+    tasks = [asyncio.ensure_future(run(ticket)) for ticket in tickets]
+    await asyncio.sleep(0)  # everyone is queued
+    assert scheduler.queued == len(tickets)
+    held.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+async def test_weighted_fair_queuing_between_tenants() -> None:
+    scheduler = RequestScheduler(
+        SchedulerConfig(max_in_flight=1, tenant_weights={"user": 2.0})
+    )
+    tickets = [(NORMAL, "bulk")] * 6 + [(NORMAL, "user")] * 6
+    order = await dispatch_order(scheduler, tickets)
+    first = [tenant for _, tenant in order[:6]]
+    assert first.count("user") == 4 and first.count("bulk") == 2
+    assert scheduler.in_flight == 0
+
+
+async def test_priority_is_served_first() -> None:
+    scheduler = RequestScheduler(SchedulerConfig(max_in_flight=1))
+    tickets = [(LOW, "a"), (NORMAL, "b"), (NORMAL, "c"), (HIGH, "d")]
+    order = await dispatch_order(scheduler, tickets)
+    assert order == [(HIGH, "d"), (NORMAL, "b"), (NORMAL, "c"), (LOW, "a")]
+
+
+async def test_low_priority_requests_are_shed() -> None:
+    aggregator = MetricsAggregator()
+    scheduler = RequestScheduler(
+        SchedulerConfig(max_in_flight=1, shed_after=0.01), aggregator.on_metric
+    )
+    held = await scheduler.aacquire((NORMAL, "default"))
+    with pytest.raises(RequestShedError):
+        await scheduler.aacquire((LOW, "bulk"))
+    normal = asyncio.ensure_future(scheduler.aacquire((NORMAL, "user")))
+    await asyncio.sleep(0.03)
+    assert not normal.done()  # only priorities below shed_below are shed
+    held.release()
+    (await normal).release()
+    assert scheduler.in_flight == 0 and scheduler.queued == 0
+    assert aggregator.value("http_wrap.scheduler.shed", priority=str(LOW)) == 1
+
+
+def test_tickets_come_from_kwargs_or_context() -> None:
+    assert pop_ticket({"timeout": 1}) == ((NORMAL, "default"), {"timeout": 1})
+    with request_context(priority=HIGH, tenant="checkout"):
+        assert pop_ticket({})[0] == (HIGH, "checkout")
+        with request_context(tenant="search"):
+            ticket, kwargs = pop_ticket({"priority": LOW, "timeout": 1})
+    assert ticket == (LOW, "search") and kwargs == {"timeout": 1}
+
+
+def test_sync_threads_share_the_global_cap() -> None:
+    transport = MockTransport()
+    lock = threading.Lock()
+    in_flight, peak = [0], [0]
+
+    @transport.route("GET", "/*")
+    def handler(request: MockRequest) -> MockReply:
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return reply()
+
+    config = HTTPWrapConfig(
+        allow_internal=True, scheduler=SchedulerConfig(max_in_flight=2)
+    )
+    with make_client_session(transport.sessionmaker("httpx"), config) as client:
+
+        def fetch(i: int) -> int:
+            tenant = "bulk" if i % 2 else "user"
+            return client.get(url, tenant=tenant, priority=i % 3).status_code
+
+        with ThreadPoolExecutor(8) as pool:
+            assert list(pool.map(fetch, range(16))) == [200] * 16
+    assert peak[0] == 2
+    assert all(call.kwargs == {} for call in transport.calls)
+
+
+async def test_tenants_are_forgotten_once_served() -> None:
+    scheduler = RequestScheduler(SchedulerConfig(max_in_flight=1))
+    held = await scheduler.aacquire((NORMAL, "default"))
+
+    async def run(tenant: str) -> None:
+        (await scheduler.aacquire((NORMAL, tenant))).release()
+
+    tasks = [asyncio.ensure_future(run(f"user-{i}")) for i in range(50)]
+    await asyncio.sleep(0)
+    assert len(scheduler._finish) == 50
+    held.release()
+    await asyncio.gather(*tasks)
+    assert scheduler._finish == {} and scheduler._queued == {}
+
+    held = await scheduler.aacquire((NORMAL, "default"))
+    waiting = [
+        asyncio.ensure_future(scheduler.aacquire((NORMAL, tenant))) for tenant in "aab"
+    ]
+    await asyncio.sleep(0)
+    held.release()
+    (await waiting[0]).release()  # the slot goes to "b", "a" is still queued
+    assert set(scheduler._finish) == {"a"} and scheduler._queued == {"a": 1}
+    (await waiting[2]).release()
+    (await waiting[1]).release()
+    assert scheduler._finish == {} and scheduler._queued == {}
+
+
+def test_streamed_responses_hold_their_slot() -> None:
+    transport = MockTransport()
+    transport.add("GET", "/items", body=b"data")
+    config = HTTPWrapConfig(
+        allow_internal=True, scheduler=SchedulerConfig(max_in_flight=2)
+    )
+    with make_client_session(transport.sessionmaker(), config) as client:
+        scheduler = client._self_scheduler
+        with client.stream(url) as response:
+            assert scheduler.in_flight == 1
+            assert response.content == b"data"
+            assert scheduler.in_flight == 0
+        client.stream(url).close()
+        assert scheduler.in_flight == 0
@@ -0,0 +1,178 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_pooled_client_session
+from http_wrap.mock import MockReply, MockRequest, MockSession, MockTransport, reply
+from http_wrap.sessionpool import SessionPool
+
+url = "https://api.example.com/items"
+
+
+class Sessions:
+    """Sessionmaker recording the sessions it opened."""
+
+    def __init__(self, transport: MockTransport) -> None:
+        self.opened: List[MockSession] = []
+        self._make = transport.sessionmaker("requests")
+
+    def __call__(self, **kwargs: Any) -> MockSession:
+        session = self._make(**kwargs)
+        self.opened.append(session)
+        return session
+
+
+def busy_transport(peak: List[int]) -> MockTransport:
+    transport = MockTransport()
+    lock = threading.Lock()
+    in_flight = [0]
+
+    @transport.route("GET", "/items")
+    def items(request: MockRequest) -> MockReply:
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return reply(json={"ok": True})
+
+    return transport
+
+
+def test_one_session_per_thread() -> None:
+    peak = [0]
+    sessions = Sessions(busy_transport(peak))
+    config = HTTPWrapConfig(allow_internal=True)
+    with make_pooled_client_session(sessions, config) as client:
+        used = set()
+
+        def fetch(_: int) -> int:
+            response = client.get(url)
+            with client.__wrapped__.checkout() as session:
+                used.add((threading.get_ident(), id(session)))
+            return response.status_code
+
+        with ThreadPoolExecutor(4) as pool:
+            assert list(pool.map(fetch, range(16))) == [200] * 16
+    threads = {thread for thread, _ in used}
+    assert len(used) == len(threads) == len({session for _, session in used})
+    assert all(session.closed for session in sessions.opened)
+    assert peak[0] > 1
+
+
+def test_checkout_caps_sessions() -> None:
+    peak = [0]
+    sessions = Sessions(busy_transport(peak))
+    config = HTTPWrapConfig(allow_internal=True)
+    with make_pooled_client_session(
+        sessions, config, max_sessions=2, per_thread=False
+    ) as client:
+        with ThreadPoolExecutor(6) as pool:
+            statuses = list(pool.map(lambda _: client.get(url).status_code, range(18)))
+    assert statuses == [200] * 18
+    assert len(sessions.opened) == 2
+    assert peak[0] == 2
+
+
+def test_closed_pool_refuses_checkouts() -> None:
+    pool = SessionPool(Sessions(MockTransport()), per_thread=False)
+    assert pool.get(url).status_code == 404
+    pool.close()
+    with pytest.raises(RuntimeError):
+        pool.get(url)
+
+
+async def test_async_sessionmakers_are_rejected() -> None:
+    async def sessionmaker(**kwargs: Any) -> Any:
+        return None
+
+    with pytest.raises(TypeError):
+        make_pooled_client_session(sessionmaker, HTTPWrapConfig())
+
+
+def test_forwarded_backend_calls_hold_their_session() -> None:
+    in_use: Dict[int, int] = {}
+    shared: List[int] = []
+    lock = threading.Lock()
+
+    def sessionmaker(**kwargs: Any) -> httpx.Client:
+        def handler(request: httpx.Request) -> httpx.Response:
+            with lock:
+                in_use[id(client)] = in_use.get(id(client), 0) + 1
+                if in_use[id(client)] > 1:
+                    shared.append(id(client))
+            time.sleep(0.01)
+            with lock:
+                in_use[id(client)] -= 1
+            return httpx.Response(200, content=b"ok")
+
+        client = httpx.Client(transport=httpx.MockTransport(handler))
+        return client
+
+    # max_body_size reads through build_request/send, outside SessionPool.request
+    config = HTTPWrapConfig(allow_internal=True, max_body_size=1024)
+    with make_pooled_client_session(
+        sessionmaker, config, max_sessions=2, per_thread=False
+    ) as client:
+        with ThreadPoolExecutor(8) as pool:
+            statuses = list(pool.map(lambda _: client.get(url).status_code, range(32)))
+        assert len(client.__wrapped__.sessions()) == 2
+    assert statuses == [200] * 32
+    assert shared == []
+
+
+def test_backend_is_detected_without_opening_a_session() -> None:
+    pool = SessionPool(httpx.Client)
+    assert hasattr(pool, "send") and not hasattr(pool, "mount")
+    assert pool.sessions() == []
+    with pytest.raises(AttributeError, match="on_create"):
+        pool.headers
+
+
+def test_sessions_of_finished_threads_are_reused() -> None:
+    sessions = Sessions(MockTransport())
+    pool = SessionPool(sessions)
+    for _ in range(5):
+        thread = threading.Thread(target=pool.get, args=(url,))
+        thread.start()
+        thread.join()
+    assert len(sessions.opened) == 1
+    pool.close()
+
+
+def test_sessions_outliving_the_pool_are_closed() -> None:
+    sessions = Sessions(MockTransport())
+    pool = SessionPool(sessions)
+    started, closed = threading.Event(), threading.Event()
+    errors: List[Exception] = []
+
+    def worker() -> None:
+        pool.get(url)
+        started.set()
+        closed.wait()
+        try:
+            pool.get(url)
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    started.wait()
+    pool.close()
+    closed.set()
+    thread.join()
+    del thread
+    assert len(errors) == 1
+    assert len(sessions.opened) == 1 and sessions.opened[0].closed
+    assert not pool._idle
+
+
+def test_max_sessions_needs_checkouts() -> None:
+    with pytest.raises(ValueError, match="per_thread=False"):
+        SessionPool(Sessions(MockTransport()), max_sessions=2)
@@ -0,0 +1,104 @@
+import pickle
+import subprocess
+import sys
+from typing import Any
+
+import httpx
+import pytest
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.interfaces import WrapSyncResponse
+from http_wrap.mock import MockTransport
+from http_wrap.snapshot import Hop, ResponseSnapshot, ResponseStatusError, SharedBody
+
+base = "https://api.example.com"
+
+
+def redirecting(**kwargs: Any) -> httpx.Client:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/old":
+            return httpx.Response(302, headers={"Location": f"{base}/new"})
+        return httpx.Response(
+            200,
+            json={"items": [1, 2]},
+            headers=[
+                ("X-Token", "secret"),
+                ("Set-Cookie", "a=1"),
+                ("Set-Cookie", "b=2"),
+                ("Link", f'<{base}/new?page=2>; rel="next"'),
+            ],
+        )
+
+    return httpx.Client(transport=httpx.MockTransport(handler), follow_redirects=True)
+
+
+def test_snapshot_is_detached_and_picklable() -> None:
+    config = HTTPWrapConfig(
+        allow_internal=True, sanitize_resp_header=(["x-token"], [], [], [])
+    )
+    with make_client_session(redirecting, config) as client:
+        snapshot = client.get(f"{base}/old").snapshot()
+
+    restored = pickle.loads(pickle.dumps(snapshot))
+    for response in (snapshot, restored):
+        assert isinstance(response, WrapSyncResponse)
+        assert response.status_code == 200 and response.ok
+        assert response.json() == {"items": [1, 2]}
+        assert response.original_url == f"{base}/old"
+        assert response.final_url == f"{base}/new"
+        assert response.headers["x-token"] == "<redacted>"
+        assert response.cookies == {"a": "1", "b": "2"}
+        assert response.links["next"]["url"] == f"{base}/new?page=2"
+        assert response.history == (Hop(302, f"{base}/old", f"{base}/new", 0.0),)
+    assert restored.raw_headers == snapshot.raw_headers
+    assert (b"set-cookie", b"b=2") in restored.raw_headers
+    assert not hasattr(snapshot, "__dict__")
+
+
+def test_large_bodies_go_to_shared_memory() -> None:
+    transport = MockTransport()
+    transport.add("GET", "/blob", body=b"x" * 100_000)
+    config = HTTPWrapConfig(allow_internal=True)
+    with make_client_session(transport.sessionmaker("requests"), config) as client:
+        snapshot = client.get(f"{base}/blob").snapshot(share_threshold=1024)
+    assert isinstance(snapshot.body, SharedBody)
+    try:
+        payload = pickle.dumps(snapshot)
+        assert len(payload) < 1024
+        assert pickle.loads(payload).content == b"x" * 100_000
+    finally:
+        snapshot.body.unlink()
+
+
+async def test_async_snapshot_reads_the_body() -> None:
+    transport = MockTransport()
+    transport.add("GET", "/items", status=404, body="missing")
+    config = HTTPWrapConfig(allow_internal=True, preload_limit=0)
+    sessionmaker = transport.async_sessionmaker("aiohttp")
+    async with make_client_session(sessionmaker, config) as client:
+        snapshot = await (await client.get(f"{base}/items")).snapshot()
+    assert snapshot.text == "missing"
+    with pytest.raises(ResponseStatusError, match="404 Client Error: Not Found"):
+        snapshot.raise_for_status()
+    assert ResponseSnapshot(204, base).raise_for_status().content == b""
+
+
+def test_shared_bodies_outlive_the_process_that_created_them() -> None:
+    script = (
+        "import pickle, sys\n"
+        "from http_wrap.snapshot import ResponseSnapshot, SharedBody\n"
+        "body = SharedBody.create(b'y' * 4096)\n"
+        "sys.stdout.buffer.write(pickle.dumps(ResponseSnapshot(200, 'u', (), body)))\n"
+    )
+    child = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, check=True
+    )
+    assert child.stderr == b""  # no leaked shared_memory warning
+    snapshot = pickle.loads(child.stdout)
+    try:
+        assert snapshot.content == b"y" * 4096
+    finally:
+        snapshot.body.unlink()
+    with pytest.raises(FileNotFoundError):
+        snapshot.body.read()
@@ -0,0 +1,143 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List
+
+import aiohttp
+import httpx
+import pytest
+import requests
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.httpwrap import make_client_session
+from http_wrap.mock import MockTransport
+from http_wrap.streams import LineDecoder, NDJSONDecoder, ServerSentEvent, SSEDecoder
+
+config = HTTPWrapConfig(allow_internal=True)
+records = [{"id": i, "text": "é" * i} for i in range(20)]
+ndjson = b"".join(json.dumps(r).encode() + b"\n" for r in records)
+sse = (
+    b"\xef\xbb\xbf: keep-alive\r\n"
+    b"event: update\r\nid: 1\r\ndata: {\"a\": 1}\r\n\r\n"
+    b"data: line one\ndata:line two\nretry: 3000\n\n"
+    b"data: cr only\r\r"
+    b"data: never finished"
+)
+events = [
+    ServerSentEvent('{"a": 1}', "update", "1"),
+    ServerSentEvent("line one\nline two", "message", "1", 3000),
+    ServerSentEvent("cr only", "message", "1", 3000),
+]
+
+
+def feed_in(decoder: Any, payload: bytes, size: int) -> List[Any]:
+    out = []
+    for i in range(0, len(payload), size):
+        out.extend(decoder.feed(payload[i : i + size]))
+    return out + decoder.flush()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 100_000])
+def test_decoders_do_not_depend_on_chunking(size: int) -> None:
+    assert feed_in(NDJSONDecoder(), ndjson, size) == records
+    assert feed_in(SSEDecoder(), sse, size) == events
+
+
+def test_line_decoder_keeps_only_the_unfinished_line() -> None:
+    decoder = LineDecoder()
+    assert decoder.feed(b"a\r") == []
+    assert decoder.feed(b"\nb\rc") == [b"a", b"b"]
+    for _ in range(1000):
+        assert decoder.feed(b"x" * 100) == []
+    assert decoder.feed(b"\n") == [b"c" + b"x" * 100_000]
+    assert decoder.flush() == []
+
+
+def test_preloaded_bodies_are_decoded() -> None:
+    transport = MockTransport(sleep=False)
+    transport.add("GET", "/records", body=ndjson)
+    transport.add("GET", "/events", body=sse)
+    with make_client_session(transport.sessionmaker("httpx"), config) as client:
+        assert list(client.get("https://x.example/records").iter_ndjson()) == records
+        assert list(client.get("https://x.example/events").iter_events()) == events
+
+
+async def test_preloaded_async_bodies_are_decoded() -> None:
+    transport = MockTransport(sleep=False)
+    transport.add("GET", "/records", body=ndjson)
+    sessionmaker = transport.async_sessionmaker("aiohttp")
+    async with make_client_session(sessionmaker, config) as client:
+        response = await client.get("https://x.example/records")
+        assert [r async for r in response.aiter_ndjson()] == records
+
+
+class _GatedHandler(BaseHTTPRequestHandler):
+    """Sends the first record, then waits for the client to have parsed it."""
+
+    protocol_version = "HTTP/1.1"
+    gate = threading.Event()
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        lines = ndjson.splitlines(keepends=True)
+        self._chunk(lines[0])
+        self.gate.wait(5)
+        self._chunk(b"".join(lines[1:]))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def gated_server() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _GatedHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/stream"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def gated_url(gated_server: str) -> Iterator[str]:
+    _GatedHandler.gate.clear()
+    yield gated_server
+    _GatedHandler.gate.set()
+
+
+@pytest.mark.parametrize("sessionmaker", [requests.Session, httpx.Client])
+def test_records_are_yielded_as_they_arrive(gated_url: str, sessionmaker: Any) -> None:
+    with make_client_session(sessionmaker, config) as client:
+        stream = client.stream(gated_url).iter_ndjson()
+        assert next(stream) == records[0]  # would block until timeout if buffered
+        _GatedHandler.gate.set()
+        assert list(stream) == records[1:]
+
+
+async def make_httpx() -> httpx.AsyncClient:
+    return httpx.AsyncClient()
+
+
+async def make_aiohttp() -> aiohttp.ClientSession:
+    return aiohttp.ClientSession()
+
+
+@pytest.mark.parametrize("sessionmaker", [make_httpx, make_aiohttp])
+async def test_async_records_are_yielded_as_they_arrive(
+    gated_url: str, sessionmaker: Any
+) -> None:
+    async with make_client_session(sessionmaker, config) as client:
+        response = await client.stream(gated_url)
+        stream = response.aiter_ndjson()
+        assert await stream.__anext__() == records[0]
+        _GatedHandler.gate.set()
+        assert [r async for r in stream] == records[1:]
+        await response.release()
@@ -0,0 +1,207 @@
+import hashlib
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Callable, Dict, Iterator
+
+import aiohttp
+import httpx
+import pytest
+import requests
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.hooks import check_consistency
+from http_wrap.httpwrap import make_client_session
+from http_wrap.upload import BufferReader, backend_kind, prepare_upload
+
+payload = bytes(range(256)) * 1024
+digest = hashlib.sha256(payload).hexdigest()
+config = HTTPWrapConfig(allow_internal=True)
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        chunked = self.headers.get("Transfer-Encoding") == "chunked"
+        body = self._read_chunked() if chunked else self._read_length()
+        reply = json.dumps(
+            {
+                "chunked": chunked,
+                "size": len(body),
+                "sha256": hashlib.sha256(body).hexdigest(),
+                "multipart": self.headers.get("Content-Type", "").startswith(
+                    "multipart/form-data"
+                ),
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def _read_length(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _read_chunked(self) -> bytes:
+        parts = []
+        while True:
+            size = int(self.rfile.readline().split(b";")[0], 16)
+            if not size:
+                self.rfile.readline()
+                return b"".join(parts)
+            parts.append(self.rfile.read(size))
+            self.rfile.readline()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture(scope="module")
+def echo_url() -> Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/upload"
+    server.shutdown()
+    server.server_close()
+
+
+def generate() -> Iterator[bytes]:
+    for i in range(0, len(payload), 10_000):
+        yield payload[i : i + 10_000]
+
+
+async def agenerate() -> AsyncIterator[bytes]:
+    for chunk in generate():
+        yield chunk
+
+
+BODIES: Dict[str, Callable[[], Any]] = {
+    "bytes": lambda: payload,
+    "file": lambda: io.BytesIO(payload),
+    "memoryview": lambda: memoryview(payload),
+    "bytearray": lambda: bytearray(payload),
+    "generator": generate,
+}
+
+
+@pytest.mark.parametrize("body", sorted(BODIES))
+@pytest.mark.parametrize("sessionmaker", [requests.Session, httpx.Client])
+def test_sync_uploads_stream(echo_url: str, sessionmaker: Any, body: str) -> None:
+    with make_client_session(sessionmaker, config) as client:
+        echoed = client.post(echo_url, data=BODIES[body]()).json()
+    assert echoed["size"] == len(payload) and echoed["sha256"] == digest
+    assert echoed["chunked"] is (body == "generator")
+
+
+async def make_httpx() -> httpx.AsyncClient:
+    return httpx.AsyncClient()
+
+
+async def make_aiohttp() -> aiohttp.ClientSession:
+    return aiohttp.ClientSession()
+
+
+@pytest.mark.parametrize("body", sorted(BODIES) + ["async"])
+@pytest.mark.parametrize("sessionmaker", [make_httpx, make_aiohttp])
+async def test_async_uploads_stream(
+    echo_url: str, sessionmaker: Any, body: str
+) -> None:
+    data = agenerate() if body == "async" else BODIES[body]()
+    async with make_client_session(sessionmaker, config) as client:
+        response = await client.post(echo_url, data=data)
+        echoed = await response.json()
+    assert echoed["size"] == len(payload) and echoed["sha256"] == digest
+    assert echoed["chunked"] is (body in ("async", "generator"))
+
+
+@pytest.mark.parametrize("sessionmaker", [make_httpx, make_aiohttp])
+async def test_async_file_fields_are_multipart(
+    echo_url: str, sessionmaker: Any
+) -> None:
+    files = {"export": ("export.bin", io.BytesIO(payload), "application/octet-stream")}
+    async with make_client_session(sessionmaker, config) as client:
+        response = await client.post(echo_url, files=files, data={"kind": "full"})
+        echoed = await response.json()
+    assert echoed["multipart"] is True
+    assert echoed["size"] > len(payload)
+
+
+@pytest.mark.parametrize("data", [b"kind=full", "kind=full"])
+def test_raw_data_is_refused_next_to_files(data: Any) -> None:
+    files = {"export": io.BytesIO(payload)}
+    with pytest.raises(TypeError, match="files="):
+        prepare_upload("aiohttp", True, {"data": data, "files": files})
+
+
+def test_async_iterators_need_an_async_session() -> None:
+    with pytest.raises(TypeError):
+        prepare_upload("requests", False, {"data": agenerate()})
+    with pytest.raises(TypeError):
+        prepare_upload("httpx", False, {"data": agenerate()})
+
+
+def test_buffers_are_read_in_slices() -> None:
+    reader = BufferReader(memoryview(payload))
+    assert len(reader) == len(payload)
+    assert reader.read(10) == payload[:10]
+    assert len(reader) == len(payload) - 10
+    assert b"".join(reader) == payload[10:]
+
+
+def test_backend_kind() -> None:
+    assert backend_kind(requests.Session()) == "requests"
+    assert backend_kind(httpx.Client()) == "httpx"
+    assert backend_kind(object()) == "other"
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [
+        {"data": b"raw"},
+        {"data": io.BytesIO(b"raw")},
+        {"data": generate()},
+        {"data": agenerate()},
+        {"files": {"f": io.BytesIO(b"raw")}, "data": {"field": "1"}},
+        {"content": b"raw"},
+        {"json": {"a": 1}},
+    ],
+)
+def test_check_consistency_accepts_bodies(kwargs: Dict[str, Any]) -> None:
+    check_consistency(
+        method="post",
+        json=kwargs.get("json"),
+        params=None,
+        data=kwargs.get("data"),
+        files=kwargs.get("files"),
+        allowed_methods=("post",),
+        content=kwargs.get("content"),
+    )
+
+
+@pytest.mark.parametrize(
+    "method, kwargs, error",
+    [
+        ("post", {}, ValueError),
+        ("get", {"data": b"raw"}, ValueError),
+        ("post", {"json": {}, "data": b"raw"}, ValueError),
+        ("post", {"data": b"raw", "content": b"raw"}, ValueError),
+        ("post", {"data": 42}, TypeError),
+    ],
+)
+def test_check_consistency_rejects(
+    method: str, kwargs: Dict[str, Any], error: Any
+) -> None:
+    with pytest.raises(error):
+        check_consistency(
+            method=method,
+            json=kwargs.get("json"),
+            params=None,
+            data=kwargs.get("data"),
+            files=kwargs.get("files"),
+            allowed_methods=("get", "post"),
+            content=kwargs.get("content"),
+        )
@@ -0,0 +1,140 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Set
+
+import aiohttp
+import httpx
+import pytest
+import requests
+
+from http_wrap.configs import HTTPWrapConfig
+from http_wrap.hooks import InternalAddressError
+from http_wrap.httpwrap import make_client_session
+from http_wrap.metrics import MetricsAggregator
+
+CONNECTIONS = 3
+
+
+class _PortsHandler(BaseHTTPRequestHandler):
+    """Holds HEAD requests until CONNECTIONS of them are in flight (when
+    `concurrent` is set)."""
+
+    protocol_version = "HTTP/1.1"
+    ports: Set[int] = set()
+    methods: List[str] = []
+    barrier = threading.Barrier(CONNECTIONS, timeout=2)
+    concurrent = True
+
+    def _reply(self) -> None:
+        self.ports.add(self.client_address[1])
+        self.methods.append(self.command)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_HEAD(self) -> None:
+        try:
+            if self.concurrent:
+                self.barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        self._reply()
+
+    def do_GET(self) -> None:
+        self._reply()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    _PortsHandler.ports = set()
+    _PortsHandler.methods = []
+    _PortsHandler.barrier.reset()
+    _PortsHandler.concurrent = True
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _PortsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def make_config(url: str, aggregator: MetricsAggregator) -> HTTPWrapConfig:
+    return HTTPWrapConfig(
+        allow_internal=True, trusted_domains=[url], listeners=(aggregator,)
+    )
+
+
+@pytest.mark.parametrize("sessionmaker", [requests.Session, httpx.Client])
+def test_warmup_opens_pooled_connections(server_url: str, sessionmaker: Any) -> None:
+    _PortsHandler.concurrent = False  # opened one after the other
+    aggregator = MetricsAggregator()
+    with make_client_session(sessionmaker, make_config(server_url, aggregator)) as c:
+        result = c.warmup(connections_per_host=CONNECTIONS)
+        warmed = set(_PortsHandler.ports)
+        c.get(f"{server_url}/after")
+
+    assert result.hosts == ["127.0.0.1"] and not result.errors
+    assert result.connections == {"127.0.0.1": CONNECTIONS}
+    assert len(warmed) == CONNECTIONS
+    assert _PortsHandler.ports == warmed  # the request reused a warm connection
+    assert 0 < result.dns <= result.duration
+    assert aggregator.value("http_wrap.warmup.connections", host="127.0.0.1") == 3
+    assert aggregator.timing("http_wrap.warmup.duration").count == 1
+
+
+async def make_httpx() -> httpx.AsyncClient:
+    return httpx.AsyncClient()
+
+
+async def make_aiohttp() -> aiohttp.ClientSession:
+    return aiohttp.ClientSession()
+
+
+@pytest.mark.parametrize("sessionmaker", [make_httpx, make_aiohttp])
+async def test_async_warmup(server_url: str, sessionmaker: Any) -> None:
+    aggregator = MetricsAggregator()
+    config = make_config(server_url, aggregator)
+    async with make_client_session(sessionmaker, config) as client:
+        result = await client.warmup(connections_per_host=CONNECTIONS)
+        warmed = set(_PortsHandler.ports)
+        await client.get(f"{server_url}/after")
+
+    assert result.connections == {"127.0.0.1": CONNECTIONS}
+    assert len(warmed) == CONNECTIONS
+    assert _PortsHandler.ports == warmed
+
+
+def test_warmup_failures_are_reported_not_raised(server_url: str) -> None:
+    aggregator = MetricsAggregator()
+    with make_client_session(httpx.Client, make_config(server_url, aggregator)) as c:
+        result = c.warmup(["unknown-host.invalid"], method="options")
+    assert result.connections == {}
+    assert list(result.errors) == ["unknown-host.invalid"]
+    assert _PortsHandler.methods == []
+
+
+def test_warmup_is_capped_by_the_pool_size(server_url: str) -> None:
+    _PortsHandler.concurrent = False
+
+    def small_pool(**kwargs: Any) -> requests.Session:
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=2))
+        return session
+
+    aggregator = MetricsAggregator()
+    with make_client_session(small_pool, make_config(server_url, aggregator)) as c:
+        result = c.warmup(connections_per_host=5)
+    assert result.connections == {"127.0.0.1": 2}
+    assert len(_PortsHandler.ports) == 2
+
+
+def test_warmup_skips_hosts_the_client_refuses(server_url: str) -> None:
+    config = HTTPWrapConfig(trusted_domains=[server_url])
+    with make_client_session(requests.Session, config) as client:
+        result = client.warmup()
+    assert result.connections == {}
+    assert isinstance(result.errors["127.0.0.1"], InternalAddressError)
+    assert _PortsHandler.methods == []